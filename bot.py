@@ -165,6 +165,10 @@ def load_cogs():
             if filename.startswith("__"):
                 continue
                 
+            # Skip the shared helpers package, it contains no cogs
+            if os.path.isdir(path) and filename == "common":
+                continue
+
             # If it's a directory, recurse into it
             if os.path.isdir(path):
                 load_from_dir(path)
@@ -0,0 +1,110 @@
+import re
+import time
+from collections import deque
+
+# Action kinds each moderation command can lead to. Commands that can't ban,
+# kick, time out or detain anyone (purge, lock, unban...) lead to none
+COMMAND_ACTIONS = {
+    "ban": {"ban"},
+    "kick": {"kick"},
+    "mute": {"timeout", "detain"},
+    "timeout": {"timeout", "detain"},
+    # Warnings can escalate to any of them
+    "warn": {"ban", "kick", "timeout", "detain"},
+}
+
+
+def command_actions(text):
+    """The action kinds the moderation commands named in text can lead to"""
+    kinds = set()
+    for word in re.findall(r"[a-z]+", (text or "").lower()):
+        kinds |= COMMAND_ACTIONS.get(word, set())
+    return kinds
+
+
+class Trigger:
+    """Something a staff member did that could have made another bot act"""
+
+    __slots__ = ("at", "kind", "staff", "bot_id", "targets", "action_kinds", "message", "status")
+
+    def __init__(self, kind, staff, bot_id=None, targets=(), action_kinds=None, message=None):
+        self.at = time.monotonic()
+        self.kind = kind
+        self.staff = staff
+        self.message = message
+        # None when we can't tell which bot the command was meant for
+        self.bot_id = bot_id
+        self.targets = set(targets)
+        # Action kinds it can explain, None for any
+        self.action_kinds = action_kinds
+        # Set by the cog when the first action it explains is handled
+        self.status = None
+
+    def matches(self, action):
+        if self.bot_id is not None and self.bot_id != action.actor_id:
+            return False
+        if self.action_kinds is not None and action.kind not in self.action_kinds:
+            return False
+        if self.targets:
+            return action.target_id in self.targets
+        # Without targets only the actions it names, taken after it, so another
+        # bot's unrelated ban a few seconds earlier isn't claimed
+        return bool(self.action_kinds) and action.at >= self.at
+
+
+class BotAction:
+    """A moderation action another bot took, from an audit log entry"""
+
+    __slots__ = ("at", "kind", "actor_id", "target_id", "entry")
+
+    def __init__(self, kind, actor_id, target_id, entry=None):
+        self.at = time.monotonic()
+        self.kind = kind
+        self.actor_id = actor_id
+        self.target_id = target_id
+        self.entry = entry
+
+
+class ActionCorrelator:
+    """Pairs other bots' audit log actions with the staff activity that triggered them
+
+    The audit log entry and the trigger (a prefix command, or the other
+    bot's slash command response) can arrive in either order, so both
+    sides are kept per guild for `window` seconds and matched from
+    whichever side arrives second.
+    """
+
+    def __init__(self, window=15, max_per_guild=50):
+        self.window = window
+        self.max_per_guild = max_per_guild
+        self._triggers = {}
+        self._actions = {}
+
+    def _recent(self, store, guild_id):
+        items = store.get(guild_id)
+        if items is None:
+            items = store[guild_id] = deque(maxlen=self.max_per_guild)
+        cutoff = time.monotonic() - self.window
+        while items and items[0].at < cutoff:
+            items.popleft()
+        return items
+
+    def add_trigger(self, guild_id, trigger):
+        """Record a trigger, returning the already-seen actions it explains"""
+        actions = self._recent(self._actions, guild_id)
+        matched = [action for action in actions if trigger.matches(action)]
+        for action in matched:
+            actions.remove(action)
+
+        self._recent(self._triggers, guild_id).append(trigger)
+        return matched
+
+    def add_action(self, guild_id, action):
+        """Record an action, returning the most recent trigger that explains it (or None to wait for one)"""
+        triggers = self._recent(self._triggers, guild_id)
+        for trigger in reversed(triggers):
+            if trigger.matches(action):
+                return trigger
+
+        self._recent(self._actions, guild_id).append(action)
+        return None
@@ -0,0 +1,229 @@
+import asyncio
+import datetime
+import heapq
+import time
+
+
+class ActionScheduler:
+    """Runs timed moderation actions from scheduled_actions when they fall due
+
+    Only actions due within the next `window` seconds are held in memory, as
+    (due time, id) pairs in a min-heap. A single task sleeps until the
+    earliest one is due or the window ends, whichever is first, and is woken
+    early when something sooner is scheduled, so nothing polls. Actions
+    that fell due while the bot was down are picked up by the first load and
+    run right away, oldest first.
+
+    Each action is claimed with a conditional UPDATE before it runs, so one
+    cancelled in the meantime is simply skipped.
+    """
+
+    def __init__(self, db, logger, handler, window=3600, max_attempts=5, retry_delay=60):
+        self.db = db
+        self.logger = logger
+        # async handler(action) where action is a scheduled_actions row as a dict
+        self.handler = handler
+        self.window = window
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        self._heap = []
+        self._queued = set()
+        self._window_end = 0.0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._tasks = set()
+        self.executed = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        """Stop waking up for due actions, ones already running are left to finish"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _push(self, due, action_id):
+        if action_id not in self._queued:
+            self._queued.add(action_id)
+            heapq.heappush(self._heap, (due, action_id))
+
+    async def _load_window(self):
+        """Queue every pending action due before the end of the next window"""
+        self._window_end = time.time() + self.window
+        rows = await asyncio.to_thread(self._fetch_due, datetime.datetime.fromtimestamp(self._window_end, datetime.timezone.utc))
+        for action_id, due_at in rows:
+            self._push(due_at.timestamp(), action_id)
+        if rows:
+            self.logger.debug(f"Loaded {len(rows)} scheduled actions due in the next {self.window}s")
+
+    async def _run(self):
+        # Actions claimed when the bot stopped never finished, run them again
+        await asyncio.to_thread(self._query, "UPDATE scheduled_actions SET status = 'pending' WHERE status = 'running'",
+                                (), log_name="_recover")
+        await self._load_window()
+        while True:
+            now = time.time()
+            if now >= self._window_end:
+                await self._load_window()
+                continue
+
+            if self._heap and self._heap[0][0] <= now:
+                _, action_id = heapq.heappop(self._heap)
+                self._queued.discard(action_id)
+                task = asyncio.create_task(self._execute(action_id))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+                continue
+
+            next_due = self._heap[0][0] if self._heap else self._window_end
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(next_due, self._window_end) - now)
+            except asyncio.TimeoutError:
+                pass
+
+    async def schedule(self, guild_id, action_type, target_id, moderator_id, due_at, reason=None, role_id=None):
+        """Store an action to run at due_at (an aware datetime), returning its ID"""
+        action_id = await asyncio.to_thread(self._insert, guild_id, action_type, target_id, role_id,
+                                            moderator_id, reason, due_at)
+        if action_id is not None and due_at.timestamp() < self._window_end:
+            self._push(due_at.timestamp(), action_id)
+            self._wakeup.set()
+        return action_id
+
+    async def cancel(self, guild_id, action_type, target_id):
+        """Cancel pending actions of a type for a target, e.g. a tempban's unban after a manual unban"""
+        # Left in the heap, the claim before running skips them
+        return await asyncio.to_thread(self._cancel, guild_id, action_type, target_id)
+
+    async def cancel_id(self, guild_id, action_id):
+        """Cancel one pending action by ID, returning whether it was still pending"""
+        return bool(await asyncio.to_thread(self._cancel_id, guild_id, action_id))
+
+    async def get(self, guild_id, action_id):
+        return await asyncio.to_thread(self._fetch_one, guild_id, action_id)
+
+    async def pending(self, guild_id, limit=10):
+        return await asyncio.to_thread(self._fetch_pending, guild_id, limit)
+
+    async def _execute(self, action_id):
+        action = await asyncio.to_thread(self._claim, action_id)
+        if action is None:
+            return
+
+        try:
+            await self.handler(action)
+        except Exception as e:
+            attempts = action["attempts"] + 1
+            if attempts >= self.max_attempts:
+                self.failed += 1
+                self.logger.error(f"Scheduled action {action_id} ({action['action_type']}) failed for good: {e}")
+                await asyncio.to_thread(self._finish, action_id, "failed", attempts, str(e))
+                return
+
+            # Back off a little more after each failure
+            retry_at = time.time() + self.retry_delay * attempts
+            self.logger.warning(f"Scheduled action {action_id} ({action['action_type']}) failed, retrying: {e}")
+            await asyncio.to_thread(self._retry, action_id, attempts, str(e),
+                                    datetime.datetime.fromtimestamp(retry_at, datetime.timezone.utc))
+            if retry_at < self._window_end:
+                self._push(retry_at, action_id)
+                self._wakeup.set()
+            return
+
+        self.executed += 1
+        await asyncio.to_thread(self._finish, action_id, "done", action["attempts"] + 1, None)
+
+    def _query(self, sql, params, fetch=None, log_name="scheduled action query"):
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(sql, params)
+                if fetch == "one":
+                    row = cursor.fetchone()
+                    result = dict(zip([desc[0] for desc in cursor.description], row)) if row else None
+                elif fetch == "all":
+                    result = cursor.fetchall()
+                else:
+                    result = cursor.rowcount
+                conn.commit()
+                return result
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error in {log_name}: {e}")
+            return None
+        finally:
+            self.db.release_connection(conn)
+
+    def _fetch_due(self, until):
+        return self._query('''
+        SELECT id, due_at FROM scheduled_actions
+        WHERE status = 'pending' AND due_at <= %s
+        ORDER BY due_at
+        ''', (until,), fetch="all", log_name="_fetch_due") or []
+
+    def _fetch_pending(self, guild_id, limit):
+        return self._query('''
+        SELECT id, action_type, target_id, role_id, moderator_id, reason, due_at FROM scheduled_actions
+        WHERE status = 'pending' AND guild_id = %s
+        ORDER BY due_at
+        LIMIT %s
+        ''', (guild_id, limit), fetch="all", log_name="_fetch_pending") or []
+
+    def _insert(self, guild_id, action_type, target_id, role_id, moderator_id, reason, due_at):
+        row = self._query('''
+        INSERT INTO scheduled_actions (guild_id, action_type, target_id, role_id, moderator_id, reason, due_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        RETURNING id
+        ''', (guild_id, action_type, target_id, role_id, moderator_id, reason, due_at), fetch="one", log_name="_insert")
+        return row["id"] if row else None
+
+    def _claim(self, action_id):
+        return self._query('''
+        UPDATE scheduled_actions SET status = 'running'
+        WHERE id = %s AND status = 'pending'
+        RETURNING *
+        ''', (action_id,), fetch="one", log_name="_claim")
+
+    def _finish(self, action_id, status, attempts, error):
+        self._query('''
+        UPDATE scheduled_actions SET status = %s, attempts = %s, last_error = %s
+        WHERE id = %s
+        ''', (status, attempts, error, action_id), log_name="_finish")
+
+    def _retry(self, action_id, attempts, error, due_at):
+        self._query('''
+        UPDATE scheduled_actions SET status = 'pending', attempts = %s, last_error = %s, due_at = %s
+        WHERE id = %s
+        ''', (attempts, error, due_at, action_id), log_name="_retry")
+
+    def _cancel(self, guild_id, action_type, target_id):
+        return self._query('''
+        UPDATE scheduled_actions SET status = 'cancelled'
+        WHERE guild_id = %s AND action_type = %s AND target_id = %s AND status = 'pending'
+        ''', (guild_id, action_type, target_id), log_name="_cancel") or 0
+
+    def _cancel_id(self, guild_id, action_id):
+        return self._query('''
+        UPDATE scheduled_actions SET status = 'cancelled'
+        WHERE guild_id = %s AND id = %s AND status = 'pending'
+        ''', (guild_id, action_id), log_name="_cancel_id") or 0
+
+    def _fetch_one(self, guild_id, action_id):
+        return self._query('''
+        SELECT * FROM scheduled_actions WHERE guild_id = %s AND id = %s
+        ''', (guild_id, action_id), fetch="one", log_name="_fetch_one")
+
+    def stats(self):
+        return {
+            "queued": len(self._heap),
+            "next_due_in": round(self._heap[0][0] - time.time(), 1) if self._heap else None,
+            "executed": self.executed,
+            "failed": self.failed
+        }
@@ -0,0 +1,97 @@
+import time
+from collections import deque
+
+
+class AlertGroup:
+    """Flags from one user in one channel that share a single alert message"""
+
+    def __init__(self, key, message, max_messages=50):
+        self.key = key
+        self.first_message = message
+        # Set once the alert has been posted, merges before that only update state
+        self.alert = None
+        self.alert_id = None
+        self.messages = deque([message], maxlen=max_messages)
+        self.count = 1
+        self.max_scores = {}
+        self.high_priority = False
+        self.pinged = False
+        self.last_flag = time.monotonic()
+        self.edit_handle = None
+        self.dirty = False
+
+    def merge(self, message, flagged_categories, high_priority):
+        """Fold another flag into the group, returning True if it raised the severity"""
+        if message not in self.messages:
+            self.messages.append(message)
+            self.count += 1
+        self.last_flag = time.monotonic()
+        self.dirty = True
+
+        for category in flagged_categories:
+            name = category["name"]
+            if name not in self.max_scores or category["score"] > self.max_scores[name]["score"]:
+                self.max_scores[name] = category
+
+        escalated = high_priority and not self.high_priority
+        self.high_priority = self.high_priority or high_priority
+        return escalated
+
+
+class AlertAggregator:
+    """Groups repeated flags per (guild, user, channel) within a sliding window
+
+    The first flag posts an alert; later ones edit it in place and at most
+    one extra ping goes out per group, when its severity escalates.
+    """
+
+    def __init__(self, window=120, edit_interval=3, max_messages=50):
+        self.window = window
+        self.edit_interval = edit_interval
+        self.max_messages = max_messages
+        self._groups = {}
+
+        self.alerts_posted = 0
+        self.flags_merged = 0
+        self.edits = 0
+        self.pings_sent = 0
+        self.pings_suppressed = 0
+
+    def get(self, key):
+        """Get the active group for a key, dropping it once the window has passed"""
+        group = self._groups.get(key)
+        if group and time.monotonic() - group.last_flag > self.window:
+            self.discard(key)
+            return None
+        return group
+
+    def start(self, key, message, flagged_categories, high_priority):
+        """Open a new group for a flag that will get its own alert"""
+        self._prune()
+        group = AlertGroup(key, message, self.max_messages)
+        group.merge(message, flagged_categories, high_priority)
+        group.dirty = False
+        self._groups[key] = group
+        return group
+
+    def discard(self, key):
+        """Close a group early, e.g. when its alert message was deleted"""
+        group = self._groups.pop(key, None)
+        if group and group.edit_handle:
+            group.edit_handle.cancel()
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [key for key, group in self._groups.items() if now - group.last_flag > self.window]:
+            self.discard(key)
+
+    def stats(self):
+        """Aggregation metrics for the automod stats command"""
+        return {
+            "active_groups": len(self._groups),
+            "alerts_posted": self.alerts_posted,
+            "flags_merged": self.flags_merged,
+            "edits": self.edits,
+            "pings_sent": self.pings_sent,
+            "pings_suppressed": self.pings_suppressed
+        }
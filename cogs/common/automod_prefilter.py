@@ -0,0 +1,139 @@
+import re
+import unicodedata
+from collections import Counter
+from cogs.common.verdict_cache import strip_invisible
+
+# Pre-filter decisions
+DENY = "deny"
+SKIP = "skip"
+CHECK = "check"
+
+_CUSTOM_EMOJI_RE = re.compile(r"<a?:\w{1,32}:\d{15,25}>")
+_URL_RE = re.compile(r"https?://\S+", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"^\w+[.!?]*$")
+# Unicode categories that make up emoji sequences (symbols, modifiers, joiners, keycaps)
+_EMOJI_CATEGORIES = {"So", "Sk", "Mn", "Me", "Cf"}
+
+
+def is_emoji_only(content):
+    """Check if content is nothing but custom and unicode emoji"""
+    content = _WHITESPACE_RE.sub("", _CUSTOM_EMOJI_RE.sub("", content))
+    return all(unicodedata.category(char) in _EMOJI_CATEGORIES for char in content)
+
+
+def is_link_only(content):
+    """Check if content is nothing but links"""
+    return bool(_URL_RE.search(content)) and not _WHITESPACE_RE.sub("", _URL_RE.sub("", content))
+
+
+def compile_denylist(terms):
+    """Compile denylist terms into one whole-word, case-insensitive pattern"""
+    terms = {strip_invisible(term).strip() for term in terms}
+    terms = sorted((term for term in terms if term), key=len, reverse=True)
+    if not terms:
+        return None
+
+    # Longest first so overlapping terms report the most specific match
+    alternation = "|".join(re.escape(term) for term in terms)
+    return re.compile(rf"(?<!\w)(?:{alternation})(?!\w)")
+
+
+class PreFilter:
+    """Cheap local classification that runs before the moderation API
+
+    Denylisted terms escalate straight to an alert. Content that is safe to
+    skip (emoji, links, single words, bot commands) never reaches the API.
+    Everything else is sent on for a real verdict.
+    """
+
+    def __init__(self, config, prefixes=()):
+        self.enabled = config.get("enabled", True)
+        self.skip_emoji_only = config.get("skip_emoji_only", True)
+        self.skip_link_only = config.get("skip_link_only", True)
+        self.skip_bot_commands = config.get("skip_bot_commands", True)
+        self.skip_single_word = config.get("skip_single_word", True)
+        self.max_single_word_length = config.get("max_single_word_length", 20)
+        self.prefixes = tuple(prefix.casefold() for prefix in prefixes)
+
+        self.global_terms = set(config.get("denylist", []))
+        self._guild_terms = {}
+        self._patterns = {}
+
+        self.decisions = Counter()
+
+    def has_guild(self, guild_id):
+        """Check if a guild's denylist has been loaded"""
+        return guild_id in self._guild_terms
+
+    def set_guild_terms(self, guild_id, terms):
+        """Replace a guild's denylist and recompile its pattern"""
+        self._guild_terms[guild_id] = set(terms)
+        self._patterns[guild_id] = compile_denylist(self.global_terms | self._guild_terms[guild_id])
+
+    def get_guild_terms(self, guild_id):
+        return self._guild_terms.get(guild_id, set())
+
+    def match_denylist(self, guild_id, content):
+        """Return the first denylisted term found in content, or None"""
+        if guild_id not in self._patterns:
+            self._patterns[guild_id] = compile_denylist(self.global_terms)
+
+        pattern = self._patterns[guild_id]
+        if pattern is None:
+            return None
+
+        match = pattern.search(strip_invisible(content))
+        return match.group(0) if match else None
+
+    def skip_reason(self, content):
+        """Return why content is safe to skip, or None if it needs the API"""
+        stripped = content.strip()
+        if not stripped:
+            return "empty"
+
+        if self.skip_bot_commands and self.prefixes and stripped.casefold().startswith(self.prefixes):
+            return "bot_command"
+
+        if self.skip_emoji_only and is_emoji_only(stripped):
+            return "emoji_only"
+
+        if self.skip_link_only and is_link_only(stripped):
+            return "link_only"
+
+        if (self.skip_single_word and len(stripped) <= self.max_single_word_length
+                and _WORD_RE.match(stripped)):
+            return "single_word"
+
+        return None
+
+    def classify(self, guild_id, content):
+        """Classify content as (DENY, term), (SKIP, reason) or (CHECK, None)"""
+        if not self.enabled:
+            return CHECK, None
+
+        term = self.match_denylist(guild_id, content)
+        if term:
+            self.decisions[DENY] += 1
+            return DENY, term
+
+        reason = self.skip_reason(content)
+        if reason:
+            self.decisions[f"{SKIP}:{reason}"] += 1
+            return SKIP, reason
+
+        self.decisions[CHECK] += 1
+        return CHECK, None
+
+    def stats(self):
+        """Decision counts for the automod stats command"""
+        skipped = {key.split(":", 1)[1]: count for key, count in self.decisions.items()
+                   if key.startswith(f"{SKIP}:")}
+        total = sum(self.decisions.values())
+        return {
+            "total": total,
+            "denied": self.decisions[DENY],
+            "checked": self.decisions[CHECK],
+            "skipped": skipped,
+            "skip_ratio": sum(skipped.values()) / total if total else 0.0
+        }
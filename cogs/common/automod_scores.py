@@ -0,0 +1,201 @@
+import asyncio
+from psycopg2.extras import execute_values
+
+# Fixed category order for the scores array column, append new categories at the end
+CATEGORIES = (
+    "harassment", "harassment/threatening",
+    "hate", "hate/threatening",
+    "self-harm", "self-harm/intent", "self-harm/instructions",
+    "sexual", "sexual/minors",
+    "violence", "violence/graphic",
+    "illicit", "illicit/violent"
+)
+
+# Alert button outcomes, the first two count as true positives when tuning
+OUTCOMES = ("deleted", "warned", "ignored")
+POSITIVE_OUTCOMES = ("deleted", "warned")
+
+
+def scores_to_array(category_scores):
+    """Pack a category -> score dict into a list in CATEGORIES order"""
+    return [float(category_scores.get(category, 0.0)) for category in CATEGORIES]
+
+
+class ScoreRecorder:
+    """Buffers moderation scores and writes them to automod_scores in batches
+
+    Outcomes from the alert buttons are applied to the buffered row when it
+    hasn't been written yet, otherwise to the stored one.
+    """
+
+    def __init__(self, db, logger, flush_interval=10, max_buffer=500):
+        self.db = db
+        self.logger = logger
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+
+        self._buffer = []
+        # (message_id, source) -> buffered row, for outcomes that arrive before the flush
+        self._buffered = {}
+        self._flush_handle = None
+        self._tasks = set()
+        self.written = 0
+
+    def record(self, message, verdict, flagged, source, features=None):
+        """Queue the scores (and hashed text features, for the local classifier) of a moderated message"""
+        row = [message.guild.id, message.channel.id, message.id, message.author.id, source,
+               scores_to_array(verdict.category_scores), flagged, None, features]
+        self._buffer.append(row)
+        self._buffered[(message.id, source)] = row
+
+        if len(self._buffer) >= self.max_buffer:
+            self.flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+
+    async def set_outcome(self, message_id, outcome):
+        """Record what a moderator did with an alert"""
+        pending = [row for (buffered_id, _), row in self._buffered.items() if buffered_id == message_id]
+        for row in pending:
+            row[7] = outcome
+        if pending:
+            return
+
+        await asyncio.to_thread(self._update_outcome, message_id, outcome)
+
+    def flush(self):
+        """Write everything buffered so far in the background"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._buffer:
+            return
+
+        rows, self._buffer = self._buffer, []
+        task = asyncio.create_task(self._write(rows))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _write(self, rows):
+        await asyncio.to_thread(self._insert, rows)
+        for row in rows:
+            self._buffered.pop((row[2], row[4]), None)
+
+    def _insert(self, rows):
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                execute_values(cursor, '''
+                INSERT INTO automod_scores (guild_id, channel_id, message_id, user_id, source,
+                                            scores, flagged, outcome, features)
+                VALUES %s
+                ''', rows)
+                conn.commit()
+                self.written += len(rows)
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error writing {len(rows)} automod scores: {e}")
+        finally:
+            self.db.release_connection(conn)
+
+    def _update_outcome(self, message_id, outcome):
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                UPDATE automod_scores SET outcome = %s WHERE message_id = %s
+                ''', (outcome, message_id))
+                conn.commit()
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error recording outcome for message {message_id}: {e}")
+        finally:
+            self.db.release_connection(conn)
+
+    def load_training_rows(self, days):
+        """Load (features, flagged) rows from all guilds for training the local classifier"""
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                SELECT features, flagged FROM automod_scores
+                WHERE features IS NOT NULL AND created_at >= NOW() - %s * INTERVAL '1 day'
+                ''', (days,))
+                return cursor.fetchall()
+        except Exception as e:
+            self.logger.error(f"Database error loading classifier training rows: {e}")
+            return []
+        finally:
+            self.db.release_connection(conn)
+
+    def load_history(self, guild_id, days):
+        """Load (scores, outcomes) rows for a guild from the last `days` days"""
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                SELECT scores, outcome FROM automod_scores
+                WHERE guild_id = %s AND created_at >= NOW() - %s * INTERVAL '1 day'
+                ''', (guild_id, days))
+                return cursor.fetchall()
+        except Exception as e:
+            self.logger.error(f"Database error loading automod score history: {e}")
+            return []
+        finally:
+            self.db.release_connection(conn)
+
+
+def sweep_thresholds(rows, thresholds):
+    """Evaluate candidate thresholds for every category at once
+
+    Returns a dict of (categories x thresholds) arrays with alert volume,
+    precision over reviewed alerts and recall over confirmed positives,
+    plus the number of reviewed rows and positives.
+    """
+    import numpy as np
+
+    scores = np.array([row[0][:len(CATEGORIES)] for row in rows], dtype=np.float32)
+    outcomes = np.array([row[1] or "" for row in rows])
+    positives = np.isin(outcomes, POSITIVE_OUTCOMES)
+    reviewed = outcomes != ""
+    thresholds = np.asarray(thresholds, dtype=np.float32)
+
+    # Sort each category's scores once, then every threshold is a binary search
+    # and counts above it come from suffix sums instead of a messages x thresholds matrix
+    order = np.argsort(scores, axis=0)
+    sorted_scores = np.take_along_axis(scores, order, axis=0)
+    zeros = np.zeros((1, scores.shape[1]), dtype=np.int64)
+    positive_suffix = np.vstack([np.cumsum(positives[order][::-1], axis=0)[::-1], zeros])
+    reviewed_suffix = np.vstack([np.cumsum(reviewed[order][::-1], axis=0)[::-1], zeros])
+
+    # Index of the first score >= threshold, per (threshold, category)
+    starts = np.stack([np.searchsorted(sorted_scores[:, i], thresholds, side="left")
+                       for i in range(scores.shape[1])], axis=1)
+    volume = (len(scores) - starts).T
+    true_positives = np.take_along_axis(positive_suffix, starts, axis=0).T
+    reviewed_alerts = np.take_along_axis(reviewed_suffix, starts, axis=0).T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(reviewed_alerts > 0, true_positives / reviewed_alerts, np.nan)
+        recall = true_positives / positives.sum() if positives.any() else np.full(volume.shape, np.nan)
+
+    return {
+        "thresholds": thresholds,
+        "volume": volume,
+        "precision": precision,
+        "recall": recall,
+        "reviewed": int(reviewed.sum()),
+        "positives": int(positives.sum())
+    }
@@ -0,0 +1,207 @@
+import asyncio
+import disnake
+import heapq
+
+
+def trigrams(text):
+    """Padded trigrams like pg_trgm's, so one and two letter queries still match"""
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def user_names(user):
+    """Lowercased names a moderator might type for a user"""
+    names = {user.name.lower(), str(user).lower()}
+    global_name = getattr(user, "global_name", None)
+    if global_name:
+        names.add(global_name.lower())
+    return names
+
+
+class GuildBans:
+    """One guild's bans by user ID, plus a trigram index over their names"""
+
+    def __init__(self):
+        self.users = {}
+        self.reasons = {}
+        # user_id -> (lowercased names, trigram count of the shortest name)
+        self.names = {}
+        self.grams = {}
+        self.loaded = False
+        # Unbans seen while the ban list was still downloading
+        self.removed_while_loading = set()
+        # Bans from gateway events, which don't include the reason
+        self.unknown_reasons = set()
+
+    def add(self, user, reason=None):
+        if user.id in self.users:
+            self.remove(user.id)
+        self.users[user.id] = user
+        self.reasons[user.id] = reason
+        self.unknown_reasons.discard(user.id)
+        names = user_names(user)
+        self.names[user.id] = (names, min(len(trigrams(name)) for name in names))
+        for name in names:
+            for gram in trigrams(name):
+                self.grams.setdefault(gram, set()).add(user.id)
+
+    def remove(self, user_id):
+        self.users.pop(user_id, None)
+        self.reasons.pop(user_id, None)
+        self.unknown_reasons.discard(user_id)
+        names, _ = self.names.pop(user_id, ((), 0))
+        for name in names:
+            for gram in trigrams(name):
+                ids = self.grams.get(gram)
+                if ids is not None:
+                    ids.discard(user_id)
+                    if not ids:
+                        del self.grams[gram]
+
+    def search(self, query, limit=5):
+        """Rank banned users by name similarity to query, best first
+
+        Returns (score, user) pairs. Candidates come from the trigram index
+        and are scored by trigram overlap (Dice coefficient). An exact name
+        scores 1.0, names containing the query score at least 0.5 and
+        merely similar names below that, so "bob" prefers "bob", then
+        "bobby", then "bo_b".
+        """
+        query = query.lower().strip()
+        if not query:
+            return []
+        query_grams = trigrams(query)
+        postings = [self.grams[gram] for gram in query_grams if gram in self.grams]
+        # Common trigrams (" us", "use") can match most of a big ban list, so
+        # candidates come from the rarer ones when the query has any
+        rare = [ids for ids in postings if len(ids) <= max(100, len(self.users) // 10)]
+        candidates = set().union(*(rare or postings))
+
+        results = []
+        for user_id in candidates:
+            count = sum(user_id in ids for ids in postings)
+            names, name_grams = self.names[user_id]
+            if query in names:
+                score = 1.0
+            else:
+                similarity = min(2 * count / (len(query_grams) + name_grams), 0.99)
+                # Names containing the query rank above merely similar ones
+                contains = any(query in name for name in names)
+                score = (0.5 if contains else 0.0) + similarity / 2
+            results.append((score, user_id))
+
+        best = heapq.nsmallest(limit, results, key=lambda result: (-result[0], result[1]))
+        return [(score, self.users[user_id]) for score, user_id in best]
+
+
+class BanIndex:
+    """Per-guild ban lists, downloaded once and kept current from ban events
+
+    Lookups by ID are a dict hit and name searches go through a trigram
+    index, so unbanning doesn't download the whole ban list every time.
+    """
+
+    def __init__(self, bot, logger):
+        self.logger = logger
+        self._guilds = {}
+        self._loading = {}
+        self.loads = 0
+
+        bot.add_listener(self.on_member_ban, "on_member_ban")
+        bot.add_listener(self.on_member_unban, "on_member_unban")
+        bot.add_listener(self.on_guild_remove, "on_guild_remove")
+
+    async def get_guild(self, guild):
+        """Get a guild's bans, downloading them the first time"""
+        bans = self._guilds.get(guild.id)
+        if bans is not None and bans.loaded:
+            return bans
+
+        task = self._loading.get(guild.id)
+        if task is None:
+            task = self._loading[guild.id] = asyncio.create_task(self._load(guild))
+            task.add_done_callback(lambda _: self._loading.pop(guild.id, None))
+        return await asyncio.shield(task)
+
+    async def _load(self, guild):
+        # Registered before downloading so ban events during the download aren't lost
+        bans = self._guilds[guild.id] = GuildBans()
+        try:
+            async for entry in guild.bans(limit=None):
+                if entry.user.id not in bans.removed_while_loading:
+                    bans.add(entry.user, entry.reason)
+        except Exception:
+            self._guilds.pop(guild.id, None)
+            raise
+
+        bans.loaded = True
+        bans.removed_while_loading.clear()
+        self.loads += 1
+        self.logger.debug(f"Indexed {len(bans.users)} bans in guild {guild.id}")
+        return bans
+
+    async def get(self, guild, user_id):
+        """The banned user with this ID and the ban reason, or (None, None)"""
+        user = (await self.get_guild(guild)).users.get(user_id)
+        if user is None:
+            return None, None
+        return user, await self.get_reason(guild, user_id)
+
+    async def get_reason(self, guild, user_id):
+        """A ban's reason, fetched the first time for bans seen as gateway events
+
+        Drops the ban if Discord no longer has it (an unban missed while disconnected).
+        """
+        bans = await self.get_guild(guild)
+        if user_id in bans.unknown_reasons:
+            try:
+                entry = await guild.fetch_ban(disnake.Object(id=user_id))
+            except disnake.NotFound:
+                bans.remove(user_id)
+                return None
+            bans.reasons[user_id] = entry.reason
+            bans.unknown_reasons.discard(user_id)
+        return bans.reasons.get(user_id)
+
+    def forget(self, guild_id, user_id):
+        """Drop a ban that turned out not to exist anymore"""
+        bans = self._guilds.get(guild_id)
+        if bans is not None:
+            bans.remove(user_id)
+
+    async def search(self, guild, query, limit=5):
+        bans = await self.get_guild(guild)
+        return bans.search(query, limit)
+
+    async def on_member_ban(self, guild, user):
+        bans = self._guilds.get(guild.id)
+        if bans is not None:
+            bans.removed_while_loading.discard(user.id)
+            bans.add(user)
+            bans.unknown_reasons.add(user.id)
+
+    async def on_member_unban(self, guild, user):
+        bans = self._guilds.get(guild.id)
+        if bans is not None:
+            bans.remove(user.id)
+            if not bans.loaded:
+                bans.removed_while_loading.add(user.id)
+
+    async def on_guild_remove(self, guild):
+        self._guilds.pop(guild.id, None)
+
+    def stats(self):
+        return {
+            "guilds": len(self._guilds),
+            "bans": sum(len(bans.users) for bans in self._guilds.values()),
+            "loads": self.loads
+        }
+
+
+def get_ban_index(bot):
+    """Get the bot's shared ban index, creating it on first use"""
+    index = getattr(bot, "ban_index", None)
+    if index is None:
+        index = BanIndex(bot, bot.dev_logger.getChild("BanIndex"))
+        bot.ban_index = index
+    return index
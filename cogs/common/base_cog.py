@@ -1,5 +1,6 @@
 import disnake
 from disnake.ext import commands
+from cogs.common.staff_index import get_staff_index
 
 class BaseCog(commands.Cog):
     """Base class for all cogs with common functionality"""
@@ -28,17 +29,12 @@ class BaseCog(commands.Cog):
         
     def has_mod_role(self, member):
         """Check if a member has the moderator role"""
-        if not member or not member.guild:
+        if not member:
             return False
-            
-        config = getattr(self.bot, 'config', {}).get("automod", {})
-        mod_role_id = config.get("mod_role_id")
-        
-        if not mod_role_id:
-            return False
-            
-        mod_role = member.guild.get_role(mod_role_id)
-        if not mod_role:
+        return get_staff_index(self.bot).is_mod(member)
+
+    def is_staff(self, member):
+        """Check if a member is staff (mod or staff role, administrator or owner)"""
+        if not member:
             return False
-            
-        return mod_role in member.roles
\ No newline at end of file
+        return get_staff_index(self.bot).is_staff(member)
\ No newline at end of file
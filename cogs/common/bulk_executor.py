@@ -0,0 +1,141 @@
+import asyncio
+import time
+from collections import Counter
+import disnake
+
+
+class BulkExecutor:
+    """Runs many Discord API calls concurrently, bounded per rate-limit bucket
+
+    Calls that share a route (unbans, member edits, role removals) share a
+    bucket with its own concurrency limit. A 429 that makes it past
+    disnake's own retries pauses the whole bucket for retry_after before
+    the call is tried again.
+    """
+
+    def __init__(self, logger, concurrency=4, max_retries=2):
+        self.logger = logger
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._semaphores = {}
+        self._paused_until = {}
+        self.rate_limited = 0
+
+    async def submit(self, bucket, call):
+        """Run call() within its bucket's limits, retrying when rate limited"""
+        semaphore = self._semaphores.get(bucket)
+        if semaphore is None:
+            semaphore = self._semaphores[bucket] = asyncio.Semaphore(self.concurrency)
+
+        for attempt in range(self.max_retries + 1):
+            async with semaphore:
+                delay = self._paused_until.get(bucket, 0) - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                try:
+                    return await call()
+                except disnake.HTTPException as e:
+                    if e.status != 429 or attempt == self.max_retries:
+                        raise
+                    retry_after = float(getattr(e, "retry_after", None) or 1.0)
+                    self._paused_until[bucket] = time.monotonic() + retry_after
+                    self.rate_limited += 1
+                    self.logger.warning(f"Rate limited in bucket {bucket}, pausing {retry_after:.1f}s")
+
+    async def run(self, jobs, on_result=None):
+        """Run (bucket, label, call) jobs concurrently, reporting each (label, error) as it finishes"""
+        async def run_job(bucket, label, call):
+            try:
+                await self.submit(bucket, call)
+                error = None
+            except Exception as e:
+                error = e
+            if on_result:
+                await on_result(label, error)
+            return label, error
+
+        return await asyncio.gather(*(run_job(*job) for job in jobs))
+
+
+class BulkStatus:
+    """A single status message for a batch of actions, edited as results come in
+
+    Edits are coalesced to at most one per edit_interval so a large batch
+    doesn't hit the message edit rate limit.
+    """
+
+    def __init__(self, channel, title, edit_interval=1.5, max_failures_shown=10):
+        self.channel = channel
+        self.title = title
+        self.edit_interval = edit_interval
+        self.max_failures_shown = max_failures_shown
+
+        self.message = None
+        self.expected = 0
+        self.done = Counter()
+        self.failures = []
+        self._last_edit = 0.0
+        self._edit_handle = None
+        self._tasks = set()
+        self._lock = asyncio.Lock()
+
+    @property
+    def completed(self):
+        return sum(self.done.values()) + len(self.failures)
+
+    def render(self):
+        progress = "done" if self.completed >= self.expected else f"{self.completed}/{self.expected}"
+        lines = [f"**{self.title}** ({progress})"]
+        lines += [f"✅ {label}: {count}" for label, count in self.done.items()]
+        if self.failures:
+            lines.append(f"❌ Failed: {len(self.failures)}")
+            lines += [f"- {failure}" for failure in self.failures[:self.max_failures_shown]]
+            if len(self.failures) > self.max_failures_shown:
+                lines.append(f"- ...and {len(self.failures) - self.max_failures_shown} more")
+        return "\n".join(lines)[:2000]
+
+    async def start(self, expected):
+        """Add expected results, posting the status message the first time"""
+        self.expected += expected
+        async with self._lock:
+            if self.message is None:
+                self.message = await self.channel.send(self.render())
+                self._last_edit = time.monotonic()
+                return
+        self.schedule_edit()
+
+    def add(self, label, failure=None):
+        """Record one result, `failure` describes what went wrong if it failed"""
+        if failure:
+            self.failures.append(failure)
+        else:
+            self.done[label] += 1
+        self.schedule_edit()
+
+    def schedule_edit(self):
+        if self._edit_handle is not None or self.message is None:
+            return
+        delay = max(0.0, self._last_edit + self.edit_interval - time.monotonic())
+        self._edit_handle = asyncio.get_running_loop().call_later(delay, self._start_edit)
+
+    def _start_edit(self):
+        task = asyncio.create_task(self._edit())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def finish(self):
+        """Show the final state right away instead of waiting for the next coalesced edit"""
+        if self._edit_handle is not None:
+            self._edit_handle.cancel()
+        await self._edit()
+
+    async def _edit(self):
+        self._edit_handle = None
+        if self.message is None:
+            return
+        async with self._lock:
+            self._last_edit = time.monotonic()
+            try:
+                await self.message.edit(content=self.render())
+            except disnake.HTTPException:
+                pass  # Status message was deleted
@@ -0,0 +1,65 @@
+from collections import Counter
+
+SEPARATOR = ":"
+# Discord's limit on custom_id length
+MAX_CUSTOM_ID = 100
+
+
+def make_custom_id(prefix, *args):
+    """Encode a handler prefix and its arguments into a button custom_id"""
+    custom_id = SEPARATOR.join([prefix, *map(str, args)])
+    if len(custom_id) > MAX_CUSTOM_ID:
+        raise ValueError(f"custom_id too long ({len(custom_id)} > {MAX_CUSTOM_ID}): {custom_id}")
+    return custom_id
+
+
+class ComponentRouter:
+    """Dispatches button clicks to handlers by custom_id prefix
+
+    Buttons are sent as plain components instead of Views, so nothing is
+    kept in memory per message and clicks still work after a restart.
+    Handlers get the interaction plus the custom_id arguments as strings
+    and rehydrate whatever state they need.
+    """
+
+    def __init__(self, bot, logger):
+        self.logger = logger
+        self._handlers = {}
+        self.clicks = Counter()
+        self.unhandled = 0
+        bot.add_listener(self.on_button_click, "on_button_click")
+
+    def register(self, prefix, handler):
+        if SEPARATOR in prefix:
+            raise ValueError(f"Prefix can't contain '{SEPARATOR}': {prefix}")
+        self._handlers[prefix] = handler
+
+    def unregister(self, prefix):
+        self._handlers.pop(prefix, None)
+
+    async def on_button_click(self, interaction):
+        custom_id = interaction.component.custom_id or ""
+        prefix, *args = custom_id.split(SEPARATOR)
+
+        handler = self._handlers.get(prefix)
+        if handler is None:
+            # Buttons from Views (or an unloaded cog) are handled elsewhere
+            self.unhandled += 1
+            return
+
+        self.clicks[prefix] += 1
+        try:
+            await handler(interaction, *args)
+        except Exception as e:
+            self.logger.error(f"Error handling button {custom_id}: {e}", exc_info=True)
+            if not interaction.response.is_done():
+                await interaction.response.send_message("Something went wrong handling that button.", ephemeral=True)
+
+
+def get_component_router(bot):
+    """Get the bot's shared component router, creating it on first use"""
+    router = getattr(bot, "component_router", None)
+    if router is None:
+        router = ComponentRouter(bot, bot.dev_logger.getChild("ComponentRouter"))
+        bot.component_router = router
+    return router
@@ -1,7 +1,11 @@
 import psycopg2
 from psycopg2 import pool
 import os
+import logging
 from dotenv import load_dotenv
+from cogs.common.migrator import Migrator
+
+logger = logging.getLogger('retardibot').getChild('DBManager')
 
 class DBManager:
     """PostgreSQL Database connection manager"""
@@ -20,8 +24,8 @@ class DBManager:
             cls._instance.db_user = os.getenv("DB_USER", "retardibot_user")
             cls._instance.db_password = os.getenv("DB_PASSWORD", "")
             
-            # Create connection pool
-            cls._instance.pool = pool.SimpleConnectionPool(
+            # Create connection pool, threaded since helpers run in asyncio.to_thread workers
+            cls._instance.pool = pool.ThreadedConnectionPool(
                 1,  # Min connections
                 10,  # Max connections
                 host=cls._instance.db_host,
@@ -31,8 +35,13 @@ class DBManager:
                 password=cls._instance.db_password
             )
             
-            # Initialize tables
-            cls._instance._initialize_tables()
+            # Apply schema migrations, a failed one leaves no half-initialized instance behind
+            try:
+                cls._instance._initialize_tables()
+            except Exception:
+                cls._instance.pool.closeall()
+                cls._instance = None
+                raise
             
         return cls._instance
     
@@ -41,102 +50,20 @@ class DBManager:
         return self.pool.getconn()
     
     def release_connection(self, conn):
-        """Return a connection to the pool"""
-        self.pool.putconn(conn)
+        """Return a connection to the pool, None (when getting one failed) is ignored"""
+        if conn is not None:
+            self.pool.putconn(conn)
     
     def _initialize_tables(self):
-        """Initialize all database tables"""
+        """Bring the schema up to date by applying pending migrations"""
         conn = self.get_connection()
         try:
-            with conn.cursor() as cursor:
-                # Create schema with all tables
-                
-                # 1. Moderation tables
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS mod_actions (
-                    id SERIAL PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    moderator_id BIGINT NOT NULL,
-                    action_type TEXT NOT NULL,
-                    reason TEXT,
-                    duration INTEGER,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
-                
-                # 2. Confessions tables
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS confessions (
-                    id SERIAL PRIMARY KEY,
-                    message_id BIGINT,
-                    user_id BIGINT NOT NULL,
-                    content TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    is_deleted BOOLEAN DEFAULT FALSE
-                )
-                ''')
-                
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS confession_bans (
-                    user_id BIGINT PRIMARY KEY,
-                    banned_by BIGINT NOT NULL,
-                    reason TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
-                
-                # 3. Logging tables
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS message_logs (
-                    id SERIAL PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    channel_id BIGINT NOT NULL,
-                    message_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    content TEXT,
-                    attachments JSONB,
-                    embeds JSONB,
-                    action_type TEXT NOT NULL,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
-                
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS user_logs (
-                    id SERIAL PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    user_id BIGINT NOT NULL,
-                    action_type TEXT NOT NULL,
-                    details JSONB,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
-                
-                cursor.execute('''
-                CREATE TABLE IF NOT EXISTS server_logs (
-                    id SERIAL PRIMARY KEY,
-                    guild_id BIGINT NOT NULL,
-                    action_type TEXT NOT NULL,
-                    target_id BIGINT,
-                    details JSONB,
-                    user_id BIGINT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                ''')
-                
-                # Add indexes for better performance
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_mod_actions_user_id ON mod_actions(user_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_mod_actions_guild_id ON mod_actions(guild_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_confessions_user_id ON confessions(user_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_message_logs_guild_id ON message_logs(guild_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_logs_user_id ON user_logs(user_id)')
-                cursor.execute('CREATE INDEX IF NOT EXISTS idx_server_logs_guild_id ON server_logs(guild_id)')
-                
-                conn.commit()
-                
+            applied = Migrator(conn, logger).migrate()
+            if applied:
+                logger.info(f"Database schema migrated to version {applied[-1]}")
         except Exception as e:
             conn.rollback()
-            print(f"Error initializing database tables: {e}")
+            logger.critical(f"Error migrating database schema: {e}")
+            raise
         finally:
-            self.release_connection(conn)
\ No newline at end of file
+            self.release_connection(conn)
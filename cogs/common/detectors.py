@@ -0,0 +1,176 @@
+import json
+import re
+import time
+
+# Moderation command keywords and other bots' prefixes watched by BotLoyaltyCog
+MOD_COMMAND_KEYWORDS = [
+    "ban", "kick", "mute", "timeout", "warn", "unban", "unmute",
+    "untimeout", "clear", "purge", "delete", "lock", "unlock"
+]
+BOT_PREFIXES = ["!", "?", ".", "-", "$", "~", ";", ">", "<", "|", "+"]
+
+DEFAULT_CORPUS = "scripts/fixtures/detector_corpus.jsonl"
+
+
+def trie_pattern(words, whole_words=False):
+    """Build a regex matching any of the words, with shared prefixes factored out
+
+    "sus", "sussy" and "sex" become s(?:ex|us(?:sy)?), so the regex engine
+    tries each character once instead of every alternative in turn.
+    Longer words win over their prefixes. With whole_words, a word ending in
+    a letter or digit only matches where the message's word ends too, so
+    "sus" doesn't match "suspension" but "step-" still matches "step-brother".
+    """
+    root = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node, last_char=""):
+        end = r"(?!\w)" if whole_words and (last_char.isalnum() or last_char == "_") else ""
+        branches = [re.escape(char) + build(child, char) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return end
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if "" not in node:
+            return body
+        return f"(?:{body}|{end})" if end else f"(?:{body})?"
+
+    pattern = build(root)
+    return fr"(?<!\w){pattern}" if whole_words else pattern
+
+
+class CommandDetector:
+    """Detects moderation commands meant for another bot in a single regex pass
+
+    Matches prefix commands like `!ban` and `/ban` typed as text. When the
+    message mentions another bot, any moderation keyword anywhere counts.
+    """
+
+    def __init__(self, prefixes=BOT_PREFIXES, keywords=MOD_COMMAND_KEYWORDS):
+        prefix_class = "".join(re.escape(prefix) for prefix in prefixes)
+        keywords_pattern = trie_pattern([keyword.lower() for keyword in keywords])
+        self.command_re = re.compile(fr"(?:[{prefix_class}]|/)(?:{keywords_pattern})\b", re.IGNORECASE)
+        # Substring matches, like the `keyword in content` check it replaces. Content is
+        # lowercased first, IGNORECASE makes unanchored searches several times slower
+        self.keyword_re = re.compile(keywords_pattern)
+
+    def match(self, content, mentions_other_bot=False):
+        """Return the matched command or keyword, or None"""
+        found = self.command_re.match(content)
+        if found:
+            return found.group(0)
+        if mentions_other_bot:
+            found = self.keyword_re.search(content.lower())
+            if found:
+                return found.group(0)
+        return None
+
+
+class TriggerWordDetector:
+    """Finds reaction trigger words in a message with one combined regex
+
+    Only whole words count, so "sus" doesn't fire on "suspension" or "cock"
+    on "cocktails". Variants like "sussy" need their own entry.
+    """
+
+    def __init__(self, words):
+        # An empty word would match every message
+        self.words = [word.lower() for word in words if word.strip()]
+        self.word_re = re.compile(trie_pattern(self.words, whole_words=True)) if self.words else None
+
+    def match(self, content):
+        """Return the trigger words found in content (non-overlapping), or an empty list"""
+        if self.word_re is None:
+            return []
+        return self.word_re.findall(content.lower())
+
+
+def load_corpus(path=DEFAULT_CORPUS):
+    """Load labeled samples from a JSONL file
+
+    Each line is {"text": ..., "labels": [detector names that should fire]}
+    with an optional "mentions_bot" flag for messages that mention another bot.
+    """
+    samples = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            sample = json.loads(line)
+            if "text" not in sample:
+                raise ValueError(f"{path}:{line_number}: sample has no text")
+            sample.setdefault("labels", [])
+            samples.append(sample)
+    return samples
+
+
+class DetectorEngine:
+    """Runs named detectors over samples and reports accuracy and speed"""
+
+    def __init__(self):
+        self.detectors = {}
+
+    def register(self, name, detect, label=None):
+        """Add a detector, detect(sample) returns something truthy when it fires
+
+        Samples are scored against `label` (the name by default), so
+        alternative implementations can be checked against the same labels.
+        """
+        self.detectors[name] = (detect, label or name)
+
+    def run(self, name, sample):
+        """Run one detector on one sample, returning (result, nanoseconds)"""
+        detect, _ = self.detectors[name]
+        start = time.perf_counter_ns()
+        result = detect(sample)
+        return result, time.perf_counter_ns() - start
+
+    def evaluate(self, samples, repeat=20):
+        """Score every detector against the corpus labels
+
+        Returns {name: report} with true/false positive and negative counts,
+        the misclassified texts and the average nanoseconds per message.
+        """
+        reports = {}
+        for name, (detect, label) in self.detectors.items():
+            report = {"tp": 0, "fp": 0, "tn": 0, "fn": 0, "false_positives": [], "false_negatives": []}
+            for sample in samples:
+                fired = bool(detect(sample))
+                expected = label in sample["labels"]
+                if fired and expected:
+                    report["tp"] += 1
+                elif fired:
+                    report["fp"] += 1
+                    report["false_positives"].append(sample["text"])
+                elif expected:
+                    report["fn"] += 1
+                    report["false_negatives"].append(sample["text"])
+                else:
+                    report["tn"] += 1
+
+            # Timed separately so the bookkeeping above doesn't count
+            start = time.perf_counter_ns()
+            for _ in range(repeat):
+                for sample in samples:
+                    detect(sample)
+            elapsed = time.perf_counter_ns() - start
+            report["ns_per_message"] = elapsed / (repeat * len(samples)) if samples else 0.0
+
+            reports[name] = report
+        return reports
+
+
+def build_engine(config):
+    """Engine with the loyalty and reaction detectors as configured"""
+    command_detector = CommandDetector()
+    trigger_detector = TriggerWordDetector(config.get("reaction", {}).get("trigger_words", []))
+
+    engine = DetectorEngine()
+    engine.register("loyalty_command",
+                    lambda sample: command_detector.match(sample["text"], sample.get("mentions_bot", False)))
+    engine.register("reaction", lambda sample: trigger_detector.match(sample["text"]))
+    return engine
@@ -0,0 +1,25 @@
+# Seconds per duration unit, as typed in commands like `timeout @user 1d2h30m`
+UNITS = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+
+
+def parse_duration(duration):
+    """Parse combinations like 1d, 2h, 30m, 45s or 1d2h30m into seconds, 0 if invalid"""
+    total_seconds = 0
+    current_num = ""
+    for char in duration:
+        if char.isdigit():
+            current_num += char
+        elif char in UNITS and current_num:
+            total_seconds += int(current_num) * UNITS[char]
+            current_num = ""
+    return total_seconds
+
+
+def format_duration(seconds):
+    """Format seconds like 1d 2h 30m"""
+    parts = []
+    for unit, size in UNITS.items():
+        amount, seconds = divmod(seconds, size)
+        if amount > 0:
+            parts.append(f"{amount}{unit}")
+    return " ".join(parts)
@@ -0,0 +1,68 @@
+import re
+from collections import OrderedDict, Counter
+from difflib import SequenceMatcher
+from cogs.common.verdict_cache import normalize_content, strip_invisible
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(content):
+    return set(_TOKEN_RE.findall(strip_invisible(content)))
+
+
+class EditTracker:
+    """Remembers what was last moderated per message to decide if an edit needs another look
+
+    Edits are re-moderated when they add any token that wasn't in the
+    moderated text, even one letter away from a removed word ("bill" to
+    "kill"), or remove one, since dropping a "not" can flip the meaning.
+    Edits that keep the same words are re-moderated when the normalized text
+    changed by at least min_change_ratio, so unfurl edits, punctuation and
+    reformatting are skipped.
+    """
+
+    def __init__(self, max_size=10000, min_change_ratio=0.3):
+        self.max_size = max_size
+        self.min_change_ratio = min_change_ratio
+        self._messages = OrderedDict()
+        self.decisions = Counter()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def remember(self, message_id, content):
+        """Record the content that was moderated for a message"""
+        self._messages[message_id] = (normalize_content(content), tokenize(content))
+        self._messages.move_to_end(message_id)
+
+        while len(self._messages) > self.max_size:
+            self._messages.popitem(last=False)
+
+    def forget(self, message_id):
+        self._messages.pop(message_id, None)
+
+    def check(self, message_id, content):
+        """Decide whether an edit needs re-moderation, returning (recheck, reason)"""
+        entry = self._messages.get(message_id)
+        if entry is None:
+            reason, recheck = "untracked", True
+        else:
+            old_normalized, old_tokens = entry
+            normalized = normalize_content(content)
+
+            tokens = tokenize(content)
+            if normalized == old_normalized:
+                reason, recheck = "unchanged", False
+            elif tokens - old_tokens:
+                reason, recheck = "new_tokens", True
+            elif old_tokens - tokens:
+                reason, recheck = "removed_tokens", True
+            else:
+                matcher = SequenceMatcher(None, old_normalized, normalized, autojunk=False)
+                # quick_ratio is an upper bound on similarity, skip the full diff when it's already decisive
+                changed = (1 - matcher.quick_ratio() >= self.min_change_ratio
+                           or 1 - matcher.ratio() >= self.min_change_ratio)
+                reason, recheck = ("changed", True) if changed else ("minor_edit", False)
+
+        self.decisions[reason] += 1
+        return recheck, reason
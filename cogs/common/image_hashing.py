@@ -0,0 +1,118 @@
+import hashlib
+import io
+from collections import OrderedDict
+
+# Pillow is optional, without it images are only deduplicated by exact content
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+HASH_BITS = 64
+
+
+def content_hash(data):
+    """Hash raw image bytes, identical files share a hash"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def perceptual_hash(data):
+    """64-bit difference hash (dHash) of an image, or None if it can't be computed
+
+    Resized, recompressed or re-encoded copies of an image end up within a
+    few bits of each other.
+    """
+    if Image is None:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            # Let JPEG decode at reduced size, we only need a 9x8 thumbnail
+            image.draft("L", (64, 64))
+            pixels = list(image.convert("L").resize((9, 8), Image.BILINEAR).getdata())
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hash_image(data):
+    """Compute (content_hash, perceptual_hash) for image bytes"""
+    return content_hash(data), perceptual_hash(data)
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+class PerceptualIndex:
+    """Bounded near-duplicate index from perceptual hashes to cache keys
+
+    Hashes are split into max_distance + 1 chunks. Two hashes within
+    max_distance bits must agree on at least one whole chunk, so lookups
+    only compare against hashes sharing a chunk instead of the whole index.
+    """
+
+    def __init__(self, max_size=5000, max_distance=4):
+        self.max_size = max_size
+        self.max_distance = max_distance
+
+        chunks = max_distance + 1
+        width = HASH_BITS // chunks
+        # (shift, mask) per chunk, the last chunk takes any leftover bits
+        self._chunks = []
+        for i in range(chunks):
+            bits = width if i < chunks - 1 else HASH_BITS - width * (chunks - 1)
+            self._chunks.append((i * width, (1 << bits) - 1))
+
+        self._keys = OrderedDict()
+        self._buckets = [{} for _ in self._chunks]
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _parts(self, phash):
+        return [(phash >> shift) & mask for shift, mask in self._chunks]
+
+    def find(self, phash):
+        """Get the cache key of the closest indexed hash within max_distance, or None"""
+        if phash in self._keys:
+            self._keys.move_to_end(phash)
+            return self._keys[phash]
+
+        best, best_distance = None, self.max_distance + 1
+        for bucket, part in zip(self._buckets, self._parts(phash)):
+            for candidate in bucket.get(part, ()):
+                distance = hamming(phash, candidate)
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+
+        if best is None:
+            return None
+
+        self._keys.move_to_end(best)
+        return self._keys[best]
+
+    def add(self, phash, key):
+        """Index a perceptual hash, evicting the least recently used entries"""
+        if phash not in self._keys:
+            for bucket, part in zip(self._buckets, self._parts(phash)):
+                bucket.setdefault(part, set()).add(phash)
+
+        self._keys[phash] = key
+        self._keys.move_to_end(phash)
+
+        while len(self._keys) > self.max_size:
+            old, _ = self._keys.popitem(last=False)
+            for bucket, part in zip(self._buckets, self._parts(old)):
+                entries = bucket.get(part)
+                if entries:
+                    entries.discard(old)
+                    if not entries:
+                        del bucket[part]
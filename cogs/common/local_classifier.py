@@ -0,0 +1,204 @@
+import os
+import random
+import re
+import zlib
+from collections import deque
+from cogs.common.verdict_cache import strip_invisible, normalize_content
+
+_WORD_RE = re.compile(r"\w+")
+DEFAULT_FEATURES = 2 ** 18
+
+
+def hash_features(content, n_features=DEFAULT_FEATURES):
+    """Hash word unigrams, bigrams and character trigrams into sorted feature indices
+
+    crc32 is used instead of hash() so indices are stable across restarts.
+    Character trigrams run over the normalized text, which keeps spacing and
+    repetition tricks close to the original.
+    """
+    words = _WORD_RE.findall(strip_invisible(content))
+    normalized = normalize_content(content)
+
+    grams = [f"w:{word}" for word in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    grams += [f"c:{normalized[i:i + 3]}" for i in range(max(0, len(normalized) - 2))]
+
+    return sorted({zlib.crc32(gram.encode("utf-8")) % n_features for gram in grams})
+
+
+class LocalClassifier:
+    """Hashed n-gram logistic regression distilled from our own API verdicts
+
+    Predicts the probability that automod would flag a message. Messages
+    below benign_below are cleared locally, everything else still goes to
+    the API. A sample of cleared messages is shadow-checked against the API
+    and the classifier switches itself off if agreement drops.
+    """
+
+    def __init__(self, logger, model_path, benign_below=0.02, shadow_rate=0.05,
+                 min_agreement=0.98, min_samples=50, window=500):
+        self.logger = logger
+        self.model_path = model_path
+        self.benign_below = benign_below
+        self.shadow_rate = shadow_rate
+        self.min_agreement = min_agreement
+        self.min_samples = min_samples
+
+        self.weights = None
+        self.bias = 0.0
+        self.n_features = DEFAULT_FEATURES
+        self.enabled = False
+        self.fallback_reason = None
+
+        # Rolling shadow-check outcomes, True where the API agreed the message was benign
+        self._shadow = deque(maxlen=window)
+        self.cleared = 0
+        self.sent = 0
+        self.shadow_checks = 0
+        self.disagreements = 0
+
+    @property
+    def active(self):
+        return self.enabled and self.weights is not None
+
+    def load(self):
+        """Load a trained model from disk, returning True if one was found"""
+        if not os.path.exists(self.model_path):
+            return False
+
+        import numpy as np
+        with np.load(self.model_path) as model:
+            self.weights = model["weights"]
+            self.bias = float(model["bias"])
+        self.n_features = len(self.weights)
+        return True
+
+    def save(self):
+        import numpy as np
+        os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+        np.savez_compressed(self.model_path, weights=self.weights, bias=self.bias)
+
+    def predict(self, features):
+        """Probability that a message with these feature indices gets flagged"""
+        import numpy as np
+        z = self.weights[features].sum() + self.bias if features else self.bias
+        return float(1 / (1 + np.exp(-z)))
+
+    def should_skip_api(self, features):
+        """Decide how to handle a message: "clear", "shadow" (clear but verify) or "api" """
+        if not self.active:
+            return "api"
+
+        if self.predict(features) >= self.benign_below:
+            self.sent += 1
+            return "api"
+
+        if random.random() < self.shadow_rate:
+            return "shadow"
+
+        self.cleared += 1
+        return "clear"
+
+    def record_shadow(self, api_flagged):
+        """Record a shadow check, switching the classifier off if agreement drops"""
+        self.shadow_checks += 1
+        self._shadow.append(not api_flagged)
+        if api_flagged:
+            self.disagreements += 1
+
+        agreement = self.agreement()
+        if self.enabled and len(self._shadow) >= self.min_samples and agreement < self.min_agreement:
+            self.enabled = False
+            self.fallback_reason = f"agreement dropped to {agreement:.1%} over {len(self._shadow)} shadow checks"
+            self.logger.warning(f"Local classifier disabled, {self.fallback_reason}")
+
+    def agreement(self):
+        return sum(self._shadow) / len(self._shadow) if self._shadow else 1.0
+
+    def enable(self):
+        self.enabled = True
+        self.fallback_reason = None
+        self._shadow.clear()
+
+    def stats(self):
+        """Classifier metrics for the automod stats command"""
+        decided = self.cleared + self.sent + self.shadow_checks
+        return {
+            "active": self.active,
+            "cleared": self.cleared,
+            "sent": self.sent,
+            "shadow_checks": self.shadow_checks,
+            "disagreements": self.disagreements,
+            "agreement": self.agreement(),
+            "api_reduction": self.cleared / decided if decided else 0.0,
+            "fallback_reason": self.fallback_reason
+        }
+
+
+def train_classifier(rows, n_features=DEFAULT_FEATURES, epochs=10, learning_rate=0.5, l2=1e-6,
+                     batch_size=4096, holdout=0.1, benign_below=0.02, seed=0):
+    """Fit logistic regression on (feature_indices, flagged) rows with mini-batch AdaGrad
+
+    Returns (weights, bias, report) where report describes the holdout split:
+    how many messages would be cleared locally and how many flagged ones
+    would wrongly be among them.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    rows = [row for row in rows if row[0]]
+    order = rng.permutation(len(rows))
+    split = int(len(rows) * (1 - holdout))
+    train_rows = [rows[i] for i in order[:split]]
+    test_rows = [rows[i] for i in order[split:]]
+
+    def pack(subset):
+        # CSR-style layout: all indices concatenated plus per-row offsets
+        lengths = np.array([len(features) for features, _ in subset], dtype=np.int64)
+        indices = np.concatenate([np.asarray(features, dtype=np.int64) % n_features for features, _ in subset])
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        labels = np.array([bool(label) for _, label in subset], dtype=np.float64)
+        return indices, offsets, lengths, labels
+
+    def logits(weights, bias, indices, offsets):
+        return np.add.reduceat(weights[indices], offsets) + bias
+
+    weights = np.zeros(n_features, dtype=np.float64)
+    # AdaGrad gives rare n-grams (most of them) larger steps than common ones
+    accumulated = np.full(n_features, 1e-8)
+    bias_accumulated = 1e-8
+    positives = sum(1 for _, label in train_rows if label)
+    # Flags are rare, weight them up so the model doesn't learn "always benign"
+    pos_weight = min(50.0, (len(train_rows) - positives) / positives) if positives else 1.0
+    bias = float(np.log(max(positives, 1) / max(len(train_rows) - positives, 1)))
+
+    for epoch in range(epochs):
+        rng.shuffle(train_rows)
+        for start in range(0, len(train_rows), batch_size):
+            indices, offsets, lengths, labels = pack(train_rows[start:start + batch_size])
+            probs = 1 / (1 + np.exp(-logits(weights, bias, indices, offsets)))
+            errors = (probs - labels) * np.where(labels > 0, pos_weight, 1.0) / len(labels)
+
+            # Each feature's gradient is the sum of the errors of the rows it appears in
+            gradient = np.bincount(indices, weights=np.repeat(errors, lengths), minlength=n_features)
+            gradient += l2 * weights
+            accumulated += gradient ** 2
+            weights -= learning_rate * gradient / np.sqrt(accumulated)
+            bias_accumulated += errors.sum() ** 2
+            bias -= learning_rate * errors.sum() / np.sqrt(bias_accumulated)
+
+    report = {"train": len(train_rows), "test": len(test_rows), "positives": positives}
+    if test_rows:
+        indices, offsets, _, labels = pack(test_rows)
+        probs = 1 / (1 + np.exp(-logits(weights, bias, indices, offsets)))
+        cleared = probs < benign_below
+        flagged = labels > 0
+        report.update({
+            "cleared_ratio": float(cleared.mean()),
+            # Flagged messages the model would have cleared without asking the API
+            "missed": int((cleared & flagged).sum()),
+            "test_positives": int(flagged.sum()),
+            "agreement": float(1 - (cleared & flagged).sum() / cleared.sum()) if cleared.any() else 1.0
+        })
+
+    return weights, bias, report
@@ -0,0 +1,248 @@
+import asyncio
+import datetime
+import json
+import os
+import threading
+import disnake
+from cogs.common.log_webhooks import LogWebhookManager
+
+
+class LogEvent:
+    """Structured record of a loggable event
+
+    Listeners only collect plain data; the Discord embed is rendered on first
+    access through the renderer, so it is never built when no sink needs it.
+    """
+
+    __slots__ = ("event_type", "guild_id", "data", "timestamp", "user_id",
+                 "channel_id", "target_id", "_renderer", "_embed")
+
+    def __init__(self, event_type, guild_id, data, renderer=None,
+                 user_id=None, channel_id=None, target_id=None):
+        self.event_type = event_type
+        self.guild_id = guild_id
+        self.data = data
+        self.timestamp = datetime.datetime.utcnow()
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.target_id = target_id
+        self._renderer = renderer
+        self._embed = None
+
+    @property
+    def embed(self):
+        """The rendered embed, built once on first access"""
+        if self._embed is None and self._renderer:
+            self._embed = self._renderer(self)
+        return self._embed
+
+    def to_dict(self):
+        """Serializable representation of the event"""
+        return {
+            "event_type": self.event_type,
+            "guild_id": self.guild_id,
+            "user_id": self.user_id,
+            "channel_id": self.channel_id,
+            "target_id": self.target_id,
+            "timestamp": self.timestamp.isoformat(),
+            "data": self.data
+        }
+
+
+class LogSink:
+    """Base class for log destinations"""
+
+    name = None
+    default_enabled = False
+
+    def __init__(self, cog):
+        self.cog = cog
+        self.logger = cog.logger.getChild(self.__class__.__name__)
+
+    def settings(self, guild_id):
+        """Merge global and guild-specific settings for this sink
+
+        A sink setting is either a bool or a table with `enabled` and an
+        optional `events` list restricting which event types it receives.
+        """
+        settings = {"enabled": self.default_enabled, "events": None}
+
+        for source in (self.cog.config.get("sinks", {}),
+                       self.cog.config.get("guild_settings", {}).get(str(guild_id), {}).get("sinks", {})):
+            value = source.get(self.name)
+            if isinstance(value, bool):
+                settings["enabled"] = value
+            elif isinstance(value, dict):
+                settings.update({k: v for k, v in value.items() if k in settings})
+
+        return settings
+
+    def is_enabled(self, guild_id, event_type):
+        """Check if this sink wants an event type for a guild"""
+        settings = self.settings(guild_id)
+        if not settings["enabled"]:
+            return False
+
+        events = settings["events"]
+        return events is None or event_type in events
+
+    async def emit(self, event):
+        """Deliver an event, returning True on success"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the sink"""
+
+
+class ChannelSink(LogSink):
+    """Posts rendered embeds to the log channel through the bot account"""
+
+    name = "channel"
+    default_enabled = True
+
+    async def emit(self, event):
+        channel = await self.cog.get_log_channel(event.guild_id)
+        if not channel or not event.embed:
+            return False
+
+        try:
+            await channel.send(embed=event.embed)
+            return True
+        except (disnake.Forbidden, disnake.HTTPException):
+            return False
+
+
+class WebhookSink(LogSink):
+    """Posts rendered embeds through a managed webhook in the log channel
+
+    Webhooks have their own rate-limit bucket and allow a per-event-type
+    username and avatar.
+    """
+
+    name = "webhook"
+
+    def __init__(self, cog):
+        super().__init__(cog)
+        self.webhooks = LogWebhookManager(cog.bot, self.logger)
+
+    def get_identity(self, event_type):
+        """Get the (username, avatar_url) to post as for an event type"""
+        identities = self.cog.config.get("webhook_identities", {})
+        identity = identities.get(event_type) or identities.get("default", {})
+        return identity.get("username"), identity.get("avatar_url")
+
+    async def emit(self, event):
+        channel = await self.cog.get_log_channel(event.guild_id)
+        if not channel or not event.embed:
+            return False
+
+        # Straight to channel.send while the bot is known to lack manage_webhooks there
+        if not self.webhooks.is_forbidden(channel.id):
+            username, avatar_url = self.get_identity(event.event_type)
+            try:
+                await self.webhooks.send(channel, event.embed, username=username, avatar_url=avatar_url)
+                return True
+            except disnake.Forbidden:
+                self.logger.warning(
+                    f"Missing manage_webhooks permission in log channel {channel.id}, falling back to channel.send")
+            except disnake.HTTPException as e:
+                self.logger.warning(f"Webhook log delivery failed in channel {channel.id}: {e}")
+
+        try:
+            await channel.send(embed=event.embed)
+            return True
+        except (disnake.Forbidden, disnake.HTTPException):
+            return False
+
+
+class PostgresSink(LogSink):
+    """Stores events in the message_logs, user_logs and server_logs tables"""
+
+    name = "postgres"
+
+    def __init__(self, cog):
+        super().__init__(cog)
+        self.db = cog.db
+
+    async def emit(self, event):
+        # Serialized here like JsonlSink, psycopg2 blocks so the insert runs in a thread
+        details = json.dumps(event.data, default=str)
+        return await asyncio.to_thread(self._store, event, details)
+
+    def _store(self, event, details):
+        category = event.event_type.split("_", 1)[0]
+
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                if category == "message":
+                    # message_logs has no details column, the full record goes in embeds
+                    cursor.execute('''
+                    INSERT INTO message_logs (guild_id, channel_id, message_id, user_id, content,
+                                              attachments, embeds, action_type)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    ''', (event.guild_id, event.channel_id, event.target_id, event.user_id,
+                          event.data.get("content") or event.data.get("after"),
+                          json.dumps(event.data.get("attachments", [])), details,
+                          event.event_type.upper()))
+                elif category in ("member", "voice"):
+                    cursor.execute('''
+                    INSERT INTO user_logs (guild_id, user_id, action_type, details)
+                    VALUES (%s, %s, %s, %s)
+                    ''', (event.guild_id, event.user_id, event.event_type.upper(), details))
+                else:
+                    cursor.execute('''
+                    INSERT INTO server_logs (guild_id, action_type, target_id, details, user_id)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ''', (event.guild_id, event.event_type.upper(), event.target_id, details, event.user_id))
+                conn.commit()
+            return True
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error storing {event.event_type} event: {e}")
+            return False
+        finally:
+            self.db.release_connection(conn)
+
+
+class JsonlSink(LogSink):
+    """Appends events as JSON lines to a local file"""
+
+    name = "jsonl"
+
+    def __init__(self, cog):
+        super().__init__(cog)
+        self.path = cog.config.get("sinks", {}).get("jsonl_path", "logs/events.jsonl")
+        self._file = None
+        # Writes run in worker threads, one at a time so lines don't interleave
+        self._lock = threading.Lock()
+
+    def _write(self, line):
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8", buffering=1)
+            self._file.write(line)
+
+    async def emit(self, event):
+        # Serialized here so the thread never sees the event change under it
+        line = json.dumps(event.to_dict(), default=str) + "\n"
+        try:
+            # A slow disk shouldn't stall the event loop
+            await asyncio.to_thread(self._write, line)
+            return True
+        except OSError as e:
+            self.logger.error(f"Failed to write event to {self.path}: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+# All available sinks, in delivery order
+SINK_TYPES = (ChannelSink, WebhookSink, PostgresSink, JsonlSink)
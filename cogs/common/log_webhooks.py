@@ -0,0 +1,87 @@
+import asyncio
+import time
+import disnake
+
+
+class LogWebhookManager:
+    """Creates, caches and sends through a bot-owned webhook per log channel
+
+    Webhook executions are rate limited per webhook rather than against the
+    bot token, so log traffic sent this way never delays moderation actions.
+    """
+
+    WEBHOOK_NAME = "retardibot logs"
+
+    def __init__(self, bot, logger, forbidden_ttl=600):
+        self.bot = bot
+        self.logger = logger
+        self._webhooks = {}
+        self._locks = {}
+        # channel_id -> monotonic time until which webhooks aren't tried there
+        self._forbidden = {}
+        self.forbidden_ttl = forbidden_ttl
+
+    def invalidate(self, channel_id):
+        """Forget the cached webhook for a channel"""
+        self._webhooks.pop(channel_id, None)
+
+    def is_forbidden(self, channel_id):
+        """Check if the bot recently lacked manage_webhooks in a channel"""
+        until = self._forbidden.get(channel_id)
+        if until is None:
+            return False
+        if time.monotonic() >= until:
+            del self._forbidden[channel_id]
+            return False
+        return True
+
+    async def get_webhook(self, channel):
+        """Get the managed webhook for a channel, creating it if needed"""
+        webhook = self._webhooks.get(channel.id)
+        if webhook:
+            return webhook
+
+        # Only one lookup/create per channel at a time, so a burst of events
+        # doesn't create several webhooks
+        lock = self._locks.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            webhook = self._webhooks.get(channel.id)
+            if webhook:
+                return webhook
+
+            for existing in await channel.webhooks():
+                if existing.name == self.WEBHOOK_NAME and existing.user and existing.user.id == self.bot.user.id:
+                    webhook = existing
+                    break
+
+            if webhook is None:
+                webhook = await channel.create_webhook(
+                    name=self.WEBHOOK_NAME,
+                    reason="Log delivery webhook"
+                )
+                self.logger.info(f"Created log webhook in channel {channel.id}")
+
+            self._webhooks[channel.id] = webhook
+            return webhook
+
+    async def send(self, channel, embed, username=None, avatar_url=None):
+        """Send an embed through the channel's webhook, recreating it once if it was deleted"""
+        for attempt in range(2):
+            try:
+                webhook = await self.get_webhook(channel)
+            except disnake.Forbidden:
+                # Every event would otherwise list webhooks again just to be refused
+                self._forbidden[channel.id] = time.monotonic() + self.forbidden_ttl
+                raise
+            try:
+                await webhook.send(
+                    embed=embed,
+                    username=username or disnake.utils.MISSING,
+                    avatar_url=avatar_url or disnake.utils.MISSING
+                )
+                return
+            except disnake.NotFound:
+                # Someone deleted the webhook, drop it and try again with a fresh one
+                self.invalidate(channel.id)
+                if attempt:
+                    raise
@@ -0,0 +1,146 @@
+-- Schema as bootstrapped by DBManager before migrations existed.
+-- Everything uses IF NOT EXISTS so databases created by the old
+-- bootstrapping adopt this version without changes.
+
+-- 1. Moderation tables
+CREATE TABLE IF NOT EXISTS mod_actions (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    moderator_id BIGINT NOT NULL,
+    action_type TEXT NOT NULL,
+    reason TEXT,
+    duration INTEGER,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 2. Confessions tables
+CREATE TABLE IF NOT EXISTS confessions (
+    id SERIAL PRIMARY KEY,
+    message_id BIGINT,
+    user_id BIGINT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    is_deleted BOOLEAN DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS confession_bans (
+    user_id BIGINT PRIMARY KEY,
+    banned_by BIGINT NOT NULL,
+    reason TEXT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 3. Logging tables
+CREATE TABLE IF NOT EXISTS message_logs (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    content TEXT,
+    attachments JSONB,
+    embeds JSONB,
+    action_type TEXT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_logs (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    action_type TEXT NOT NULL,
+    details JSONB,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS server_logs (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    action_type TEXT NOT NULL,
+    target_id BIGINT,
+    details JSONB,
+    user_id BIGINT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS voice_sessions (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    channel_ids BIGINT[] NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    ended_at TIMESTAMP NOT NULL,
+    duration INTEGER NOT NULL,
+    moves INTEGER DEFAULT 0,
+    muted_seconds INTEGER DEFAULT 0,
+    deafened_seconds INTEGER DEFAULT 0,
+    streaming_seconds INTEGER DEFAULT 0,
+    video_seconds INTEGER DEFAULT 0,
+    partial BOOLEAN DEFAULT FALSE
+);
+
+-- 4. AutoMod tables
+CREATE TABLE IF NOT EXISTS automod_verdicts (
+    content_hash TEXT PRIMARY KEY,
+    flagged BOOLEAN NOT NULL,
+    category_scores JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS automod_denylist (
+    guild_id BIGINT NOT NULL,
+    term TEXT NOT NULL,
+    added_by BIGINT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (guild_id, term)
+);
+
+CREATE TABLE IF NOT EXISTS automod_scores (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    message_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    source TEXT NOT NULL,
+    scores REAL[] NOT NULL,
+    flagged BOOLEAN NOT NULL,
+    outcome TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Hashed n-gram features of text messages, for training the local classifier
+ALTER TABLE automod_scores ADD COLUMN IF NOT EXISTS features INTEGER[];
+
+CREATE TABLE IF NOT EXISTS automod_alerts (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    message_ids BIGINT[] NOT NULL,
+    alert_message_id BIGINT,
+    outcome TEXT,
+    resolved_by BIGINT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS automod_risk (
+    guild_id BIGINT NOT NULL,
+    user_id BIGINT NOT NULL,
+    risk REAL NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL,
+    level SMALLINT NOT NULL DEFAULT 0,
+    recent JSONB,
+    PRIMARY KEY (guild_id, user_id)
+);
+
+-- Indexes
+CREATE INDEX IF NOT EXISTS idx_mod_actions_user_id ON mod_actions(user_id);
+CREATE INDEX IF NOT EXISTS idx_mod_actions_guild_id ON mod_actions(guild_id);
+CREATE INDEX IF NOT EXISTS idx_confessions_user_id ON confessions(user_id);
+CREATE INDEX IF NOT EXISTS idx_message_logs_guild_id ON message_logs(guild_id);
+CREATE INDEX IF NOT EXISTS idx_user_logs_user_id ON user_logs(user_id);
+CREATE INDEX IF NOT EXISTS idx_server_logs_guild_id ON server_logs(guild_id);
+CREATE INDEX IF NOT EXISTS idx_voice_sessions_guild_user ON voice_sessions(guild_id, user_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_automod_scores_guild_created ON automod_scores(guild_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_automod_scores_message_id ON automod_scores(message_id);
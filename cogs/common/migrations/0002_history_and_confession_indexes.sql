@@ -0,0 +1,15 @@
+-- migrate: no-transaction
+-- Built concurrently so large tables stay writable. A concurrent build that
+-- is interrupted leaves an invalid index behind, so each one is dropped
+-- first and a retried migration rebuilds it from scratch.
+
+-- Moderation history pages by (timestamp, id) cursor for one user
+DROP INDEX CONCURRENTLY IF EXISTS idx_mod_actions_guild_user_ts;
+CREATE INDEX CONCURRENTLY idx_mod_actions_guild_user_ts ON mod_actions(guild_id, user_id, timestamp DESC, id DESC);
+
+-- Covered by the index above
+DROP INDEX CONCURRENTLY IF EXISTS idx_mod_actions_guild_id;
+
+-- Confession deletes and bans look confessions up by their posted message
+DROP INDEX CONCURRENTLY IF EXISTS idx_confessions_message_id;
+CREATE INDEX CONCURRENTLY idx_confessions_message_id ON confessions(message_id);
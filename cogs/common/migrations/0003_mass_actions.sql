@@ -0,0 +1,19 @@
+-- Mass ban/kick/timeout jobs. done and failed grow as results are
+-- checkpointed, so an interrupted job resumes with the remaining targets
+CREATE TABLE mass_actions (
+    id SERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    channel_id BIGINT NOT NULL,
+    moderator_id BIGINT NOT NULL,
+    action_type TEXT NOT NULL,
+    reason TEXT,
+    duration INTEGER,
+    targets BIGINT[] NOT NULL,
+    done BIGINT[] NOT NULL DEFAULT '{}',
+    failed BIGINT[] NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_mass_actions_status ON mass_actions(status);
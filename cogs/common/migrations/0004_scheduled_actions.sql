@@ -0,0 +1,20 @@
+-- Timed actions like the unban at the end of a tempban. Rows stay after
+-- running with their final status, as a record of what was undone and when
+CREATE TABLE scheduled_actions (
+    id BIGSERIAL PRIMARY KEY,
+    guild_id BIGINT NOT NULL,
+    action_type TEXT NOT NULL,
+    target_id BIGINT NOT NULL,
+    role_id BIGINT,
+    moderator_id BIGINT NOT NULL,
+    reason TEXT,
+    due_at TIMESTAMPTZ NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+
+-- The scheduler only ever reads pending actions in due order
+CREATE INDEX idx_scheduled_actions_pending_due ON scheduled_actions(due_at) WHERE status = 'pending';
+CREATE INDEX idx_scheduled_actions_target ON scheduled_actions(guild_id, target_id) WHERE status = 'pending';
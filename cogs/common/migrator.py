@@ -0,0 +1,131 @@
+import os
+import re
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# First line of a migration that has to run outside a transaction (CREATE INDEX CONCURRENTLY)
+NO_TRANSACTION = "-- migrate: no-transaction"
+# Any constant works, it only has to be the same for every process running migrations
+LOCK_ID = 0x5e4a
+
+
+class Migration:
+    """One numbered .sql file from the migrations directory"""
+
+    __slots__ = ("version", "name", "path")
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Find NNNN_name.sql files, ordered by version"""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = re.fullmatch(r"(\d+)_(\w+)\.sql", filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def split_statements(sql):
+    """Split a migration into statements on semicolons that end a line
+
+    Enough for plain DDL; migrations don't contain function bodies.
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [statement.strip() for statement in re.split(r";\s*$", "\n".join(lines), flags=re.M) if statement.strip()]
+
+
+class Migrator:
+    """Applies pending schema migrations, recording each in schema_migrations
+
+    A database that is already current costs one query at startup and runs
+    no DDL. Regular migrations run in a transaction together with their
+    version row, so they apply completely or not at all. Migrations marked
+    no-transaction run statement by statement in autocommit mode and must
+    be safe to rerun if interrupted.
+    """
+
+    def __init__(self, conn, logger, directory=MIGRATIONS_DIR):
+        self.conn = conn
+        self.logger = logger
+        self.migrations = load_migrations(directory)
+
+    def applied_versions(self):
+        with self.conn.cursor() as cursor:
+            cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return set()
+            cursor.execute("SELECT version FROM schema_migrations")
+            return {row[0] for row in cursor.fetchall()}
+
+    def pending(self):
+        applied = self.applied_versions()
+        self.conn.rollback()
+        return [migration for migration in self.migrations if migration.version not in applied]
+
+    def migrate(self):
+        """Apply all pending migrations, returning the versions applied"""
+        if not self.pending():
+            return []
+
+        autocommit = self.conn.autocommit
+        self.conn.autocommit = True
+        applied = []
+        try:
+            with self.conn.cursor() as cursor:
+                # Another bot process may be migrating the same database
+                cursor.execute("SELECT pg_advisory_lock(%s)", (LOCK_ID,))
+                try:
+                    cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        applied_at TIMESTAMPTZ DEFAULT now()
+                    )
+                    ''')
+                    # Re-read now that we hold the lock
+                    cursor.execute("SELECT version FROM schema_migrations")
+                    done = {row[0] for row in cursor.fetchall()}
+                    for migration in self.migrations:
+                        if migration.version not in done:
+                            self._apply(cursor, migration)
+                            applied.append(migration.version)
+                finally:
+                    cursor.execute("SELECT pg_advisory_unlock(%s)", (LOCK_ID,))
+        finally:
+            self.conn.autocommit = autocommit
+        return applied
+
+    def _apply(self, cursor, migration):
+        sql = migration.read()
+        statements = split_statements(sql)
+        self.logger.info(f"Applying migration {migration.version:04d}_{migration.name} ({len(statements)} statements)")
+
+        record = ("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (migration.version, migration.name))
+        if sql.startswith(NO_TRANSACTION):
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(*record)
+            return
+
+        cursor.execute("BEGIN")
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(*record)
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
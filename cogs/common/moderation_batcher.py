@@ -0,0 +1,130 @@
+import asyncio
+import time
+
+
+class ModerationBatcher:
+    """Collects moderation inputs for a few milliseconds and sends them as one request
+
+    Callers await submit() and get back their own result; the batcher fans the
+    per-input results of each request back out to the waiting callers.
+    """
+
+    def __init__(self, send_batch, logger, max_batch_size=32, max_delay=0.01, guard=None):
+        # send_batch(list_of_inputs) -> list of results in the same order
+        self.send_batch = send_batch
+        self.logger = logger
+        # Optional ModerationGuard bounding in-flight requests and queued inputs
+        self.guard = guard
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max_delay
+
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+        self.batches = 0
+        self.inputs = 0
+        self.failed_batches = 0
+        self.batch_time = 0.0
+
+    async def submit(self, item):
+        """Queue an input and wait for its result (None if the request failed or was shed)"""
+        if self.guard and self.guard.admit():
+            return None
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.monotonic()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Send everything queued so far as one or more full batches"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+
+            task = asyncio.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        if not self.guard:
+            await self._request(batch)
+            return
+
+        await self.guard.acquire()
+        success = None
+        try:
+            # Inputs that waited out the deadline in the queue aren't worth sending anymore
+            live = []
+            for entry in batch:
+                if self.guard.is_expired(entry[2]):
+                    self.guard.drop("expired")
+                    self._resolve([entry], [None])
+                else:
+                    live.append(entry)
+
+            if not live:
+                return
+            if not self.guard.allow():
+                self.guard.drop("circuit_open", len(live))
+                self._resolve(live, [None] * len(live))
+                return
+
+            success = await self._request(live)
+        finally:
+            self.guard.release(success)
+            self.guard.done(len(batch))
+
+    async def _request(self, batch):
+        """Send one batch and hand each caller its result, returning False on failure"""
+        start = time.perf_counter()
+        items = [entry[0] for entry in batch]
+        success = True
+
+        try:
+            results = await self.send_batch(items)
+            if results is None or len(results) != len(items):
+                raise ValueError(f"expected {len(items)} results, got {len(results) if results else 0}")
+        except Exception as e:
+            self.failed_batches += 1
+            self.logger.error(f"Moderation batch of {len(items)} failed: {e}")
+            results = [None] * len(items)
+            success = False
+        finally:
+            self.batches += 1
+            self.inputs += len(items)
+            self.batch_time += time.perf_counter() - start
+
+        self._resolve(batch, results)
+        return success
+
+    def _resolve(self, batch, results):
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """Flush anything still queued and wait for in-flight batches"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self):
+        """Batching metrics for the automod stats command"""
+        return {
+            "batches": self.batches,
+            "inputs": self.inputs,
+            "failed_batches": self.failed_batches,
+            "avg_batch_size": self.inputs / self.batches if self.batches else 0.0,
+            "avg_batch_ms": self.batch_time / self.batches * 1000 if self.batches else 0.0
+        }
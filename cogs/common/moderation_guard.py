@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import Counter
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a failing API and probes it periodically until it recovers"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self):
+        """Check if a request may go out, letting a single probe through when half open"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+
+        return True
+
+    def is_open(self):
+        """Check if requests are being rejected right now, without claiming a probe"""
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at < self.reset_timeout
+        return self.state == HALF_OPEN and self._probing
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+
+class ModerationGuard:
+    """Keeps moderation API usage bounded when the API is slow or down
+
+    Caps the number of requests in flight and the number of inputs waiting
+    for one, drops inputs that waited past their deadline, and fails fast
+    while the circuit breaker is open. Shed inputs are counted by reason.
+    """
+
+    def __init__(self, logger, max_in_flight=4, max_pending=1000, deadline=10,
+                 failure_threshold=5, reset_timeout=30):
+        self.logger = logger
+        self.max_in_flight = max_in_flight
+        self.max_pending = max_pending
+        self.deadline = deadline
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self.pending = 0
+        self.in_flight = 0
+        self.shed = Counter()
+        self.requests = 0
+        self.failures = 0
+
+    def admit(self):
+        """Reserve a pending slot for an input, or return why it was shed"""
+        if self.breaker.is_open():
+            reason = "circuit_open"
+        elif self.pending >= self.max_pending:
+            reason = "queue_full"
+        else:
+            self.pending += 1
+            return None
+
+        self.shed[reason] += 1
+        return reason
+
+    def done(self, count=1):
+        """Free pending slots once inputs have been answered or dropped"""
+        self.pending = max(0, self.pending - count)
+
+    def is_expired(self, enqueued_at):
+        """Check if an input has waited longer than the deadline"""
+        return time.monotonic() - enqueued_at > self.deadline
+
+    def drop(self, reason, count=1):
+        """Count inputs shed after they were admitted"""
+        self.shed[reason] += count
+
+    async def acquire(self):
+        """Wait for an in-flight slot"""
+        await self._semaphore.acquire()
+        self.in_flight += 1
+
+    def allow(self):
+        """Ask the circuit breaker whether a request may go out now"""
+        if not self.breaker.allow():
+            return False
+        self.requests += 1
+        return True
+
+    def release(self, success=None):
+        """Release an in-flight slot, recording the outcome if a request was sent"""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+        if success is None:
+            return
+        if success:
+            self.breaker.record_success()
+            return
+
+        self.failures += 1
+        was_open = self.breaker.state == OPEN
+        self.breaker.record_failure()
+        if self.breaker.state == OPEN and not was_open:
+            self.logger.warning(
+                f"Moderation API circuit opened after {self.breaker.consecutive_failures} consecutive failures, "
+                f"retrying in {self.breaker.reset_timeout}s")
+
+    def health(self):
+        """Summarize API health as healthy, degraded or down"""
+        if self.breaker.state != CLOSED:
+            return "down"
+        if self.breaker.consecutive_failures or self.pending >= self.max_pending // 2:
+            return "degraded"
+        return "healthy"
+
+    def stats(self):
+        """Guard metrics for the automod stats command"""
+        return {
+            "health": self.health(),
+            "circuit": self.breaker.state,
+            "times_opened": self.breaker.times_opened,
+            "pending": self.pending,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "shed": dict(self.shed)
+        }
@@ -0,0 +1,250 @@
+import asyncio
+import datetime
+import json
+import math
+import time
+from collections import OrderedDict, Counter
+from psycopg2.extras import execute_values
+
+# Escalation levels, in increasing order of severity
+LEVELS = (None, "ping", "timeout")
+
+
+class UserRisk:
+    """Rolling risk of one user: an exponentially decayed score sum plus a ring buffer of recent flags"""
+
+    __slots__ = ("risk", "updated", "level", "scores", "categories", "times", "head", "size")
+
+    def __init__(self, window, risk=0.0, updated=None, level=0):
+        self.risk = risk
+        self.updated = updated if updated is not None else time.time()
+        self.level = level
+        # Preallocated so adding a score never grows anything
+        self.scores = [0.0] * window
+        self.categories = [None] * window
+        self.times = [0.0] * window
+        self.head = 0
+        self.size = 0
+
+    def decayed(self, now, half_life):
+        """Risk as of now, without modifying the stored value"""
+        return self.risk * math.pow(0.5, max(0.0, now - self.updated) / half_life)
+
+    def add(self, now, score, category, half_life):
+        self.risk = self.decayed(now, half_life) + score
+        self.updated = now
+
+        self.scores[self.head] = score
+        self.categories[self.head] = category
+        self.times[self.head] = now
+        self.head = (self.head + 1) % len(self.scores)
+        self.size = min(self.size + 1, len(self.scores))
+
+    def recent(self):
+        """(timestamp, score, category) entries in the ring buffer, newest first"""
+        window = len(self.scores)
+        for offset in range(1, self.size + 1):
+            i = (self.head - offset) % window
+            yield self.times[i], self.scores[i], self.categories[i]
+
+
+class RiskTracker:
+    """Per-user rolling risk scores that escalate sustained abuse
+
+    Every flagged-ish message adds its top category score to the user's
+    risk, which halves every half_life seconds. Crossing ping_above or
+    timeout_above escalates once per level until the risk decays back
+    below half of ping_above. Tracked users are bounded by an LRU and
+    their state is checkpointed to automod_risk so restarts keep it.
+    """
+
+    def __init__(self, db, logger, half_life=600, window=20, max_users=10000, min_score=0.3,
+                 ping_above=2.0, timeout_above=3.5, flush_interval=30):
+        self.db = db
+        self.logger = logger
+        self.half_life = half_life
+        self.window = window
+        self.max_users = max_users
+        self.min_score = min_score
+        self.thresholds = (0.0, ping_above, timeout_above)
+        self.reset_below = ping_above / 2
+        self.flush_interval = flush_interval
+
+        # (guild_id, user_id) -> UserRisk, least recently updated first
+        self._users = OrderedDict()
+        self._loaded_guilds = set()
+        self._dirty = set()
+        # Rows of users evicted before their last update was written
+        self._evicted = {}
+        self._flush_handle = None
+        self._tasks = set()
+
+        self.escalations = Counter()
+        self.evictions = 0
+        self.written = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def get(self, guild_id, user_id):
+        return self._users.get((guild_id, user_id))
+
+    def risk(self, guild_id, user_id):
+        user = self._users.get((guild_id, user_id))
+        return user.decayed(time.time(), self.half_life) if user else 0.0
+
+    def record(self, guild_id, user_id, score, category):
+        """Add a message's score to its author's risk, returning (risk, escalation or None)"""
+        key = (guild_id, user_id)
+        now = time.time()
+        user = self._users.get(key)
+
+        if score < self.min_score:
+            return (user.decayed(now, self.half_life) if user else 0.0), None
+
+        if user is None:
+            user = self._users[key] = UserRisk(self.window)
+            self._evict()
+        else:
+            self._users.move_to_end(key)
+
+        user.add(now, score, category, self.half_life)
+        self._mark_dirty(key)
+
+        # Calmed down since the last escalation, start over
+        if user.level and user.risk < self.reset_below:
+            user.level = 0
+
+        level = user.level
+        while level + 1 < len(LEVELS) and user.risk >= self.thresholds[level + 1]:
+            level += 1
+        if level <= user.level:
+            return user.risk, None
+
+        user.level = level
+        self.escalations[LEVELS[level]] += 1
+        return user.risk, LEVELS[level]
+
+    def _evict(self):
+        while len(self._users) > self.max_users:
+            key, user = self._users.popitem(last=False)
+            self.evictions += 1
+            if key in self._dirty:
+                self._dirty.discard(key)
+                self._evicted[key] = self._row(key, user)
+
+    def _mark_dirty(self, key):
+        self._dirty.add(key)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self.flush)
+
+    def _row(self, key, user):
+        recent = [[round(ts, 3), score, category] for ts, score, category in user.recent()]
+        return (key[0], key[1], user.risk, datetime.datetime.fromtimestamp(user.updated, datetime.timezone.utc),
+                user.level, json.dumps(recent))
+
+    def flush(self):
+        """Checkpoint every user updated since the last flush in the background"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        rows = list(self._evicted.values())
+        rows += [self._row(key, self._users[key]) for key in self._dirty if key in self._users]
+        self._evicted.clear()
+        self._dirty.clear()
+        if not rows:
+            return
+
+        task = asyncio.create_task(asyncio.to_thread(self._upsert, rows))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def ensure_guild(self, guild_id):
+        """Restore a guild's checkpointed risk the first time one of its members is scored"""
+        if guild_id in self._loaded_guilds:
+            return
+        self._loaded_guilds.add(guild_id)
+
+        rows = await asyncio.to_thread(self._load, guild_id)
+        for user_id, risk, updated, level, recent in rows:
+            key = (guild_id, user_id)
+            # Anything scored since startup is newer than the checkpoint
+            if key in self._users:
+                continue
+
+            user = UserRisk(self.window, risk, updated.timestamp(), level)
+            for ts, score, category in reversed(recent or []):
+                user.scores[user.head] = score
+                user.categories[user.head] = category
+                user.times[user.head] = ts
+                user.head = (user.head + 1) % self.window
+                user.size = min(user.size + 1, self.window)
+            self._users[key] = user
+            self._users.move_to_end(key, last=False)
+        self._evict()
+
+    def _upsert(self, rows):
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                execute_values(cursor, '''
+                INSERT INTO automod_risk (guild_id, user_id, risk, updated_at, level, recent)
+                VALUES %s
+                ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                    risk = EXCLUDED.risk,
+                    updated_at = EXCLUDED.updated_at,
+                    level = EXCLUDED.level,
+                    recent = EXCLUDED.recent
+                ''', rows)
+                conn.commit()
+                self.written += len(rows)
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error checkpointing {len(rows)} risk scores: {e}")
+        finally:
+            self.db.release_connection(conn)
+
+    def _load(self, guild_id):
+        # After ten half-lives a score is under 0.1% of what it was
+        horizon = self.half_life * 10
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                DELETE FROM automod_risk WHERE guild_id = %s AND updated_at < NOW() - %s * INTERVAL '1 second'
+                ''', (guild_id, horizon))
+                cursor.execute('''
+                SELECT user_id, risk, updated_at, level, recent FROM automod_risk
+                WHERE guild_id = %s
+                ORDER BY updated_at DESC
+                LIMIT %s
+                ''', (guild_id, self.max_users))
+                rows = cursor.fetchall()
+                conn.commit()
+                return rows
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error loading risk scores for guild {guild_id}: {e}")
+            return []
+        finally:
+            self.db.release_connection(conn)
+
+    def stats(self):
+        """Risk metrics for the automod stats command"""
+        return {
+            "tracked": len(self._users),
+            "pings": self.escalations["ping"],
+            "timeouts": self.escalations["timeout"],
+            "evictions": self.evictions,
+            "written": self.written
+        }
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+
+class RoleWaiters:
+    """Futures that resolve when a member gains a role, fed from member update events
+
+    Waiters are indexed by (guild_id, member_id) so an update for a member
+    nobody is waiting on costs a single dict lookup. Concurrent waits for
+    the same (guild, member, role) share one future.
+    """
+
+    def __init__(self):
+        # (guild_id, member_id) -> {role_id: [future, number of callers waiting on it]}
+        self._waiters = {}
+
+        self.resolved = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+
+    def __len__(self):
+        return sum(len(roles) for roles in self._waiters.values())
+
+    async def wait(self, guild_id, member_id, role_id, timeout):
+        """Wait until the member gains the role, returning False if it doesn't happen within timeout"""
+        key = (guild_id, member_id)
+        roles = self._waiters.setdefault(key, {})
+        entry = roles.get(role_id)
+        if entry is None:
+            entry = roles[role_id] = [asyncio.get_running_loop().create_future(), 0]
+        entry[1] += 1
+
+        started = time.monotonic()
+        try:
+            # Shielded so one caller timing out doesn't cancel the future for the others
+            await asyncio.wait_for(asyncio.shield(entry[0]), timeout)
+            self.resolved += 1
+            self.total_wait += time.monotonic() - started
+            return True
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            return False
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and roles.get(role_id) is entry:
+                del roles[role_id]
+                if not roles and self._waiters.get(key) is roles:
+                    del self._waiters[key]
+
+    def notify(self, guild_id, member_id, role_ids):
+        """Resolve waiters for any of the member's current roles"""
+        roles = self._waiters.get((guild_id, member_id))
+        if not roles:
+            return
+
+        for role_id in role_ids:
+            entry = roles.get(role_id)
+            if entry is not None and not entry[0].done():
+                entry[0].set_result(True)
+
+    def cancel_all(self):
+        for roles in self._waiters.values():
+            for future, _ in roles.values():
+                future.cancel()
+
+    def stats(self):
+        """Waiter metrics for the loyalty settings embed"""
+        return {
+            "outstanding": len(self),
+            "resolved": self.resolved,
+            "timed_out": self.timed_out,
+            "avg_wait": self.total_wait / self.resolved if self.resolved else 0.0
+        }
@@ -0,0 +1,143 @@
+class StaffIndex:
+    """Per-guild sets of mod and staff member IDs, so permission checks are a set lookup
+
+    Mods have the automod mod role. Staff are mods, members with one of the
+    configured staff roles, administrators and the guild owner. A guild is
+    indexed from the member cache on its first query and kept current from
+    member and role events; role changes that alter which roles are
+    privileged just drop the guild so it gets rebuilt on the next query.
+    """
+
+    def __init__(self, bot, logger, mod_role_id=None, staff_role_ids=()):
+        self.logger = logger
+        self.mod_role_id = mod_role_id
+        self.staff_role_ids = set(staff_role_ids)
+        if mod_role_id:
+            self.staff_role_ids.add(mod_role_id)
+
+        # guild_id -> (privileged role IDs, mod IDs, staff IDs)
+        self._guilds = {}
+        self.builds = 0
+
+        bot.add_listener(self.on_member_update, "on_member_update")
+        bot.add_listener(self.on_raw_member_update, "on_raw_member_update")
+        bot.add_listener(self.on_member_join, "on_member_join")
+        bot.add_listener(self.on_member_remove, "on_member_remove")
+        bot.add_listener(self.on_guild_role_change, "on_guild_role_create")
+        bot.add_listener(self.on_guild_role_change, "on_guild_role_delete")
+        bot.add_listener(self.on_guild_role_update, "on_guild_role_update")
+        bot.add_listener(self.on_guild_update, "on_guild_update")
+
+    def _index(self, guild):
+        """Get a guild's index, building it once the member cache is complete"""
+        index = self._guilds.get(guild.id)
+        if index is not None or not guild.chunked:
+            return index
+
+        admin_roles = {role.id for role in guild.roles if role.permissions.administrator}
+        privileged = self.staff_role_ids | admin_roles
+        mods, staff = set(), set()
+        for member in guild.members:
+            self._classify(guild, member, privileged, mods, staff)
+
+        index = self._guilds[guild.id] = (privileged, mods, staff)
+        self.builds += 1
+        self.logger.debug(f"Indexed {len(staff)} staff ({len(mods)} mods) in guild {guild.id}")
+        return index
+
+    def _classify(self, guild, member, privileged, mods, staff):
+        role_ids = {role.id for role in member.roles}
+        if self.mod_role_id in role_ids:
+            mods.add(member.id)
+        else:
+            mods.discard(member.id)
+
+        if member.id == guild.owner_id or role_ids & privileged:
+            staff.add(member.id)
+        else:
+            staff.discard(member.id)
+
+    def is_mod(self, member):
+        """Check if a member has the mod role"""
+        guild = getattr(member, "guild", None)
+        if guild is None:
+            return False
+
+        index = self._index(guild)
+        if index is None:
+            # Member cache still loading, check the roles directly
+            return any(role.id == self.mod_role_id for role in getattr(member, "roles", ()))
+        return member.id in index[1]
+
+    def is_staff(self, member):
+        """Check if a member is staff: mod or staff role, administrator or owner"""
+        guild = getattr(member, "guild", None)
+        if guild is None:
+            return False
+
+        index = self._index(guild)
+        if index is None:
+            return (member.id == guild.owner_id
+                    or member.guild_permissions.administrator
+                    or any(role.id in self.staff_role_ids for role in member.roles))
+        return member.id in index[2]
+
+    def _update_member(self, member):
+        index = self._guilds.get(member.guild.id)
+        if index is not None:
+            self._classify(member.guild, member, *index)
+
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self._update_member(after)
+
+    async def on_raw_member_update(self, member):
+        # Covers members that weren't cached, updating twice for cached ones is harmless
+        self._update_member(member)
+
+    async def on_member_join(self, member):
+        self._update_member(member)
+
+    async def on_member_remove(self, member):
+        index = self._guilds.get(member.guild.id)
+        if index is not None:
+            index[1].discard(member.id)
+            index[2].discard(member.id)
+
+    def invalidate(self, guild_id):
+        self._guilds.pop(guild_id, None)
+
+    async def on_guild_role_change(self, role):
+        if role.permissions.administrator or role.id in self.staff_role_ids:
+            self.invalidate(role.guild.id)
+
+    async def on_guild_role_update(self, before, after):
+        if before.permissions.administrator != after.permissions.administrator:
+            self.invalidate(after.guild.id)
+
+    async def on_guild_update(self, before, after):
+        if before.owner_id != after.owner_id:
+            self.invalidate(after.id)
+
+    def stats(self):
+        return {
+            "guilds": len(self._guilds),
+            "mods": sum(len(mods) for _, mods, _ in self._guilds.values()),
+            "staff": sum(len(staff) for _, _, staff in self._guilds.values()),
+            "builds": self.builds
+        }
+
+
+def get_staff_index(bot):
+    """Get the bot's shared staff index, creating it on first use"""
+    index = getattr(bot, "staff_index", None)
+    if index is None:
+        config = getattr(bot, "config", {})
+        index = StaffIndex(
+            bot,
+            bot.dev_logger.getChild("StaffIndex"),
+            mod_role_id=config.get("automod", {}).get("mod_role_id"),
+            staff_role_ids=config.get("staff", {}).get("role_ids", [])
+        )
+        bot.staff_index = index
+    return index
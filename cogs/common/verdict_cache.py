@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+
+# Characters that render as nothing but make otherwise identical messages differ
+_ZERO_WIDTH = dict.fromkeys(map(ord, "\u200b\u200c\u200d\u200e\u200f\u2060\ufeff\u00ad\u034f"), None)
+_WHITESPACE_RE = re.compile(r"\s+")
+# Three or more of the same character in a row ("loooool" -> "lool")
+_REPEAT_RE = re.compile(r"(.)\1{2,}", re.DOTALL)
+
+
+def strip_invisible(content):
+    """Casefold content and drop zero-width characters used to dodge filters"""
+    return content.casefold().translate(_ZERO_WIDTH)
+
+
+def normalize_content(content):
+    """Normalize message text so trivially different copies share a cache key"""
+    content = strip_invisible(content)
+    content = _WHITESPACE_RE.sub("", content)
+    return _REPEAT_RE.sub(r"\1\1", content)
+
+
+def content_key(normalized):
+    """Hash normalized content into a compact cache key"""
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class ModerationVerdict:
+    """The parts of a moderation result that automod acts on"""
+
+    __slots__ = ("flagged", "category_scores")
+
+    def __init__(self, flagged, category_scores):
+        self.flagged = flagged
+        self.category_scores = category_scores
+
+    @classmethod
+    def from_result(cls, result):
+        """Build a verdict from one entry of a moderation API response"""
+        scores = result.category_scores
+        if hasattr(scores, "model_dump"):
+            # Pydantic model from the OpenAI SDK, aliases are the API's category names
+            scores = scores.model_dump(by_alias=True)
+        else:
+            scores = dict(scores)
+
+        return cls(bool(result.flagged), {k: v for k, v in scores.items() if v is not None})
+
+
+class VerdictCache:
+    """Bounded LRU cache of moderation verdicts with a TTL
+
+    An optional Postgres tier keeps verdicts across restarts; memory misses
+    fall through to it before the caller hits the API.
+    """
+
+    def __init__(self, logger, max_size=10000, ttl=3600, db=None, persistent_ttl=604800):
+        self.logger = logger
+        self.max_size = max_size
+        self.ttl = ttl
+        self.db = db
+        self.persistent_ttl = persistent_ttl
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.lookup_time = 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Get a verdict from memory, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        verdict, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return verdict
+
+    def put(self, key, verdict):
+        """Store a verdict in memory, evicting the least recently used entries"""
+        self._entries[key] = (verdict, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def lookup(self, key):
+        """Look up a verdict in memory, then in the persistent tier"""
+        start = time.perf_counter()
+        try:
+            verdict = self.get(key)
+            if verdict is not None:
+                self.hits += 1
+                return verdict
+
+            if self.db:
+                verdict = await asyncio.to_thread(self._load, key)
+                if verdict is not None:
+                    self.persistent_hits += 1
+                    self.put(key, verdict)
+                    return verdict
+
+            self.misses += 1
+            return None
+        finally:
+            self.lookup_time += time.perf_counter() - start
+
+    async def store(self, key, verdict):
+        """Store a verdict in memory and in the persistent tier"""
+        self.put(key, verdict)
+        if self.db:
+            await asyncio.to_thread(self._save, key, verdict)
+
+    def _load(self, key):
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                SELECT flagged, category_scores FROM automod_verdicts
+                WHERE content_hash = %s AND created_at >= NOW() - %s * INTERVAL '1 second'
+                ''', (key, self.persistent_ttl))
+                row = cursor.fetchone()
+                return ModerationVerdict(row[0], row[1]) if row else None
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error loading cached verdict: {e}")
+            return None
+        finally:
+            self.db.release_connection(conn)
+
+    def _save(self, key, verdict):
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                INSERT INTO automod_verdicts (content_hash, flagged, category_scores, created_at)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (content_hash) DO UPDATE SET
+                    flagged = EXCLUDED.flagged,
+                    category_scores = EXCLUDED.category_scores,
+                    created_at = CURRENT_TIMESTAMP
+                ''', (key, verdict.flagged, json.dumps(verdict.category_scores)))
+                conn.commit()
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error saving cached verdict: {e}")
+        finally:
+            self.db.release_connection(conn)
+
+    def stats(self):
+        """Cache metrics for the automod stats command"""
+        lookups = self.hits + self.persistent_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.persistent_hits) / lookups if lookups else 0.0,
+            "avg_lookup_ms": self.lookup_time / lookups * 1000 if lookups else 0.0
+        }
@@ -0,0 +1,165 @@
+import datetime
+from collections import OrderedDict
+
+
+class VoiceSession:
+    """A member's stay in voice, from joining a channel to leaving voice entirely"""
+
+    # Flags whose accumulated on-time is tracked for the session summary
+    TIMED_FLAGS = ("muted", "deafened", "streaming", "video")
+
+    def __init__(self, guild_id, user_id, channel_id, started_at, partial=False):
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.channel_id = channel_id
+        self.channel_ids = [channel_id]
+        self.started_at = started_at
+        self.ended_at = None
+        self.moves = 0
+        # True when the join happened before we started tracking (e.g. bot restart)
+        self.partial = partial
+        self.server_mutes = 0
+        self.server_deafens = 0
+
+        self.totals = {flag: 0.0 for flag in self.TIMED_FLAGS}
+        self._since = {flag: None for flag in self.TIMED_FLAGS}
+
+    def set_flag(self, flag, active, now):
+        """Start or stop the timer for a flag"""
+        since = self._since[flag]
+        if active and since is None:
+            self._since[flag] = now
+        elif not active and since is not None:
+            self.totals[flag] += (now - since).total_seconds()
+            self._since[flag] = None
+
+    def apply_state(self, state, now):
+        """Sync all timed flags with a disnake VoiceState"""
+        self.set_flag("muted", bool(state.mute or state.self_mute), now)
+        self.set_flag("deafened", bool(state.deaf or state.self_deaf), now)
+        self.set_flag("streaming", bool(state.self_stream), now)
+        self.set_flag("video", bool(state.self_video), now)
+
+    def move_to(self, channel_id):
+        """Record a move to another voice channel"""
+        self.moves += 1
+        self.channel_id = channel_id
+        if channel_id not in self.channel_ids:
+            self.channel_ids.append(channel_id)
+
+    def close(self, now):
+        """Stop all running timers and mark the session as finished"""
+        for flag in self.TIMED_FLAGS:
+            self.set_flag(flag, False, now)
+        self.ended_at = now
+
+    @property
+    def duration(self):
+        """Session length in seconds"""
+        end = self.ended_at or datetime.datetime.utcnow()
+        return (end - self.started_at).total_seconds()
+
+
+class VoiceSessionTracker:
+    """Folds voice state updates into per-member sessions
+
+    Only one session per (guild, member) is held in memory at a time and the
+    number of open sessions is capped, so a missed leave event can't leak.
+    """
+
+    def __init__(self, max_sessions=5000):
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, guild_id, user_id):
+        """Get the open session for a member, if any"""
+        return self._sessions.get((guild_id, user_id))
+
+    def open_sessions(self, guild_id=None):
+        """Iterate over open sessions, optionally for a single guild"""
+        for (session_guild_id, _), session in self._sessions.items():
+            if guild_id is None or session_guild_id == guild_id:
+                yield session
+
+    def start(self, guild_id, user_id, state, now=None, partial=False):
+        """Open a session for a member currently in the channel described by state"""
+        now = now or datetime.datetime.utcnow()
+        session = VoiceSession(guild_id, user_id, state.channel.id, now, partial=partial)
+        session.apply_state(state, now)
+
+        key = (guild_id, user_id)
+        self._sessions[key] = session
+        self._sessions.move_to_end(key)
+
+        # Evict the oldest sessions if we somehow exceed the cap
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+        return session
+
+    def update(self, member, before, after, now=None):
+        """Apply a voice state update
+
+        Returns a tuple of (completed_session, alerts) where completed_session is
+        the session that just ended (or None) and alerts is a list of
+        (alert_type, detail) tuples for moderator-relevant changes.
+        """
+        now = now or datetime.datetime.utcnow()
+        key = (member.guild.id, member.id)
+        alerts = []
+
+        # Left voice entirely
+        if after.channel is None:
+            session = self._sessions.pop(key, None)
+            if session is None:
+                return None, alerts
+            session.close(now)
+            return session, alerts
+
+        session = self._sessions.get(key)
+
+        # Joined voice, or we missed the join (bot restarted while they were in voice)
+        if session is None:
+            partial = before.channel is not None
+            self.start(member.guild.id, member.id, after, now=now, partial=partial)
+            return None, alerts
+
+        if before.channel is not None and before.channel.id != after.channel.id:
+            session.move_to(after.channel.id)
+
+        # Server-side mutes and deafens are applied by moderators
+        if before.mute != after.mute:
+            if after.mute:
+                session.server_mutes += 1
+            alerts.append(("server_mute" if after.mute else "server_unmute", after.channel))
+
+        if before.deaf != after.deaf:
+            if after.deaf:
+                session.server_deafens += 1
+            alerts.append(("server_deafen" if after.deaf else "server_undeafen", after.channel))
+
+        session.apply_state(after, now)
+        self._sessions.move_to_end(key)
+        return None, alerts
+
+
+def format_duration(seconds):
+    """Format a number of seconds as a compact duration string"""
+    seconds = int(seconds)
+    days, remainder = divmod(seconds, 86400)
+    hours, remainder = divmod(remainder, 3600)
+    minutes, seconds = divmod(remainder, 60)
+
+    parts = []
+    if days:
+        parts.append(f"{days}d")
+    if hours:
+        parts.append(f"{hours}h")
+    if minutes:
+        parts.append(f"{minutes}m")
+    if seconds or not parts:
+        parts.append(f"{seconds}s")
+    return " ".join(parts)
@@ -1,6 +1,7 @@
 import disnake
 from disnake.ext import commands
 from cogs.common.base_cog import BaseCog
+from cogs.common.detectors import TriggerWordDetector
 
 class ReactionCog(BaseCog):
     def __init__(self, bot):
@@ -11,6 +12,8 @@ class ReactionCog(BaseCog):
         self.trigger_words = reaction_config.get("trigger_words", [])
         self.emoji_id = reaction_config.get("emoji_id")
         self.emoji_fallback = reaction_config.get("emoji_fallback", "😳")
+        # All trigger words in one regex pass, rebuilt when the list changes
+        self.detector = TriggerWordDetector(self.trigger_words)
         
         # Log initialization details
         self.logger.info(f"Reaction cog initialized with {len(self.trigger_words)} trigger words")
@@ -24,11 +27,8 @@ class ReactionCog(BaseCog):
         if message.author.bot:
             return
         
-        # Get message content in lowercase for comparison
-        content = message.content.lower()
-        
         # Check for trigger words
-        triggered_words = [word for word in self.trigger_words if word in content]
+        triggered_words = self.detector.match(message.content)
         if triggered_words:
             self.logger.debug(f"Message triggered reaction in #{message.channel.name} - Words: {', '.join(triggered_words)}")
             
@@ -125,6 +125,7 @@ class ReactionCog(BaseCog):
             
         config["reaction"]["trigger_words"].append(word)
         self.trigger_words.append(word)
+        self.detector = TriggerWordDetector(self.trigger_words)
         
         # Save config
         try:
@@ -168,6 +169,7 @@ class ReactionCog(BaseCog):
                 
         if word in self.trigger_words:
             self.trigger_words.remove(word)
+        self.detector = TriggerWordDetector(self.trigger_words)
         
         # Save config
         try:
@@ -37,17 +37,6 @@ class MessageDeleter(BaseCog):
         
         self.logger.info(f"Message deleter initialized for channel ID: {self.channel_id}")
 
-    def has_mod_role(self, member):
-        """Check if a member has the moderator role"""
-        if not member or not member.guild:
-            return False
-            
-        mod_role = member.guild.get_role(self.mod_role_id)
-        if not mod_role:
-            return False
-            
-        return mod_role in member.roles
-
     @commands.Cog.listener()
     async def on_message(self, message):
         # Skip messages from any bot
@@ -2,6 +2,7 @@ import disnake
 from disnake.ext import commands
 from cogs.common.base_cog import BaseCog
 from cogs.common.db_manager import DBManager
+from cogs.common.component_router import get_component_router, make_custom_id
 import datetime
 import json
 
@@ -11,7 +12,14 @@ class ConfessionsCog(BaseCog):
         config = getattr(self.bot, 'config', {})
         self.confession_channel_id = config.get("confession_channel_id")
         self.db = DBManager()
+
+        # Buttons on old confessions keep working after a restart
+        self.router = get_component_router(bot)
+        self.router.register("confess", self.handle_confession_button)
         self.logger.info("Confession system initialized with PostgreSQL")
+
+    def cog_unload(self):
+        self.router.unregister("confess")
     
     def _is_user_banned(self, user_id):
         """Check if a user is banned from using confessions"""
@@ -149,75 +157,60 @@ class ConfessionsCog(BaseCog):
         embed.set_footer(text=f"Confession #{confession_id}")
         
         # Create moderation buttons
-        class ConfessionButtons(disnake.ui.View):
-            def __init__(self, cog):
-                super().__init__(timeout=None)
-                self.cog = cog
-                self.logger = self.cog.bot.dev_logger
-                
-            @disnake.ui.button(label="Delete Confession", style=disnake.ButtonStyle.danger, emoji="🗑️")
-            async def delete_button(self, button: disnake.ui.Button, interaction: disnake.MessageInteraction):
-                # Check if user has mod role
-                mod_role_id = getattr(self.cog.bot, 'config', {}).get("automod", {}).get("mod_role_id")
-                if not mod_role_id:
-                    return await interaction.response.send_message("Critical error encountered.", ephemeral=True)
-                
-                mod_role = interaction.guild.get_role(mod_role_id)
-                if not mod_role or mod_role not in interaction.user.roles:
-                    return await interaction.response.send_message("You don't have permission to do this.", ephemeral=True)
-                
-                # Update the embed
-                embed = interaction.message.embeds[0]
-                embed.description = "[DELETED]"
-                embed.color = disnake.Color.dark_gray()
-                
-                # Mark as deleted in database
-                self.cog._mark_deleted(interaction.message.id)
-
-                self.logger.info(f"Deleted confession #{confession_id} sent by user {inter.author.id}")
-                
-                await interaction.response.edit_message(embed=embed)
-                await interaction.followup.send("Confession deleted.", ephemeral=True)
-            
-            @disnake.ui.button(label="Ban User", style=disnake.ButtonStyle.danger, emoji="🚫")
-            async def ban_button(self, button: disnake.ui.Button, interaction: disnake.MessageInteraction):
-                # Check if user has mod role
-                mod_role_id = getattr(self.cog.bot, 'config', {}).get("automod", {}).get("mod_role_id")
-                if not mod_role_id:
-                    return await interaction.response.send_message("Critical error encountered.", ephemeral=True)
-                
-                mod_role = interaction.guild.get_role(mod_role_id)
-                if not mod_role or mod_role not in interaction.user.roles:
-                    return await interaction.response.send_message("You don't have permission to do this.", ephemeral=True)
-                
-                # Get user ID from message ID
-                user_id = self.cog._get_user_id_from_message(interaction.message.id)
-                if not user_id:
-                    return await interaction.response.send_message("Could not find the user for this confession.", ephemeral=True)
-                
-                # Ban user
-                self.cog._ban_user(user_id, interaction.user.id, "Banned by moderator")
-                
-                # Update the embed
-                embed = interaction.message.embeds[0]
-                if embed.description != "[DELETED]":
-                    embed.description = "[DELETED]"
-                    embed.color = disnake.Color.dark_gray()
-                    self.cog._mark_deleted(interaction.message.id)
-
-                self.logger.info(f"Banned user {inter.author.id}, removed confession #{confession_id}")
-                
-                await interaction.response.edit_message(embed=embed)
-                await interaction.followup.send(f"User (ID: {user_id}) has been banned from sending confessions.", ephemeral=True)
-        
+        components = [
+            disnake.ui.Button(label="Delete Confession", style=disnake.ButtonStyle.danger, emoji="🗑️",
+                              custom_id=make_custom_id("confess", "delete", confession_id)),
+            disnake.ui.Button(label="Ban User", style=disnake.ButtonStyle.danger, emoji="🚫",
+                              custom_id=make_custom_id("confess", "ban", confession_id))
+        ]
+
         # Send the confession message with buttons
-        view = ConfessionButtons(self)
-        confession_message = await confession_channel.send(embed=embed, view=view)
+        confession_message = await confession_channel.send(embed=embed, components=components)
         
         # Update the message ID in the database
         self._update_message_id(confession_id, confession_message.id)
         
         self.logger.info(f"Confession #{confession_id} sent by user {inter.author.id}")
 
+    async def handle_confession_button(self, interaction, action, confession_id):
+        """Handle the Delete and Ban buttons on a confession"""
+        if not self.has_mod_role(interaction.user):
+            return await interaction.response.send_message("You don't have permission to do this.", ephemeral=True)
+
+        embed = interaction.message.embeds[0]
+
+        if action == "delete":
+            # Update the embed
+            embed.description = "[DELETED]"
+            embed.color = disnake.Color.dark_gray()
+
+            # Mark as deleted in database
+            self._mark_deleted(interaction.message.id)
+
+            self.logger.info(f"Deleted confession #{confession_id}")
+
+            await interaction.response.edit_message(embed=embed)
+            await interaction.followup.send("Confession deleted.", ephemeral=True)
+
+        elif action == "ban":
+            # Get user ID from message ID
+            user_id = self._get_user_id_from_message(interaction.message.id)
+            if not user_id:
+                return await interaction.response.send_message("Could not find the user for this confession.", ephemeral=True)
+
+            # Ban user
+            self._ban_user(user_id, interaction.user.id, "Banned by moderator")
+
+            # Update the embed
+            if embed.description != "[DELETED]":
+                embed.description = "[DELETED]"
+                embed.color = disnake.Color.dark_gray()
+                self._mark_deleted(interaction.message.id)
+
+            self.logger.info(f"Banned user {user_id}, removed confession #{confession_id}")
+
+            await interaction.response.edit_message(embed=embed)
+            await interaction.followup.send(f"User (ID: {user_id}) has been banned from sending confessions.", ephemeral=True)
+
 def setup(bot):
     bot.add_cog(ConfessionsCog(bot))
\ No newline at end of file
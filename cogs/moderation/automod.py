@@ -3,21 +3,44 @@ from disnake.ext import commands
 import os
 from openai import AsyncOpenAI
 import asyncio
+import aiohttp
+import base64
 import json
+import time
+from collections import Counter
 from dotenv import load_dotenv
 from cogs.common.base_cog import BaseCog
+from cogs.common.db_manager import DBManager
+from cogs.common.verdict_cache import VerdictCache, ModerationVerdict, normalize_content, content_key
+from cogs.common.moderation_batcher import ModerationBatcher
+from cogs.common.moderation_guard import ModerationGuard
+from cogs.common.automod_prefilter import PreFilter, DENY, SKIP
+from cogs.common.image_hashing import PerceptualIndex, hash_image
+from cogs.common.edit_tracker import EditTracker
+from cogs.common.automod_scores import ScoreRecorder, CATEGORIES, sweep_thresholds
+from cogs.common.local_classifier import LocalClassifier, hash_features, train_classifier
+from cogs.common.alert_aggregator import AlertAggregator
+from cogs.common.component_router import get_component_router, make_custom_id
+from cogs.common.risk_tracker import RiskTracker
 
 class AutoModCog(BaseCog):
     def __init__(self, bot):
         super().__init__(bot)
         load_dotenv()
         self.openai_key = os.getenv("OPENAI_KEY")
-        
-        # Initialize OpenAI client
-        self.aclient = AsyncOpenAI(api_key=self.openai_key)
 
         # Get config
         automod_config = getattr(self.bot, 'config', {}).get("automod", {})
+        limits_config = automod_config.get("limits", {})
+
+        # Initialize OpenAI client, failing fast instead of hanging on a slow API
+        # api_base_url points automod at another endpoint, e.g. scripts/mock_moderation_server.py
+        self.aclient = AsyncOpenAI(
+            api_key=self.openai_key,
+            base_url=automod_config.get("api_base_url") or os.getenv("OPENAI_BASE_URL"),
+            timeout=limits_config.get("request_timeout_seconds", 10),
+            max_retries=limits_config.get("max_retries", 1)
+        )
 
         # Set default values if not in config
         self.mod_role_id = automod_config.get("mod_role_id", 1356315914290856050)
@@ -50,64 +73,371 @@ class AutoModCog(BaseCog):
             "illicit/violent"
         ])
 
+        # Local pre-filter that skips the API for trivially safe content
+        prefilter_config = automod_config.get("prefilter", {})
+        prefix = getattr(self.bot, 'command_prefix', None)
+        self.prefilter = PreFilter(prefilter_config, prefixes=(prefix,) if isinstance(prefix, str) else ())
+        self.deny_high_priority = prefilter_config.get("deny_high_priority", False)
+        self.db = DBManager()
+
+        # Verdict cache so repeated content (copypasta, "lol", emotes) skips the API
+        cache_config = automod_config.get("cache", {})
+        self.verdict_cache = VerdictCache(
+            self.logger,
+            max_size=cache_config.get("max_size", 10000),
+            ttl=cache_config.get("ttl_seconds", 3600),
+            db=self.db if cache_config.get("persistent", False) else None,
+            persistent_ttl=cache_config.get("persistent_ttl_seconds", 604800)
+        )
+        # In-flight lookups, so a burst of identical messages makes one API call
+        self._pending_verdicts = {}
+
+        # Bounded in-flight requests, load shedding and a circuit breaker for API incidents
+        self.guard = ModerationGuard(
+            self.logger,
+            max_in_flight=limits_config.get("max_in_flight", 4),
+            max_pending=limits_config.get("max_pending", 1000),
+            deadline=limits_config.get("deadline_seconds", 10),
+            failure_threshold=limits_config.get("failure_threshold", 5),
+            reset_timeout=limits_config.get("reset_timeout_seconds", 30)
+        )
+
+        # Messages arriving within a few milliseconds share one API request
+        batch_config = automod_config.get("batching", {})
+        self.batcher = ModerationBatcher(
+            self._send_moderation_batch,
+            self.logger,
+            max_batch_size=batch_config.get("max_batch_size", 32),
+            max_delay=batch_config.get("max_delay_ms", 10) / 1000,
+            guard=self.guard
+        )
+
+        # Images go through the same guard, one per request since a list of
+        # image parts is moderated as a single combined input
+        image_config = automod_config.get("images", {})
+        self.images_enabled = image_config.get("enabled", True)
+        self.image_max_bytes = image_config.get("max_bytes", 4 * 1024 * 1024)
+        self.image_max_per_message = image_config.get("max_per_message", 4)
+        self.image_types = set(image_config.get("allowed_types", ["image/png", "image/jpeg", "image/gif", "image/webp"]))
+        self.image_check_embeds = image_config.get("check_embeds", True)
+        self.image_batcher = ModerationBatcher(
+            self._send_moderation_batch, self.logger, max_batch_size=1, max_delay=0, guard=self.guard
+        )
+        self.perceptual_index = PerceptualIndex(
+            max_size=image_config.get("index_size", 5000),
+            max_distance=image_config.get("phash_max_distance", 4)
+        )
+        self.http_session = None
+        self.image_stats = Counter()
+
+        # Edits are only re-moderated when the text changed materially
+        edit_config = automod_config.get("edits", {})
+        self.edits_enabled = edit_config.get("enabled", True)
+        self.edit_tracker = EditTracker(
+            max_size=edit_config.get("max_tracked", 10000),
+            min_change_ratio=edit_config.get("min_change_ratio", 0.3)
+        )
+
+        # Category scores and alert outcomes, kept for offline threshold tuning
+        scores_config = automod_config.get("scores", {})
+        self.record_scores = scores_config.get("enabled", True)
+        self.score_recorder = ScoreRecorder(
+            self.db,
+            self.logger,
+            flush_interval=scores_config.get("flush_interval_seconds", 10),
+            max_buffer=scores_config.get("max_buffer", 500)
+        )
+
+        # Local classifier that clears confidently benign messages without the API
+        classifier_config = automod_config.get("classifier", {})
+        self.classifier = LocalClassifier(
+            self.logger,
+            classifier_config.get("model_path", "data/automod_classifier.npz"),
+            benign_below=classifier_config.get("benign_below", 0.02),
+            shadow_rate=classifier_config.get("shadow_rate", 0.05),
+            min_agreement=classifier_config.get("min_agreement", 0.98),
+            min_samples=classifier_config.get("min_samples", 50)
+        )
+        try:
+            if self.classifier.load() and classifier_config.get("enabled", False):
+                self.classifier.enable()
+        except Exception as e:
+            self.logger.error(f"Failed to load local classifier: {e}")
+
+        # Repeat flags from one user in one channel update a single alert
+        alerts_config = automod_config.get("alerts", {})
+        self.alert_aggregator = AlertAggregator(
+            window=alerts_config.get("window_seconds", 120),
+            edit_interval=alerts_config.get("edit_interval_seconds", 3)
+        )
+        self._alert_tasks = set()
+
+        # Rolling per-user risk, so sustained abuse escalates beyond single alerts
+        risk_config = automod_config.get("risk", {})
+        self.risk_enabled = risk_config.get("enabled", True)
+        self.auto_timeout = risk_config.get("auto_timeout", False)
+        self.risk_timeout_seconds = risk_config.get("timeout_seconds", 600)
+        self.risk_tracker = RiskTracker(
+            self.db,
+            self.logger,
+            half_life=risk_config.get("half_life_seconds", 600),
+            window=risk_config.get("window", 20),
+            max_users=risk_config.get("max_users", 10000),
+            min_score=risk_config.get("min_score", 0.3),
+            ping_above=risk_config.get("ping_above", 2.0),
+            timeout_above=risk_config.get("timeout_above", 3.5),
+            flush_interval=risk_config.get("flush_interval_seconds", 30)
+        )
+
+        # Alert buttons encode the alert id and survive restarts
+        self.router = get_component_router(bot)
+        self.router.register("automod", self.handle_alert_button)
+
+        # API call metrics
+        self.api_calls = 0
+        self.api_errors = 0
+        self.api_time = 0.0
+        self.coalesced_lookups = 0
+
         self.logger.debug(f"Set channel: notification channel {self.alert_channel_id} for automod")
         self.logger.info(f"AutoMod initialized with OpenAI moderation API")
 
-    async def moderate_content(self, content):
-        """Send content to OpenAI Moderation API for analysis"""
+    def cog_unload(self):
+        self.router.unregister("automod")
+        # Don't leave callers waiting on a batch that will never be sent
+        asyncio.create_task(self.batcher.close())
+        asyncio.create_task(self.image_batcher.close())
+        asyncio.create_task(self.score_recorder.close())
+        asyncio.create_task(self.risk_tracker.close())
+        if self.http_session:
+            asyncio.create_task(self.http_session.close())
+
+    async def _send_moderation_batch(self, inputs):
+        """Send a batch of inputs to the OpenAI Moderation API in one request"""
+        start = time.perf_counter()
+        self.api_calls += 1
         try:
             response = await self.aclient.moderations.create(
                 model="omni-moderation-latest",
-                input=content
+                input=inputs
             )
-            return response
+            return [ModerationVerdict.from_result(result) for result in response.results]
         except Exception as e:
+            self.api_errors += 1
             self.logger.error(f"Error querying OpenAI Moderation API: {e}")
+            raise
+        finally:
+            self.api_time += time.perf_counter() - start
+
+    async def moderate_content(self, content):
+        """Get a moderation verdict for content from the API (batched with other messages)"""
+        return await self.batcher.submit(content)
+
+    async def get_verdict(self, content, features=None):
+        """Get a moderation verdict for content, using the cache and local classifier when possible"""
+        normalized = normalize_content(content)
+        if not normalized:
             return None
 
-    def has_mod_role(self, member):
-        """Check if a member has the mod role"""
-        if not member or not member.guild:
-            return False
-            
-        mod_role = member.guild.get_role(self.mod_role_id)
-        if not mod_role:
+        return await self._cached_verdict(content_key(normalized), lambda: self._classify_or_moderate(content, features))
+
+    async def _classify_or_moderate(self, content, features):
+        """Clear confidently benign content locally, send the rest to the API"""
+        route = self.classifier.should_skip_api(features) if features is not None else "api"
+        if route == "clear":
+            # No verdict, so nothing is cached or recorded for tuning
+            return None
+
+        verdict = await self.moderate_content(content)
+        if route == "shadow" and verdict is not None:
+            self.classifier.record_shadow(self.should_flag_content(verdict)[0])
+        return verdict
+
+    async def _cached_verdict(self, key, moderate):
+        """Look up a verdict by cache key, calling moderate() once on a miss"""
+        try:
+            verdict = await self.verdict_cache.lookup(key)
+        except Exception as e:
+            # A broken cache shouldn't stop moderation, treat it as a miss
+            self.logger.error(f"Verdict cache lookup failed: {e}")
+            verdict = None
+        if verdict is not None:
+            return verdict
+
+        # Someone else is already asking the API about the same content
+        pending = self._pending_verdicts.get(key)
+        if pending:
+            self.coalesced_lookups += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending_verdicts[key] = future
+        try:
+            verdict = await moderate()
+            if verdict is not None:
+                await self.verdict_cache.store(key, verdict)
+            future.set_result(verdict)
+            return verdict
+        except Exception as e:
+            self.logger.error(f"Error getting moderation verdict: {e}", exc_info=True)
+            return None
+        finally:
+            # Also on cancellation, or the callers waiting on it would hang
+            if not future.done():
+                future.set_result(None)
+            del self._pending_verdicts[key]
+
+    def get_image_candidates(self, message):
+        """Collect (url, content_type, size) for images in a message, within the configured limits"""
+        candidates = []
+        for attachment in message.attachments:
+            content_type = (attachment.content_type or "").split(";")[0]
+            if not content_type.startswith("image/"):
+                continue
+            if content_type not in self.image_types:
+                self.image_stats["skipped_type"] += 1
+            elif attachment.size > self.image_max_bytes:
+                self.image_stats["skipped_size"] += 1
+            else:
+                candidates.append((attachment.url, content_type, attachment.size))
+
+        if self.image_check_embeds:
+            for embed in message.embeds:
+                image = embed.image or embed.thumbnail
+                if image and image.url:
+                    # Size and type are only known once the download starts
+                    candidates.append((image.proxy_url or image.url, None, None))
+
+        if len(candidates) > self.image_max_per_message:
+            self.image_stats["skipped_count"] += len(candidates) - self.image_max_per_message
+        return candidates[:self.image_max_per_message]
+
+    async def fetch_image(self, url, content_type=None):
+        """Download an image, returning (data, content_type) or None if it breaks the limits"""
+        if self.http_session is None:
+            self.http_session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+
+        try:
+            async with self.http_session.get(url) as response:
+                if response.status != 200:
+                    return None
+
+                content_type = content_type or response.content_type
+                if content_type not in self.image_types:
+                    self.image_stats["skipped_type"] += 1
+                    return None
+                if (response.content_length or 0) > self.image_max_bytes:
+                    self.image_stats["skipped_size"] += 1
+                    return None
+
+                # Stop reading as soon as the limit is passed, content-length can be missing or wrong
+                data = bytearray()
+                async for chunk in response.content.iter_chunked(65536):
+                    data.extend(chunk)
+                    if len(data) > self.image_max_bytes:
+                        self.image_stats["skipped_size"] += 1
+                        return None
+                return bytes(data), content_type
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.logger.warning(f"Failed to download image {url}: {e}")
+            return None
+
+    async def moderate_image(self, data, content_type):
+        """Get a moderation verdict for an image from the API"""
+        data_url = f"data:{content_type};base64,{base64.b64encode(data).decode('ascii')}"
+        return await self.image_batcher.submit({"type": "image_url", "image_url": {"url": data_url}})
+
+    async def get_image_verdict(self, data, content_type):
+        """Get a moderation verdict for an image, reusing verdicts for identical and near-identical images"""
+        exact_hash, phash = await asyncio.to_thread(hash_image, data)
+        key = f"image:{exact_hash}"
+
+        if phash is not None:
+            # Reposts (resized, recompressed) share the verdict of the first copy we saw
+            known_key = self.perceptual_index.find(phash)
+            if known_key:
+                if known_key != key:
+                    self.image_stats["near_duplicates"] += 1
+                key = known_key
+            else:
+                self.perceptual_index.add(phash, key)
+
+        self.image_stats["checked"] += 1
+        return await self._cached_verdict(key, lambda: self.moderate_image(data, content_type))
+
+    async def moderate_images(self, message):
+        """Moderate the images in a message, alerting on the first flagged one"""
+        for url, content_type, _ in self.get_image_candidates(message):
+            image = await self.fetch_image(url, content_type)
+            if not image:
+                continue
+
+            verdict = await self.get_image_verdict(*image)
+            should_flag, flagged_categories, high_priority = self.should_flag_content(verdict)
+            if verdict and self.record_scores:
+                self.score_recorder.record(message, verdict, should_flag, "image")
+            if verdict:
+                await self.update_risk(message, verdict.category_scores)
+            if should_flag:
+                self.image_stats["flagged"] += 1
+                await self.send_mod_notification(message, flagged_categories, high_priority, image_url=url)
+                return
+
+    def _load_denylist(self, guild_id):
+        """Load a guild's denylist terms from the database"""
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                SELECT term FROM automod_denylist WHERE guild_id = %s
+                ''', (guild_id,))
+                self.prefilter.set_guild_terms(guild_id, [row[0] for row in cursor.fetchall()])
+        except Exception as e:
+            self.logger.error(f"Database error loading denylist for guild {guild_id}: {e}")
+            # Keep whatever we had so a broken database isn't queried on every message
+            if not self.prefilter.has_guild(guild_id):
+                self.prefilter.set_guild_terms(guild_id, [])
+        finally:
+            self.db.release_connection(conn)
+
+    def _update_denylist(self, guild_id, term, added_by=None):
+        """Add a term to (or remove it from, when added_by is None) a guild's denylist"""
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                if added_by is None:
+                    cursor.execute('''
+                    DELETE FROM automod_denylist WHERE guild_id = %s AND term = %s
+                    ''', (guild_id, term))
+                else:
+                    cursor.execute('''
+                    INSERT INTO automod_denylist (guild_id, term, added_by)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (guild_id, term) DO NOTHING
+                    ''', (guild_id, term, added_by))
+                changed = cursor.rowcount > 0
+                conn.commit()
+                return changed
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error updating denylist for guild {guild_id}: {e}")
             return False
-            
-        return mod_role in member.roles
+        finally:
+            self.db.release_connection(conn)
 
-    def should_flag_content(self, moderation_result):
+    def should_flag_content(self, verdict):
         """Determine if content should be flagged based on moderation scores and thresholds"""
-        if not moderation_result or not moderation_result.results:
+        if not verdict:
             return False, [], False
-            
-        result = moderation_result.results[0]
-        
-        # If OpenAI already flagged it, respect that decision
-        if result.flagged:
-            flagged_categories = []
-            high_priority = False
-            
-            for category, score in result.category_scores.items():
-                threshold = self.thresholds.get(category, 0.8)  # Default threshold
-                
-                if score >= threshold:
-                    flagged_categories.append({
-                        "name": category,
-                        "score": score,
-                        "high_priority": category in self.high_priority_categories
-                    })
-                    
-                    if category in self.high_priority_categories:
-                        high_priority = True
-            
-            return True, flagged_categories, high_priority
         
         # Check if any category exceeds our custom thresholds
         flagged_categories = []
         high_priority = False
         
-        for category, score in result.category_scores.items():
+        for category, score in verdict.category_scores.items():
             threshold = self.thresholds.get(category, 0.8)  # Default threshold
             
             if score >= threshold:
@@ -120,6 +450,10 @@ class AutoModCog(BaseCog):
                 if category in self.high_priority_categories:
                     high_priority = True
         
+        # If OpenAI already flagged it, respect that decision
+        if verdict.flagged:
+            return True, flagged_categories, high_priority
+        
         return len(flagged_categories) > 0, flagged_categories, high_priority
 
     @commands.Cog.listener()
@@ -132,46 +466,328 @@ class AutoModCog(BaseCog):
         if self.has_mod_role(message.author):
             return
 
-        # Get the message content
+        # Check attachments and embedded images
+        if self.images_enabled and (message.attachments or message.embeds):
+            await self.moderate_images(message)
+
+        await self.moderate_text(message)
+
+    @commands.Cog.listener()
+    async def on_message_edit(self, before, after):
+        if not self.edits_enabled or after.author.bot or not after.guild:
+            return
+
+        # Embed unfurls and pins also fire edits, only the text matters here
+        if before.content == after.content or not after.content:
+            return
+
+        if self.has_mod_role(after.author):
+            return
+
+        recheck, reason = self.edit_tracker.check(after.id, after.content)
+        if not recheck:
+            self.logger.debug(f"Skipping re-moderation of edited message {after.id} ({reason})")
+            return
+
+        await self.moderate_text(after, edited=True)
+
+    async def moderate_text(self, message, edited=False):
+        """Run a message's text through the pre-filter and moderation API, alerting if flagged"""
         content = message.content
 
         # Skip empty messages
         if not content:
             return
 
-        # Send to OpenAI for moderation
-        moderation_response = await self.moderate_content(content)
-        
+        # Edits are compared against the last version we moderated
+        self.edit_tracker.remember(message.id, content)
+
+        # Rule out trivially safe content and catch denylisted terms locally
+        if not self.prefilter.has_guild(message.guild.id):
+            await asyncio.to_thread(self._load_denylist, message.guild.id)
+
+        decision, detail = self.prefilter.classify(message.guild.id, content)
+        if decision == DENY:
+            self.logger.info(f"Denylisted term in message {message.id} from {message.author}")
+            flagged_categories = [{"name": f"denylist ({detail})", "score": 1.0, "high_priority": self.deny_high_priority}]
+            await self.send_mod_notification(message, flagged_categories, self.deny_high_priority, edited=edited)
+            await self.update_risk(message, {"denylist": 1.0})
+            return
+        if decision == SKIP:
+            return
+
+        # Hashed n-grams feed the local classifier and are stored to train it
+        features = None
+        if self.record_scores or self.classifier.active:
+            features = hash_features(content, self.classifier.n_features)
+
+        # Send to OpenAI for moderation (or reuse a cached verdict)
+        verdict = await self.get_verdict(content, features)
+
         # Check if content should be flagged
-        should_flag, flagged_categories, high_priority = self.should_flag_content(moderation_response)
-        
+        should_flag, flagged_categories, high_priority = self.should_flag_content(verdict)
+        if verdict and self.record_scores:
+            self.score_recorder.record(message, verdict, should_flag, "edit" if edited else "text", features)
+
         # Handle flagged content
         if should_flag:
-            await self.send_mod_notification(message, flagged_categories, high_priority)
+            await self.send_mod_notification(message, flagged_categories, high_priority, edited=edited)
+
+        if verdict:
+            await self.update_risk(message, verdict.category_scores)
+
+    async def update_risk(self, message, category_scores):
+        """Add a message's top category score to its author's rolling risk and escalate if needed"""
+        if not self.risk_enabled or not category_scores:
+            return
+
+        await self.risk_tracker.ensure_guild(message.guild.id)
+        category, score = max(category_scores.items(), key=lambda item: item[1])
+        risk, escalation = self.risk_tracker.record(message.guild.id, message.author.id, score, category)
+        if escalation:
+            self.logger.info(f"Risk score of {message.author} reached {risk:.2f}, escalating ({escalation})")
+            await self.escalate_risk(message, risk, escalation)
+
+    async def escalate_risk(self, message, risk, escalation):
+        """Ping moderators about a user with sustained flags, timing them out at the top level"""
+        member = message.author
+        timed_out = False
+        if escalation == "timeout" and self.auto_timeout:
+            moderation_cog = self.bot.get_cog("ModerationCog")
+            if not moderation_cog:
+                self.logger.error("ModerationCog is not loaded, can't apply risk timeout")
+            else:
+                try:
+                    await moderation_cog.apply_timeout(member, self.bot.user.id, self.risk_timeout_seconds,
+                                                       f"AutoMod: sustained risk score {risk:.2f}")
+                    timed_out = True
+                except disnake.HTTPException as e:
+                    self.logger.error(f"Failed to timeout {member} for risk score: {e}")
+
+        alert_channel = self.bot.get_channel(self.alert_channel_id)
+        if not alert_channel:
+            self.logger.error(f"Alert channel {self.alert_channel_id} not found")
+            return
+
+        user_risk = self.risk_tracker.get(message.guild.id, member.id)
+        recent = list(user_risk.recent())[:10] if user_risk else []
+        recent_text = "\n".join(f"<t:{int(ts)}:R> {category}: {score:.2f}" for ts, score, category in recent)
+
+        embed = disnake.Embed(
+            title="AutoMod Risk Escalation",
+            description=f"{member.mention} ({member.id}) has a rolling risk score of **{risk:.2f}** "
+                        f"after repeated flags.",
+            color=disnake.Color.dark_red()
+        )
+        embed.add_field(name="Recent Scores", value=recent_text or "*None*", inline=False)
+        embed.add_field(name="Latest Message", value=f"[Click here]({message.jump_url}) in {message.channel.mention}", inline=False)
+        if timed_out:
+            embed.add_field(name="Action", value=f"Timed out for {self.risk_timeout_seconds // 60} minutes", inline=False)
+        elif escalation == "timeout":
+            embed.add_field(name="Action", value="Timeout threshold reached, auto-timeout is off", inline=False)
+        if member.avatar:
+            embed.set_thumbnail(url=member.avatar.url)
+
+        mod_role = message.guild.get_role(self.mod_role_id)
+        try:
+            await alert_channel.send(f"{mod_role.mention} Sustained AutoMod flags!" if mod_role else None, embed=embed)
+        except Exception as e:
+            self.logger.error(f"Error sending risk escalation: {e}")
+
+    def _create_alert(self, guild_id, channel_id, user_id, message_ids):
+        """Store a new alert and return its ID"""
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                INSERT INTO automod_alerts (guild_id, channel_id, user_id, message_ids)
+                VALUES (%s, %s, %s, %s)
+                RETURNING id
+                ''', (guild_id, channel_id, user_id, message_ids))
+                alert_id = cursor.fetchone()[0]
+                conn.commit()
+                return alert_id
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error creating alert: {e}")
+            return None
+        finally:
+            self.db.release_connection(conn)
+
+    def _update_alert(self, alert_id, message_ids=None, alert_message_id=None, outcome=None, resolved_by=None):
+        """Update the stored fields of an alert that were passed in"""
+        fields = {"message_ids": message_ids, "alert_message_id": alert_message_id,
+                  "outcome": outcome, "resolved_by": resolved_by}
+        fields = {name: value for name, value in fields.items() if value is not None}
+        if not fields:
+            return
+
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                assignments = ", ".join(f"{name} = %s" for name in fields)
+                cursor.execute(f'''
+                UPDATE automod_alerts SET {assignments} WHERE id = %s
+                ''', (*fields.values(), alert_id))
+                conn.commit()
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error updating alert {alert_id}: {e}")
+        finally:
+            self.db.release_connection(conn)
+
+    def _get_alert(self, alert_id):
+        """Load an alert by ID"""
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                SELECT guild_id, channel_id, user_id, message_ids FROM automod_alerts WHERE id = %s
+                ''', (alert_id,))
+                row = cursor.fetchone()
+                if not row:
+                    return None
+                return {"guild_id": row[0], "channel_id": row[1], "user_id": row[2], "message_ids": row[3]}
+        except Exception as e:
+            self.logger.error(f"Database error loading alert {alert_id}: {e}")
+            return None
+        finally:
+            self.db.release_connection(conn)
+
+    def _alert_buttons(self, alert_id):
+        """Action buttons for an alert, routed by custom_id"""
+        return [
+            disnake.ui.Button(label="Delete Message", style=disnake.ButtonStyle.danger,
+                              custom_id=make_custom_id("automod", "delete", alert_id)),
+            disnake.ui.Button(label="Warn User", style=disnake.ButtonStyle.secondary,
+                              custom_id=make_custom_id("automod", "warn", alert_id)),
+            disnake.ui.Button(label="Ignore", style=disnake.ButtonStyle.success,
+                              custom_id=make_custom_id("automod", "ignore", alert_id))
+        ]
+
+    async def handle_alert_button(self, interaction, action, alert_id):
+        """Handle Delete, Warn and Ignore clicks on an alert"""
+        if not self.has_mod_role(interaction.user):
+            return await interaction.response.send_message("You don't have permission to do this.", ephemeral=True)
+
+        alert_id = int(alert_id)
+        alert = await asyncio.to_thread(self._get_alert, alert_id)
+        if not alert:
+            return await interaction.response.send_message("This alert no longer exists.", ephemeral=True)
+
+        # An open group may have flags that haven't been written back yet
+        group = self.alert_aggregator.get((alert["guild_id"], alert["user_id"], alert["channel_id"]))
+        if group and group.alert_id == alert_id:
+            alert["message_ids"] = [flagged.id for flagged in group.messages]
 
-    async def send_mod_notification(self, message, flagged_categories, high_priority):
-        """Send notification to moderators"""
+        guild = self.bot.get_guild(alert["guild_id"])
+        channel = guild.get_channel_or_thread(alert["channel_id"]) if guild else None
+        message_ids = alert["message_ids"]
+
+        if action == "delete":
+            if not channel:
+                return await interaction.response.send_message("The channel no longer exists.", ephemeral=True)
+            try:
+                # Every message merged into this alert goes, not just the first
+                if len(message_ids) > 1:
+                    await channel.delete_messages([disnake.Object(id=message_id) for message_id in message_ids])
+                else:
+                    await channel.get_partial_message(message_ids[0]).delete()
+            except disnake.NotFound:
+                pass  # Already deleted
+            except Exception as e:
+                return await interaction.response.send_message(f"Failed to delete message: {e}", ephemeral=True)
+
+            await interaction.response.send_message(
+                f"Deleted {len(message_ids)} message{'s' if len(message_ids) != 1 else ''} successfully.", ephemeral=True)
+            self.logger.info(f"Moderator {interaction.user} deleted {len(message_ids)} flagged messages from user {alert['user_id']}")
+            outcome = "deleted"
+
+        elif action == "warn":
+            # Check if ModerationCog is loaded to handle the warning
+            moderation_cog = self.bot.get_cog("ModerationCog")
+            if not moderation_cog:
+                return await interaction.response.send_message("ModerationCog is not loaded. Can't issue warning.", ephemeral=True)
+
+            try:
+                moderation_cog._add_mod_action(alert["guild_id"], alert["user_id"], interaction.user.id,
+                                               "WARN", "AutoMod flagged message")
+
+                member = guild.get_member(alert["user_id"]) if guild else None
+                try:
+                    if member:
+                        await member.send(f"You have been warned in {guild.name} for a message that violated server rules.")
+                except:
+                    pass  # Can't DM the user
+
+                await interaction.response.send_message(f"Warning issued to <@{alert['user_id']}>", ephemeral=True)
+                self.logger.info(f"Moderator {interaction.user} warned user {alert['user_id']} for flagged message")
+            except Exception as e:
+                await interaction.response.send_message(f"Failed to warn user: {e}", ephemeral=True)
+                self.logger.error(f"Error issuing warning: {e}")
+                return
+            outcome = "warned"
+
+        elif action == "ignore":
+            # A false positive, recorded so thresholds can be tuned from it
+            await interaction.response.send_message("Alert marked as a false positive.", ephemeral=True)
+            self.logger.info(f"Moderator {interaction.user} ignored alert {alert_id} for user {alert['user_id']}")
+            outcome = "ignored"
+
+        else:
+            return await interaction.response.send_message("Unknown action.", ephemeral=True)
+
+        for message_id in message_ids:
+            await self.score_recorder.set_outcome(message_id, outcome)
+        await asyncio.to_thread(self._update_alert, alert_id, outcome=outcome, resolved_by=interaction.user.id)
+
+    def _format_categories(self, flagged_categories):
+        """Format flagged categories for an alert embed"""
+        categories_text = ""
+        for category in flagged_categories:
+            priority_tag = "⚠️ HIGH PRIORITY" if category["high_priority"] else ""
+            categories_text += f"• **{category['name']}**: {category['score']:.2f} {priority_tag}\n"
+        return categories_text
+
+    async def send_mod_notification(self, message, flagged_categories, high_priority, image_url=None, edited=False):
+        """Send notification to moderators, folding repeat flags into the user's open alert"""
+        group = None
         try:
             alert_channel = self.bot.get_channel(self.alert_channel_id)
             if not alert_channel:
                 self.logger.error(f"Alert channel {self.alert_channel_id} not found")
                 return
 
+            key = (message.guild.id, message.author.id, message.channel.id)
+            group = self.alert_aggregator.get(key)
+            if group:
+                self.alert_aggregator.flags_merged += 1
+                escalated = group.merge(message, flagged_categories, high_priority)
+                if high_priority and not escalated:
+                    self.alert_aggregator.pings_suppressed += 1
+                if group.alert:
+                    await self._ping_if_escalated(group, alert_channel)
+                self._schedule_alert_edit(group)
+                return
+
+            group = self.alert_aggregator.start(key, message, flagged_categories, high_priority)
+
             # Create embed
             embed = disnake.Embed(
-                title="AutoMod Alert",
-                description=f"**Message content:**\n{message.content}",
+                title="AutoMod Alert (edited message)" if edited else "AutoMod Alert",
+                description=f"**Message content:**\n{message.content or '*No text*'}",
                 color=disnake.Color.red() if high_priority else disnake.Color.orange(),
                 timestamp=message.created_at
             )
 
-            # Format categories in the embed
-            categories_text = ""
-            for category in flagged_categories:
-                priority_tag = "⚠️ HIGH PRIORITY" if category["high_priority"] else ""
-                categories_text += f"• **{category['name']}**: {category['score']:.2f} {priority_tag}\n"
-            
-            embed.add_field(name="Flagged Categories", value=categories_text, inline=False)
+            embed.add_field(name="Flagged Categories", value=self._format_categories(flagged_categories), inline=False)
+            if image_url:
+                embed.add_field(name="Flagged Image", value=f"[Open image]({image_url})", inline=False)
             embed.add_field(name="Channel", value=message.channel.mention, inline=True)
             embed.add_field(name="Author", value=f"{message.author.mention} ({message.author.id})", inline=True)
             embed.add_field(name="Jump to Message", value=f"[Click here]({message.jump_url})", inline=False)
@@ -181,81 +797,113 @@ class AutoModCog(BaseCog):
             if message.author.avatar:
                 embed.set_thumbnail(url=message.author.avatar.url)
 
-            # Add action buttons
-            class ModActionButtons(disnake.ui.View):
-                def __init__(self, cog, message_to_delete):
-                    super().__init__(timeout=None)
-                    self.cog = cog
-                    self.message_to_delete = message_to_delete
-                
-                @disnake.ui.button(label="Delete Message", style=disnake.ButtonStyle.danger)
-                async def delete_button(self, button, interaction):
-                    if not self.cog.has_mod_role(interaction.user):
-                        return await interaction.response.send_message("You don't have permission to do this.", ephemeral=True)
-                    
-                    try:
-                        await self.message_to_delete.delete()
-                        await interaction.response.send_message("Message deleted successfully.", ephemeral=True)
-                        self.cog.logger.info(f"Moderator {interaction.user} deleted flagged message from {self.message_to_delete.author}")
-                    except Exception as e:
-                        await interaction.response.send_message(f"Failed to delete message: {e}", ephemeral=True)
-                
-                @disnake.ui.button(label="Warn User", style=disnake.ButtonStyle.secondary)
-                async def warn_button(self, button, interaction):
-                    if not self.cog.has_mod_role(interaction.user):
-                        return await interaction.response.send_message("You don't have permission to do this.", ephemeral=True)
-                    
-                    # Check if ModerationCog is loaded to handle the warning
-                    moderation_cog = self.cog.bot.get_cog("ModerationCog")
-                    if not moderation_cog:
-                        return await interaction.response.send_message("ModerationCog is not loaded. Can't issue warning.", ephemeral=True)
-                    
-                    try:
-                        # Create a mock context to call the warn command
-                        ctx = await self.cog.bot.get_context(interaction.message)
-                        ctx.author = interaction.user
-                        
-                        # Call the warn method directly
-                        await moderation_cog._add_mod_action(
-                            self.message_to_delete.guild.id, 
-                            self.message_to_delete.author.id,
-                            interaction.user.id,
-                            "WARN",
-                            "AutoMod flagged message"
-                        )
-                        
-                        try:
-                            await self.message_to_delete.author.send(f"You have been warned in {self.message_to_delete.guild.name} for a message that violated server rules.")
-                        except:
-                            pass  # Can't DM the user
-                            
-                        await interaction.response.send_message(f"Warning issued to {self.message_to_delete.author.mention}", ephemeral=True)
-                        self.cog.logger.info(f"Moderator {interaction.user} warned user {self.message_to_delete.author} for flagged message")
-                    except Exception as e:
-                        await interaction.response.send_message(f"Failed to warn user: {e}", ephemeral=True)
-                        self.cog.logger.error(f"Error issuing warning: {e}")
-
-            view = ModActionButtons(self, message)
+            # Record the alert so its buttons can be handled after a restart
+            group.alert_id = await asyncio.to_thread(
+                self._create_alert, message.guild.id, message.channel.id, message.author.id, [message.id]
+            )
+            components = self._alert_buttons(group.alert_id) if group.alert_id else None
 
             # Send embed with or without ping
-            if high_priority:
-                mod_role = message.guild.get_role(self.mod_role_id)
-                if mod_role:
-                    await alert_channel.send(f"{mod_role.mention} Moderation required!", embed=embed, view=view)
-                else:
-                    self.logger.error(f"Notification role {self.mod_role_id} not found")
-                    await alert_channel.send(embed=embed, view=view)
+            mod_role = message.guild.get_role(self.mod_role_id) if high_priority else None
+            if high_priority and not mod_role:
+                self.logger.error(f"Notification role {self.mod_role_id} not found")
+
+            if mod_role:
+                group.alert = await alert_channel.send(f"{mod_role.mention} Moderation required!", embed=embed, components=components)
+                group.pinged = True
+                self.alert_aggregator.pings_sent += 1
             else:
-                await alert_channel.send(embed=embed, view=view)
+                group.alert = await alert_channel.send(embed=embed, components=components)
+            self.alert_aggregator.alerts_posted += 1
+            if group.alert_id:
+                await asyncio.to_thread(self._update_alert, group.alert_id, alert_message_id=group.alert.id)
+
+            # Flags that arrived while the alert was being posted
+            if group.dirty:
+                await self._ping_if_escalated(group, alert_channel)
+                self._schedule_alert_edit(group)
 
         except Exception as e:
             self.logger.error(f"Error sending notification: {e}", exc_info=True)
+            # Don't leave later flags merging into an alert that was never posted
+            if group and group.alert is None:
+                self.alert_aggregator.discard(group.key)
+
+    async def _ping_if_escalated(self, group, alert_channel):
+        """Ping once per alert group when a later flag raises it to high priority"""
+        if not group.high_priority or group.pinged:
+            return
+
+        mod_role = group.first_message.guild.get_role(self.mod_role_id)
+        if not mod_role:
+            return
+
+        group.pinged = True
+        self.alert_aggregator.pings_sent += 1
+        await alert_channel.send(
+            f"{mod_role.mention} AutoMod alert for {group.first_message.author.mention} escalated to high priority "
+            f"({group.count} flagged messages)",
+            reference=group.alert
+        )
+
+    def _schedule_alert_edit(self, group):
+        """Edit the group's alert after edit_interval, coalescing flags that arrive meanwhile"""
+        if group.edit_handle is not None:
+            return
+
+        def start_edit():
+            task = asyncio.create_task(self._edit_alert(group))
+            self._alert_tasks.add(task)
+            task.add_done_callback(self._alert_tasks.discard)
+
+        group.edit_handle = asyncio.get_running_loop().call_later(self.alert_aggregator.edit_interval, start_edit)
+
+    async def _edit_alert(self, group):
+        """Rewrite an alert embed with the group's running count, score maxima and links"""
+        group.edit_handle = None
+        if group.alert is None:
+            # Still being posted, try again after the next interval
+            self._schedule_alert_edit(group)
+            return
+        if not group.dirty:
+            return
+        group.dirty = False
+
+        embed = group.alert.embeds[0].copy()
+        embed.title = f"AutoMod Alert ({group.count} flagged messages)"
+        embed.color = disnake.Color.red() if group.high_priority else disnake.Color.orange()
+        embed.set_footer(text=f"Severity: {'HIGH' if group.high_priority else 'MEDIUM'}")
+
+        categories = sorted(group.max_scores.values(), key=lambda category: category["score"], reverse=True)
+        recent = "\n".join(
+            f"[{flagged.created_at.strftime('%H:%M:%S')}]({flagged.jump_url}) "
+            f"{disnake.utils.escape_markdown((flagged.content or '*No text*')[:60])}"
+            for flagged in list(group.messages)[-5:]
+        )
+        fields = {"Flagged Categories": self._format_categories(categories), "Recent Flags": recent}
+        for index, field in enumerate(embed.fields):
+            if field.name in fields:
+                embed.set_field_at(index, name=field.name, value=fields.pop(field.name), inline=False)
+        for name, value in fields.items():
+            embed.add_field(name=name, value=value, inline=False)
+
+        if group.alert_id:
+            await asyncio.to_thread(self._update_alert, group.alert_id, message_ids=[flagged.id for flagged in group.messages])
+
+        try:
+            await group.alert.edit(embed=embed)
+            self.alert_aggregator.edits += 1
+        except disnake.NotFound:
+            # Alert was deleted, the next flag starts a fresh one
+            self.alert_aggregator.discard(group.key)
+        except disnake.HTTPException as e:
+            self.logger.error(f"Failed to update AutoMod alert: {e}")
 
     @commands.group(name="automod", invoke_without_command=True)
     @commands.has_permissions(manage_guild=True)
     async def automod_group(self, ctx):
         """Manage automod settings"""
-        await ctx.send("Please use a subcommand: `status`, `threshold`, `priority`")
+        await ctx.send("Please use a subcommand: `status`, `threshold`, `priority`, `stats`, `deny`, `tune`, `train`, `classifier`, `risk`")
 
     @automod_group.command(name="status")
     @commands.has_permissions(manage_guild=True)
@@ -292,6 +940,339 @@ class AutoModCog(BaseCog):
         
         await ctx.send(embed=embed)
 
+    @automod_group.command(name="stats")
+    @commands.has_permissions(manage_guild=True)
+    async def automod_stats(self, ctx):
+        """Show automod cache and API metrics"""
+        cache_stats = self.verdict_cache.stats()
+        prefilter_stats = self.prefilter.stats()
+        classifier_stats = self.classifier.stats()
+        saved_calls = (cache_stats["hits"] + cache_stats["persistent_hits"] + self.coalesced_lookups
+                       + prefilter_stats["denied"] + sum(prefilter_stats["skipped"].values())
+                       + classifier_stats["cleared"])
+        avg_api_ms = self.api_time / self.api_calls * 1000 if self.api_calls else 0.0
+
+        embed = disnake.Embed(
+            title="AutoMod Stats",
+            description="Metrics since the cog was loaded",
+            color=disnake.Color.blue()
+        )
+
+        skipped_text = ", ".join(f"{count} {reason.replace('_', ' ')}"
+                                 for reason, count in sorted(prefilter_stats["skipped"].items()))
+        embed.add_field(
+            name="Pre-filter",
+            value=f"**Skipped:** {prefilter_stats['skip_ratio']:.1%} ({skipped_text or 'none'})\n"
+                  f"**Denylist hits:** {prefilter_stats['denied']}\n"
+                  f"**Sent on:** {prefilter_stats['checked']}",
+            inline=False
+        )
+
+        if self.classifier.weights is None:
+            classifier_text = "No model trained (`automod train`)"
+        else:
+            status = "on" if classifier_stats["active"] else f"off ({classifier_stats['fallback_reason'] or 'disabled'})"
+            classifier_text = (f"**Status:** {status}\n"
+                               f"**Cleared locally:** {classifier_stats['cleared']} ({classifier_stats['api_reduction']:.1%} of checked)\n"
+                               f"**Agreement:** {classifier_stats['agreement']:.1%} over {classifier_stats['shadow_checks']} shadow checks "
+                               f"({classifier_stats['disagreements']} disagreed)")
+        embed.add_field(name="Local Classifier", value=classifier_text, inline=False)
+
+        embed.add_field(
+            name="Verdict Cache",
+            value=f"**Entries:** {cache_stats['entries']}/{self.verdict_cache.max_size}\n"
+                  f"**Hit ratio:** {cache_stats['hit_ratio']:.1%}\n"
+                  f"**Hits:** {cache_stats['hits']} memory, {cache_stats['persistent_hits']} persistent\n"
+                  f"**Misses:** {cache_stats['misses']}\n"
+                  f"**Avg lookup:** {cache_stats['avg_lookup_ms']:.2f}ms",
+            inline=False
+        )
+
+        batch_stats = self.batcher.stats()
+        embed.add_field(
+            name="Batching",
+            value=f"**Batches:** {batch_stats['batches']} ({batch_stats['failed_batches']} failed)\n"
+                  f"**Avg batch size:** {batch_stats['avg_batch_size']:.1f}/{self.batcher.max_batch_size}\n"
+                  f"**Avg batch time:** {batch_stats['avg_batch_ms']:.0f}ms",
+            inline=False
+        )
+
+        embed.add_field(
+            name="Moderation API",
+            value=f"**Calls:** {self.api_calls} ({self.api_errors} errors)\n"
+                  f"**Saved calls:** {saved_calls} ({self.coalesced_lookups} coalesced)\n"
+                  f"**Avg latency:** {avg_api_ms:.0f}ms",
+            inline=False
+        )
+
+        embed.add_field(
+            name="Images",
+            value=f"**Checked:** {self.image_stats['checked']} ({self.image_stats['near_duplicates']} near-duplicates, "
+                  f"{len(self.perceptual_index)} indexed)\n"
+                  f"**Flagged:** {self.image_stats['flagged']}\n"
+                  f"**Skipped:** {self.image_stats['skipped_size']} too large, {self.image_stats['skipped_type']} unsupported type, "
+                  f"{self.image_stats['skipped_count']} over the per-message limit",
+            inline=False
+        )
+
+        edit_decisions = self.edit_tracker.decisions
+        rechecked = (edit_decisions["new_tokens"] + edit_decisions["removed_tokens"]
+                     + edit_decisions["changed"] + edit_decisions["untracked"])
+        embed.add_field(
+            name="Edits",
+            value=f"**Re-moderated:** {rechecked} ({edit_decisions['new_tokens']} new words, "
+                  f"{edit_decisions['removed_tokens']} removed words, "
+                  f"{edit_decisions['changed']} rewrites, {edit_decisions['untracked']} untracked)\n"
+                  f"**Skipped:** {edit_decisions['unchanged']} unchanged, {edit_decisions['minor_edit']} minor edits\n"
+                  f"**Tracked messages:** {len(self.edit_tracker)}",
+            inline=False
+        )
+
+        alert_stats = self.alert_aggregator.stats()
+        embed.add_field(
+            name="Alerts",
+            value=f"**Posted:** {alert_stats['alerts_posted']} ({alert_stats['flags_merged']} repeat flags merged, "
+                  f"{alert_stats['edits']} edits)\n"
+                  f"**Pings:** {alert_stats['pings_sent']} sent, {alert_stats['pings_suppressed']} suppressed\n"
+                  f"**Open groups:** {alert_stats['active_groups']}",
+            inline=False
+        )
+
+        risk_stats = self.risk_tracker.stats()
+        embed.add_field(
+            name="Risk Scores",
+            value=f"**Tracked users:** {risk_stats['tracked']}/{self.risk_tracker.max_users} ({risk_stats['evictions']} evicted)\n"
+                  f"**Escalations:** {risk_stats['pings']} pings, {risk_stats['timeouts']} timeout level"
+                  f"{'' if self.auto_timeout else ' (auto-timeout off)'}\n"
+                  f"**Checkpointed:** {risk_stats['written']}",
+            inline=False
+        )
+
+        guard_stats = self.guard.stats()
+        health_icons = {"healthy": "🟢", "degraded": "🟡", "down": "🔴"}
+        shed_text = ", ".join(f"{count} {reason.replace('_', ' ')}"
+                              for reason, count in sorted(guard_stats["shed"].items()))
+        embed.add_field(
+            name="API Health",
+            value=f"**Status:** {health_icons[guard_stats['health']]} {guard_stats['health']} "
+                  f"(circuit {guard_stats['circuit'].replace('_', ' ')}, opened {guard_stats['times_opened']}x)\n"
+                  f"**In flight:** {guard_stats['in_flight']}/{self.guard.max_in_flight}\n"
+                  f"**Pending:** {guard_stats['pending']}/{self.guard.max_pending}\n"
+                  f"**Shed:** {shed_text or 'none'}",
+            inline=False
+        )
+
+        await ctx.send(embed=embed)
+
+    @automod_group.command(name="risk")
+    @commands.has_permissions(manage_messages=True)
+    async def automod_risk(self, ctx, member: disnake.Member):
+        """Show a member's rolling risk score and recent flags"""
+        await self.risk_tracker.ensure_guild(ctx.guild.id)
+        user_risk = self.risk_tracker.get(ctx.guild.id, member.id)
+        if not user_risk:
+            return await ctx.send(f"**{member}** has no recent AutoMod risk.")
+
+        risk = self.risk_tracker.risk(ctx.guild.id, member.id)
+        embed = disnake.Embed(
+            title=f"AutoMod Risk for {member}",
+            description=f"**Risk:** {risk:.2f} (ping at {self.risk_tracker.thresholds[1]:.2f}, "
+                        f"timeout at {self.risk_tracker.thresholds[2]:.2f})",
+            color=disnake.Color.orange()
+        )
+        recent_text = "\n".join(f"<t:{int(ts)}:R> {category}: {score:.2f}" for ts, score, category in user_risk.recent())
+        embed.add_field(name="Recent Scores", value=recent_text[:1024] or "*None*", inline=False)
+        await ctx.send(embed=embed)
+
+    @automod_group.group(name="deny", invoke_without_command=True)
+    @commands.has_permissions(manage_guild=True)
+    async def deny_group(self, ctx):
+        """Manage the denylist of terms that always raise an alert"""
+        await ctx.send("Please use a subcommand: `add`, `remove`, `list`")
+
+    @deny_group.command(name="add")
+    @commands.has_permissions(manage_guild=True)
+    async def deny_add(self, ctx, *, term: str):
+        """Add a term to the denylist"""
+        term = term.strip().casefold()
+        if not term:
+            return await ctx.send("Term can't be empty")
+
+        # Keep the term itself out of the channel
+        try:
+            await ctx.message.delete()
+        except (disnake.Forbidden, disnake.HTTPException):
+            pass
+
+        added = await asyncio.to_thread(self._update_denylist, ctx.guild.id, term, ctx.author.id)
+        await asyncio.to_thread(self._load_denylist, ctx.guild.id)
+
+        if added:
+            await ctx.send(f"✅ Added a term to the denylist ({len(self.prefilter.get_guild_terms(ctx.guild.id))} total)")
+            self.logger.info(f"{ctx.author} added a denylist term in guild {ctx.guild.id}")
+        else:
+            await ctx.send("That term is already on the denylist")
+
+    @deny_group.command(name="remove")
+    @commands.has_permissions(manage_guild=True)
+    async def deny_remove(self, ctx, *, term: str):
+        """Remove a term from the denylist"""
+        try:
+            await ctx.message.delete()
+        except (disnake.Forbidden, disnake.HTTPException):
+            pass
+
+        removed = await asyncio.to_thread(self._update_denylist, ctx.guild.id, term.strip().casefold())
+        await asyncio.to_thread(self._load_denylist, ctx.guild.id)
+
+        if removed:
+            await ctx.send("✅ Removed the term from the denylist")
+            self.logger.info(f"{ctx.author} removed a denylist term in guild {ctx.guild.id}")
+        else:
+            await ctx.send("That term isn't on the denylist")
+
+    @deny_group.command(name="list")
+    @commands.has_permissions(manage_guild=True)
+    async def deny_list(self, ctx):
+        """DM the denylist for this server"""
+        await asyncio.to_thread(self._load_denylist, ctx.guild.id)
+        terms = sorted(self.prefilter.get_guild_terms(ctx.guild.id))
+        if not terms:
+            return await ctx.send("The denylist is empty")
+
+        try:
+            await ctx.author.send(f"**Denylist for {ctx.guild.name}:**\n" + "\n".join(f"||{term}||" for term in terms))
+            await ctx.send(f"📬 Sent you the denylist ({len(terms)} terms)")
+        except disnake.Forbidden:
+            await ctx.send("I couldn't DM you the denylist")
+
+    @automod_group.command(name="tune")
+    @commands.has_permissions(manage_guild=True)
+    async def automod_tune(self, ctx, days: int = 30, category: str = None):
+        """Sweep thresholds over stored scores and report precision, recall and alert volume"""
+        if category and category not in CATEGORIES:
+            return await ctx.send(f"Invalid category. Valid categories are: {', '.join(CATEGORIES)}")
+
+        try:
+            import numpy as np
+        except ImportError:
+            return await ctx.send("NumPy isn't installed, can't run the tuning sweep")
+
+        # Make sure buffered scores are included
+        await self.score_recorder.close()
+
+        start = time.perf_counter()
+        rows = await asyncio.to_thread(self.score_recorder.load_history, ctx.guild.id, days)
+        if not rows:
+            return await ctx.send(f"No stored moderation scores from the last {days} days")
+
+        thresholds = np.round(np.arange(0.05, 1.0, 0.05), 2)
+        result = await asyncio.to_thread(sweep_thresholds, rows, thresholds)
+        elapsed = time.perf_counter() - start
+
+        def fmt(value):
+            return "  -  " if np.isnan(value) else f"{value:5.0%}"
+
+        def f1(row):
+            precision = np.nan_to_num(result["precision"][row])
+            recall = np.nan_to_num(result["recall"][row])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.nan_to_num(2 * precision * recall / (precision + recall))
+
+        embed = disnake.Embed(
+            title="AutoMod Threshold Tuning",
+            description=f"{len(rows)} messages from the last {days} days, {result['reviewed']} reviewed alerts, "
+                        f"{result['positives']} deleted or warned. Recall only counts messages a moderator acted on.",
+            color=disnake.Color.blue()
+        )
+
+        if category:
+            # Full sweep for one category
+            row = CATEGORIES.index(category)
+            lines = ["thresh  alerts/day  precision  recall"]
+            for i, threshold in enumerate(result["thresholds"]):
+                marker = " <" if np.isclose(threshold, self.thresholds.get(category, 0.8)) else ""
+                lines.append(f"{threshold:6.2f}  {result['volume'][row][i] / days:10.1f}  "
+                             f"{fmt(result['precision'][row][i]):>9}  {fmt(result['recall'][row][i]):>6}{marker}")
+            embed.add_field(name=category, value="```\n" + "\n".join(lines) + "\n```", inline=False)
+        else:
+            # Best F1 per category next to the current threshold
+            lines = []
+            for row, name in enumerate(CATEGORIES):
+                current = self.thresholds.get(name, 0.8)
+                current_i = int(np.abs(result["thresholds"] - current).argmin())
+                # Ties go to the highest threshold, same quality for fewer alerts
+                scores = f1(row)
+                best_i = int(np.flatnonzero(np.isclose(scores, scores.max()))[-1])
+                if not result["volume"][row].any():
+                    continue
+                lines.append(f"**{name}**: {current:.2f} ({fmt(result['precision'][row][current_i]).strip()} P, "
+                             f"{fmt(result['recall'][row][current_i]).strip()} R, "
+                             f"{result['volume'][row][current_i] / days:.1f}/day) → "
+                             f"{result['thresholds'][best_i]:.2f} ({fmt(result['precision'][row][best_i]).strip()} P, "
+                             f"{fmt(result['recall'][row][best_i]).strip()} R, "
+                             f"{result['volume'][row][best_i] / days:.1f}/day)")
+            # Field values cap at 1024 characters, the description has room for every category
+            embed.description += "\n\n**Current → best F1**\n" + ("\n".join(lines) or "No scores above any candidate threshold")
+
+        embed.set_footer(text=f"Swept {len(thresholds)} thresholds x {len(CATEGORIES)} categories in {elapsed:.2f}s")
+        await ctx.send(embed=embed)
+
+    @automod_group.command(name="train")
+    @commands.is_owner()
+    async def automod_train(self, ctx, days: int = 90):
+        """Train the local classifier on stored API verdicts"""
+        await self.score_recorder.close()
+        rows = await asyncio.to_thread(self.score_recorder.load_training_rows, days)
+        if len(rows) < 1000:
+            return await ctx.send(f"Only {len(rows)} stored verdicts from the last {days} days, need at least 1000")
+
+        status_msg = await ctx.send(f"Training on {len(rows)} verdicts...")
+        start = time.perf_counter()
+        try:
+            weights, bias, report = await asyncio.to_thread(
+                train_classifier, rows, self.classifier.n_features, benign_below=self.classifier.benign_below
+            )
+        except ImportError:
+            return await status_msg.edit(content="NumPy isn't installed, can't train the classifier")
+        elapsed = time.perf_counter() - start
+
+        self.classifier.weights, self.classifier.bias = weights, bias
+        await asyncio.to_thread(self.classifier.save)
+
+        # Only switch on a model that keeps missed flags within the agreement target on held-out data
+        holdout_ok = report.get("agreement", 0.0) >= self.classifier.min_agreement
+        if holdout_ok:
+            self.classifier.enable()
+        else:
+            self.classifier.enabled = False
+            self.classifier.fallback_reason = f"holdout agreement {report.get('agreement', 0.0):.1%} below target"
+
+        await status_msg.edit(content=(
+            f"✅ Trained on {report['train']} verdicts ({report['positives']} flagged) in {elapsed:.1f}s\n"
+            f"**Holdout:** {report.get('cleared_ratio', 0.0):.1%} of {report['test']} messages would skip the API, "
+            f"{report.get('missed', 0)}/{report.get('test_positives', 0)} flagged ones among them "
+            f"({report.get('agreement', 0.0):.2%} agreement)\n"
+            f"Classifier is **{'on' if holdout_ok else 'off'}**"
+        ))
+        self.logger.info(f"Trained local classifier on {report['train']} verdicts, holdout agreement {report.get('agreement', 0.0):.2%}")
+
+    @automod_group.command(name="classifier")
+    @commands.has_permissions(manage_guild=True)
+    async def automod_classifier(self, ctx, enabled: bool):
+        """Turn the local classifier on or off"""
+        if enabled and self.classifier.weights is None:
+            return await ctx.send("No trained model, run `automod train` first")
+
+        if enabled:
+            self.classifier.enable()
+        else:
+            self.classifier.enabled = False
+            self.classifier.fallback_reason = f"disabled by {ctx.author}"
+
+        await ctx.send(f"✅ Local classifier {'enabled' if enabled else 'disabled'}")
+        self.logger.info(f"{ctx.author} {'enabled' if enabled else 'disabled'} the local classifier")
+
     @automod_group.command(name="threshold")
     @commands.has_permissions(manage_guild=True)
     async def set_threshold(self, ctx, category: str, threshold: float):
@@ -3,7 +3,19 @@ from disnake.ext import commands
 import asyncio
 import re
 import datetime
+import time
+import warnings
+from collections import Counter
 from cogs.common.base_cog import BaseCog
+from cogs.common.role_waiters import RoleWaiters
+from cogs.common.action_correlator import ActionCorrelator, Trigger, BotAction, command_actions
+from cogs.common.bulk_executor import BulkExecutor, BulkStatus
+from cogs.common.detectors import CommandDetector, MOD_COMMAND_KEYWORDS, BOT_PREFIXES, build_engine, load_corpus, DEFAULT_CORPUS
+
+# "Banned by <@id>", "Moderator: name (id)", "Responsible: id", an ID anywhere else in
+# the reason may just as well be the victim
+ATTRIBUTION_RE = re.compile(r"\b(?:by|moderator|responsible)\b[^<\n]{0,40}?(?:<@!?(\d+)>|\b(\d{17,20})\b)", re.IGNORECASE)
+
 
 class BotLoyaltyCog(BaseCog):
     """Makes sure moderators only use RetardiBot for moderation actions"""
@@ -11,24 +23,13 @@ class BotLoyaltyCog(BaseCog):
     def __init__(self, bot):
         super().__init__(bot)
         
-        # Common moderation command keywords to look for
-        self.mod_command_keywords = [
-            "ban", "kick", "mute", "timeout", "warn", "unban", "unmute", 
-            "untimeout", "clear", "purge", "delete", "lock", "unlock"
-        ]
-        
-        # Common bot prefixes to watch for
-        self.common_bot_prefixes = ["!", "?", ".", "-", "$", "~", ";", ">", "<", "|", "+"]
+        # Common moderation command keywords and bot prefixes to look for
+        self.mod_command_keywords = MOD_COMMAND_KEYWORDS
+        self.common_bot_prefixes = BOT_PREFIXES
         
-        # Create a proper regex pattern that escapes the dash to avoid "bad character range" error
-        bot_prefixes_pattern = ''.join([re.escape(p) for p in self.common_bot_prefixes])
-        mod_keywords_pattern = '|'.join(self.mod_command_keywords)
-        
-        # Regex patterns for detecting bot commands
-        self.command_patterns = [
-            re.compile(fr"^[{bot_prefixes_pattern}](?:{mod_keywords_pattern})\b", re.IGNORECASE),  # Prefix commands like !ban
-            re.compile(fr"^/(?:{mod_keywords_pattern})\b", re.IGNORECASE)  # Slash commands like /ban
-        ]
+        # One regex pass per message, checked against scripts/fixtures/detector_corpus.jsonl
+        # by scripts/bench_detectors.py and `loyalty test`
+        self.command_detector = CommandDetector(self.common_bot_prefixes, self.mod_command_keywords)
         
         # Get owner_id from config, properly handling TOML structure
         config = getattr(self.bot, 'config', {})
@@ -38,15 +39,23 @@ class BotLoyaltyCog(BaseCog):
         automod_config = config.get("automod", {})
         self.alert_channel_id = automod_config.get("alert_channel_id")
         
-        # Staff role ID (specifically mentioned in your message)
-        self.staff_role_id = 1342693546511040559
+        # Staff roles come from [staff] in the config, shared with every other permission check
+        self.staff_role_ids = config.get("staff", {}).get("role_ids", [])
         
         # Detainee role ID used by other bots for muting
         self.detainee_role_id = 1342693546511040555
         
-        # Role checking wait settings
-        self.role_check_attempts = 10  # Number of attempts to check for the role
-        self.role_check_delay = 2.0    # Delay in seconds between checks
+        # How long to wait for another bot to apply the detainee role
+        self.role_wait_timeout = 20.0
+        # Resolved from member update events instead of polling fetch_member
+        self.role_waiters = RoleWaiters()
+
+        # Reversals run concurrently per rate-limit bucket and report into one status message
+        self.executor = BulkExecutor(self.logger, concurrency=4)
+
+        # Audit log detector: other bots' moderation actions, paired with the staff member behind them
+        self.correlator = ActionCorrelator(window=15)
+        self.detector_stats = Counter()
         
         # Debug mode - can be toggled with a command
         self.debug_mode = False
@@ -56,7 +65,7 @@ class BotLoyaltyCog(BaseCog):
         
         self.logger.info(f"Bot Loyalty cog initialized, protecting {len(self.mod_command_keywords)} command types")
         self.logger.info(f"Owner ID: {self.owner_id}, Alert Channel ID: {self.alert_channel_id}")
-        self.logger.info(f"Staff Role ID: {self.staff_role_id}, Detainee Role ID: {self.detainee_role_id}")
+        self.logger.info(f"Staff Role IDs: {self.staff_role_ids}, Detainee Role ID: {self.detainee_role_id}")
         self.logger.info(f"Debug mode: {self.debug_mode}, Test owner mode: {self.test_owner_too}")
     
     def has_staff_permissions(self, member):
@@ -64,27 +73,11 @@ class BotLoyaltyCog(BaseCog):
         # Safety check - if this is a User not a Member, we don't have guild permissions
         if not isinstance(member, disnake.Member):
             return False
-            
-        # Check for admin permissions
-        if member.guild_permissions.administrator:
-            if self.debug_mode:
-                self.logger.debug(f"User {member.id} has administrator permissions")
-            return True
-            
-        # Check for the specific staff role
-        staff_role = member.guild.get_role(self.staff_role_id)
-        if staff_role and staff_role in member.roles:
-            if self.debug_mode:
-                self.logger.debug(f"User {member.id} has the staff role")
-            return True
-            
-        # Check for mod role using the BaseCog method
-        if self.has_mod_role(member):
-            if self.debug_mode:
-                self.logger.debug(f"User {member.id} has the mod role")
-            return True
-            
-        return False
+
+        is_staff = self.is_staff(member)
+        if self.debug_mode:
+            self.logger.debug(f"User {member.id} is staff: {is_staff}")
+        return is_staff
     
     async def is_message_for_another_bot(self, message):
         """Determine if the message appears to be a command for another bot"""
@@ -100,83 +93,70 @@ class BotLoyaltyCog(BaseCog):
                 self.logger.debug(f"Skipping message mentioning our bot from {message.author.id}")
             return False
         
-        # Check if message starts with a bot prefix and contains a mod command keyword
-        for i, pattern in enumerate(self.command_patterns):
-            match = pattern.search(message.content)
-            if match:
-                if self.debug_mode:
-                    self.logger.debug(f"Command detected: '{message.content}' from {message.author.id} matched pattern {i+1}: '{match.group(0)}'")
-                return True
-                
-        # If message mentions another bot
-        for user in message.mentions:
-            if user.bot and user.id != self.bot.user.id:
-                # Check if the message has mod command keywords
-                for keyword in self.mod_command_keywords:
-                    if keyword in message.content.lower():
-                        if self.debug_mode:
-                            self.logger.debug(f"Bot mention detected: '{message.content}' from {message.author.id} mentioned bot {user.id} with keyword '{keyword}'")
-                        return True
+        # Prefix commands, or mod command keywords in a message that mentions another bot
+        mentions_other_bot = any(user.bot and user.id != self.bot.user.id for user in message.mentions)
+        match = self.command_detector.match(message.content, mentions_other_bot)
+        if match:
+            if self.debug_mode:
+                self.logger.debug(f"Command detected: '{message.content}' from {message.author.id} matched '{match}'"
+                                  f"{' (mentions another bot)' if mentions_other_bot else ''}")
+            return True
                     
         if self.debug_mode:
             self.logger.debug(f"Message '{message.content}' from {message.author.id} does not appear to be a command for another bot")
         return False
     
-    async def wait_for_role_and_remove(self, member, role, channel, guild):
-        """Wait for a role to be applied and then remove it"""
+    def cog_unload(self):
+        self.role_waiters.cancel_all()
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before, after):
+        if before.roles != after.roles:
+            self.role_waiters.notify(after.guild.id, after.id, [role.id for role in after.roles])
+
+    @commands.Cog.listener()
+    async def on_raw_member_update(self, member):
+        # Also fires for members that aren't cached
+        self.role_waiters.notify(member.guild.id, member.id, [role.id for role in member.roles])
+
+    async def wait_for_role_and_remove(self, member, role, channel, guild, status=None):
+        """Wait for a role to be applied and then remove it, reporting to `status` if given"""
         self.logger.debug(f"Starting role wait-and-remove process for user {member.id}")
-        
-        # Get updated member object
+
+        # The cached member is kept current by the gateway, so no fetch is needed
+        member = guild.get_member(member.id) or member
+        if role not in member.roles:
+            self.logger.debug(f"User {member.id} doesn't have the role yet, waiting up to {self.role_wait_timeout}s")
+            started = time.monotonic()
+            if not await self.role_waiters.wait(guild.id, member.id, role.id, self.role_wait_timeout):
+                self.logger.debug(f"Role not applied within {self.role_wait_timeout}s for user {member.id}")
+                if status:
+                    status.add("Detainee role never applied")
+                return False
+            self.logger.debug(f"Role applied to user {member.id} after {time.monotonic() - started:.2f}s")
+            member = guild.get_member(member.id) or member
+        else:
+            self.logger.debug(f"User {member.id} already has the role, removing immediately")
+
         try:
-            member = await guild.fetch_member(member.id)
+            await self.executor.submit("roles", lambda: member.remove_roles(role, reason="Reversed mute from unauthorized bot usage"))
         except Exception as e:
-            self.logger.error(f"Error fetching updated member data: {e}")
+            self.logger.error(f"Error removing role: {e}")
+            if status:
+                status.add("Removed detainee role", failure=f"{member.mention} detainee role: {e}")
+            else:
+                await channel.send(f"Failed to remove role from {member.mention}: {e}")
             return False
-        
-        # If the member already has the role, remove it immediately
-        if role in member.roles:
-            self.logger.debug(f"User {member.id} already has the role, removing immediately")
-            await member.remove_roles(role, reason="Reversed mute from unauthorized bot usage")
+
+        if status:
+            status.add("Removed detainee role")
+        else:
             await channel.send(f"Reversed mute for {member.mention} (detainee role removed)")
-            return True
-            
-        # Otherwise, wait and check for the role
-        self.logger.debug(f"User {member.id} doesn't have the role yet, starting wait loop")
-        
-        for attempt in range(1, self.role_check_attempts + 1):
-            self.logger.debug(f"Role check attempt {attempt}/{self.role_check_attempts} for user {member.id}")
-            
-            # Wait for a short time
-            await asyncio.sleep(self.role_check_delay)
-            
-            # Refresh member data to get current roles
-            try:
-                # We need to fetch the member again to get updated role info
-                updated_member = await guild.fetch_member(member.id)
-                
-                self.logger.debug(f"User {member.id} has roles: {[r.id for r in updated_member.roles]}")
-                self.logger.debug(f"Looking for role {role.id} ({role.name})")
-                
-                if role in updated_member.roles:
-                    self.logger.debug(f"Role found on attempt {attempt} for user {member.id}, removing it")
-                    try:
-                        await updated_member.remove_roles(role, reason="Reversed mute from unauthorized bot usage")
-                        await channel.send(f"Reversed mute for {member.mention} (detainee role removed after {attempt} attempt{'s' if attempt > 1 else ''})")
-                        return True
-                    except Exception as e:
-                        self.logger.error(f"Error removing role: {e}")
-                        await channel.send(f"Failed to remove role from {member.mention}: {e}")
-                        return False
-            except Exception as e:
-                self.logger.error(f"Error checking/removing role on attempt {attempt}: {e}")
-        
-        self.logger.debug(f"Role not found after {self.role_check_attempts} attempts for user {member.id}")
-        return False
+        return True
     
-    async def try_reverse_mod_action(self, message, guild):
-        """Attempt to reverse any moderation action that might have been performed"""
-        # Extract potential user IDs from the message
-        user_matches = re.findall(r'<@!?(\d+)>|(\d{17,20})', message.content)
+    def extract_user_ids(self, text):
+        """Extract user IDs from mentions and raw snowflakes in a piece of text"""
+        user_matches = re.findall(r'<@!?(\d+)>|(\d{17,20})', text or "")
         target_user_ids = []
         
         for match in user_matches:
@@ -186,6 +166,12 @@ class BotLoyaltyCog(BaseCog):
                     target_user_ids.append(int(user_id))
                 except ValueError:
                     pass
+        return target_user_ids
+
+    async def try_reverse_mod_action(self, message, guild):
+        """Attempt to reverse any moderation action that might have been performed"""
+        # Extract potential user IDs from the message
+        target_user_ids = list(dict.fromkeys(self.extract_user_ids(message.content)))
         
         if self.debug_mode:           
             self.logger.debug(f"Extracted potential target IDs from message: {target_user_ids}")
@@ -193,72 +179,268 @@ class BotLoyaltyCog(BaseCog):
         if not target_user_ids:
             self.logger.debug("No target user IDs found to reverse actions for")
             return False
-            
-        actions_reversed = False
-        
+
+        content = message.content.lower()
+        reason = "Reversed action from unauthorized bot usage"
+        jobs = []
+        detainees = []
+
         # Check for ban command
-        if any(kw in message.content.lower() for kw in ["ban"]) and not any(kw in message.content.lower() for kw in ["unban"]):
+        if "ban" in content and "unban" not in content:
             self.logger.debug(f"Detected potential ban command, attempting to reverse for {len(target_user_ids)} users")
-            
             for user_id in target_user_ids:
-                try:
-                    # Try to unban the user
-                    await guild.unban(disnake.Object(id=user_id))
-                    await message.channel.send(f"Reversed ban action on user ID: {user_id}")
-                    self.logger.info(f"Reversed ban for user ID {user_id}")
-                    actions_reversed = True
-                except (disnake.NotFound, disnake.HTTPException) as e:
-                    self.logger.debug(f"Failed to reverse ban for {user_id}: {e}")
+                jobs.append(("bans", ("Unbanned", user_id),
+                             lambda user_id=user_id: guild.unban(disnake.Object(id=user_id), reason=reason)))
             
         # Check for timeout/mute command
-        if any(kw in message.content.lower() for kw in ["timeout", "mute"]) and not any(kw in message.content.lower() for kw in ["untimeout", "unmute"]):
+        if any(kw in content for kw in ["timeout", "mute"]) and not any(kw in content for kw in ["untimeout", "unmute"]):
             self.logger.debug(f"Detected potential timeout/mute command, attempting to reverse for {len(target_user_ids)} users")
             
             # Get the detainee role
             detainee_role = guild.get_role(self.detainee_role_id)
             if not detainee_role:
                 self.logger.warning(f"Could not find detainee role with ID {self.detainee_role_id}")
-                self.logger.debug(f"Available roles in guild: {[r.id for r in guild.roles]}")
-            else:
-                self.logger.debug(f"Found detainee role: {detainee_role.name} ({detainee_role.id})")
             
             for user_id in target_user_ids:
-                try:
-                    member = guild.get_member(user_id)
-                    if member:
-                        timeout_removed = False
-                        
-                        # Check and remove timeout if present
-                        if member.timed_out_until:
-                            self.logger.debug(f"User {user_id} is timed out until {member.timed_out_until}, removing timeout")
-                            await member.timeout(None, reason="Reversed timeout from unauthorized bot usage")
-                            await message.channel.send(f"Reversed timeout for {member.mention}")
-                            self.logger.info(f"Reversed timeout for user {member.id}")
-                            timeout_removed = True
-                            actions_reversed = True
-                            
-                        # Start a task to wait for and remove the detainee role
-                        if detainee_role:
-                            self.logger.debug(f"Starting background task to wait for and remove detainee role for {member.id}")
-                            # Create a separate task that we don't await - it will run in the background
-                            task = asyncio.create_task(
-                                self.wait_for_role_and_remove(member, detainee_role, message.channel, guild)
-                            )
-                            # Add a name to the task to make debugging easier
-                            task.set_name(f"remove_role_{member.id}")
-                            actions_reversed = True
-                            
-                        if not timeout_removed and not detainee_role:
-                            self.logger.debug(f"User {user_id} is not muted or timed out, and no detainee role exists")
-                    else:
-                        self.logger.debug(f"Could not find member with ID {user_id} in guild")
-                except Exception as e:
-                    self.logger.debug(f"Failed to reverse mute actions for {user_id}: {e}")
+                member = guild.get_member(user_id)
+                if not member:
+                    self.logger.debug(f"Could not find member with ID {user_id} in guild")
+                    continue
+
+                # Remove the timeout if present
+                if member.timed_out_until:
+                    jobs.append(("members", ("Removed timeout", user_id),
+                                 lambda member=member: member.timeout(None, reason=reason)))
+                # Wait for and remove the detainee role in the background
+                if detainee_role:
+                    detainees.append(member)
+
+        if not jobs and not detainees:
+            return False
+
+        # One status message for the whole batch instead of one per user
+        status = BulkStatus(message.channel, f"Reversing moderation by {message.author.display_name}")
+        await status.start(len(jobs) + len(detainees))
+
+        for member in detainees:
+            task = asyncio.create_task(
+                self.wait_for_role_and_remove(member, detainee_role, message.channel, guild, status=status)
+            )
+            # Add a name to the task to make debugging easier
+            task.set_name(f"remove_role_{member.id}")
+
+        async def on_result(label, error):
+            action, user_id = label
+            if error is None:
+                self.logger.info(f"{action} user {user_id}")
+                status.add(action)
+            elif isinstance(error, disnake.NotFound):
+                # Nothing to undo (yet), e.g. the other bot never banned them
+                status.add("Nothing to reverse")
+            else:
+                self.logger.debug(f"Failed to reverse action for {user_id}: {error}")
+                status.add(action, failure=f"<@{user_id}> {action.lower()}: {error}")
+
+        await self.executor.run(jobs, on_result)
+        if not detainees:
+            await status.finish()
         
         if self.debug_mode:
-            self.logger.debug(f"Reversal attempt complete, actions_reversed={actions_reversed}")
-        return actions_reversed
+            self.logger.debug(f"Reversal attempt complete: {len(jobs)} API actions, {len(detainees)} role waits")
+        return True
     
+    def classify_audit_entry(self, entry):
+        """Map an audit log entry to the kind of moderation action it records, or None"""
+        if entry.action == disnake.AuditLogAction.ban:
+            return "ban"
+        if entry.action == disnake.AuditLogAction.kick:
+            return "kick"
+        if entry.action == disnake.AuditLogAction.member_update and getattr(entry.after, "timeout", None):
+            return "timeout"
+        if entry.action == disnake.AuditLogAction.member_role_update:
+            added = getattr(entry.after, "roles", None) or []
+            if any(role.id == self.detainee_role_id for role in added):
+                return "detain"
+        return None
+
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry):
+        actor = entry.user
+        if actor is None or actor.id == self.bot.user.id or not getattr(actor, "bot", False):
+            return
+
+        kind = self.classify_audit_entry(entry)
+        if kind is None or entry.target is None:
+            return
+
+        self.detector_stats["audit_actions"] += 1
+        action = BotAction(kind, actor.id, entry.target.id, entry)
+        if self.debug_mode:
+            self.logger.debug(f"Audit log: bot {actor.id} did {kind} on {action.target_id}, reason: {entry.reason}")
+
+        trigger = self.correlator.add_action(entry.guild.id, action)
+        if trigger:
+            return await self.enforce_bot_action(entry.guild, action, trigger)
+
+        # Many bots put the responsible moderator in the audit log reason. The
+        # trigger only covers this entry's target, so it can't claim the bot's
+        # other actions
+        for user_id in self.extract_attributed_ids(entry.reason):
+            staff = entry.guild.get_member(user_id)
+            if staff and self.has_staff_permissions(staff):
+                trigger = Trigger("reason", staff, bot_id=actor.id, targets=[action.target_id])
+                for matched in self.correlator.add_trigger(entry.guild.id, trigger):
+                    await self.enforce_bot_action(entry.guild, matched, trigger)
+                return
+
+    def extract_attributed_ids(self, reason):
+        """User IDs an audit log reason names as the responsible moderator"""
+        return [int(mention or snowflake) for mention, snowflake in ATTRIBUTION_RE.findall(reason or "")]
+
+    def response_targets(self, message, staff):
+        """Users a slash command response is about, from its mentions, text and embeds"""
+        texts = [message.content]
+        for embed in message.embeds:
+            texts += [embed.title, embed.description] + [f"{field.name} {field.value}" for field in embed.fields]
+
+        targets = {user.id for user in message.mentions if not user.bot}
+        target_user = getattr(message.interaction_metadata, "target_user", None)
+        if target_user:
+            targets.add(target_user.id)
+        for text in texts:
+            targets.update(self.extract_user_ids(text))
+        targets.discard(staff.id)
+        targets.discard(message.author.id)
+        return targets
+
+    async def record_slash_trigger(self, message):
+        """Treat another bot's response to a staff member's moderation slash command as a trigger"""
+        metadata = message.interaction_metadata
+        staff = message.guild.get_member(metadata.user.id)
+        if not staff or not self.has_staff_permissions(staff):
+            return
+
+        # Only the command name says what it was, /rank never explains a ban.
+        # interaction_metadata doesn't have it, the deprecated interaction does
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            interaction = message.interaction
+        action_kinds = command_actions(interaction.name if interaction else None)
+        if not action_kinds:
+            return
+
+        trigger = Trigger("slash", staff, bot_id=message.author.id, targets=self.response_targets(message, staff),
+                          action_kinds=action_kinds, message=message)
+        for action in self.correlator.add_trigger(message.guild.id, trigger):
+            await self.enforce_bot_action(message.guild, action, trigger)
+
+    async def reverse_bot_action(self, guild, action):
+        """Undo exactly the action recorded in the audit log, returning (result, failure or None)"""
+        reason = "Reversed action from unauthorized bot usage"
+        target = f"<@{action.target_id}>"
+        try:
+            if action.kind == "ban":
+                await self.executor.submit("bans", lambda: guild.unban(disnake.Object(id=action.target_id), reason=reason))
+                return "Unbanned", None
+
+            if action.kind == "kick":
+                return "Kicked (can't be reversed)", None
+
+            member = guild.get_member(action.target_id)
+            if not member:
+                return "Left the server", None
+
+            if action.kind == "timeout":
+                await self.executor.submit("members", lambda: member.timeout(None, reason=reason))
+                return "Removed timeout", None
+
+            if action.kind == "detain":
+                await self.executor.submit("roles", lambda: member.remove_roles(disnake.Object(id=self.detainee_role_id), reason=reason))
+                return "Removed detainee role", None
+        except disnake.NotFound:
+            # The text detector got there first
+            return "Already reversed", None
+        except disnake.HTTPException as e:
+            self.logger.error(f"Failed to reverse {action.kind} on {action.target_id}: {e}")
+            return "Failed", f"{target} {action.kind}: {e}"
+
+    async def enforce_bot_action(self, guild, action, trigger):
+        """Reverse an action another bot took for a staff member, warning them if the text detector missed it"""
+        self.detector_stats["audit_correlated"] += 1
+        self.detector_stats[f"via_{trigger.kind}"] += 1
+
+        # Skip bot owners unless in test mode
+        if await self.bot.is_owner(trigger.staff) and not self.test_owner_too:
+            return
+
+        # A mass action is many entries for one trigger, report them together
+        first = trigger.status is None
+        if first and trigger.kind != "command" and trigger.message:
+            trigger.status = BulkStatus(trigger.message.channel, f"Reversing moderation by {trigger.staff.display_name}")
+        elif first:
+            trigger.status = False
+
+        if trigger.status:
+            await trigger.status.start(1)
+
+        result, failure = await self.reverse_bot_action(guild, action)
+        self.detector_stats["reversed"] += 1
+        self.logger.info(f"Audit log detector: {result} <@{action.target_id}> (bot {action.actor_id}, staff {trigger.staff.id}, via {trigger.kind})")
+        if trigger.status:
+            trigger.status.add(result, failure=failure)
+
+        # The text detector already warned and alerted for prefix commands
+        if trigger.kind == "command":
+            self.detector_stats["text_confirmed"] += 1
+            return
+        self.detector_stats["audit_only"] += 1
+        if not first:
+            return
+
+        if trigger.message:
+            try:
+                await trigger.message.channel.send(f"{trigger.staff.mention} Use {self.bot.user.mention}")
+            except disnake.HTTPException as e:
+                self.logger.debug(f"Failed to send loyalty warning: {e}")
+
+        mod_cog = self.bot.get_cog("ModerationCog")
+        if mod_cog:
+            mod_cog._add_mod_action(
+                guild.id,
+                trigger.staff.id,
+                self.bot.user.id,
+                "WARN",
+                f"Used another bot (ID: {action.actor_id}) to {action.kind} <@{action.target_id}>"
+            )
+
+        await self.alert_owner_audit(guild, action, trigger, f"{failure or result} (<@{action.target_id}>)")
+
+    async def alert_owner_audit(self, guild, action, trigger, result):
+        """Send an alert to the owner about a violation found through the audit log"""
+        alert_channel = self.bot.get_channel(self.alert_channel_id) if self.alert_channel_id else None
+        if not alert_channel:
+            self.logger.warning(f"Could not find alert channel with ID {self.alert_channel_id}")
+            return
+
+        embed = disnake.Embed(
+            title="⚠️ Bot Loyalty Violation ⚠️",
+            description="A moderator used another bot for moderation (found in the audit log)",
+            color=disnake.Color.red(),
+            timestamp=datetime.datetime.utcnow()
+        )
+
+        embed.add_field(name="Moderator", value=f"{trigger.staff.mention} ({trigger.staff.name}, ID: {trigger.staff.id})", inline=False)
+        embed.add_field(name="Server", value=f"{guild.name} (ID: {guild.id})", inline=True)
+        embed.add_field(name="Bot Used", value=f"<@{action.actor_id}> (ID: {action.actor_id})", inline=True)
+        embed.add_field(name="Action", value=f"{action.kind} on <@{action.target_id}>\nReason: {action.entry.reason or 'None'}", inline=False)
+        embed.add_field(name="Matched By", value="audit log reason" if trigger.kind == "reason" else "slash command response", inline=True)
+        embed.add_field(name="Action Taken", value=result, inline=False)
+
+        try:
+            await alert_channel.send(f"<@{self.owner_id}> - Bot Loyalty Alert!", embed=embed)
+        except Exception as e:
+            self.logger.error(f"Failed to send alert to owner: {e}", exc_info=True)
+
     async def alert_owner(self, message, action_type):
         """Send an alert to the owner via the log channel"""
         if not self.alert_channel_id:
@@ -312,6 +494,12 @@ class BotLoyaltyCog(BaseCog):
                 self.logger.debug("Skipping message from our bot")
             return
         
+        # Other bots' slash command responses name the staff member who ran the command
+        if message.author.bot:
+            if getattr(message, "interaction_metadata", None):
+                await self.record_slash_trigger(message)
+            return
+
         # Make sure we're dealing with a Member object
         if not isinstance(message.author, disnake.Member):
             if self.debug_mode:
@@ -342,6 +530,17 @@ class BotLoyaltyCog(BaseCog):
             
         if command_detected:
             self.logger.warning(f"Detected moderation command for another bot: {message.author} tried to use '{message.content}'")
+            self.detector_stats["text_hits"] += 1
+
+            # Let the audit log detector reverse exactly what the other bot ends up doing,
+            # if the command can ban, kick, time out or detain anyone (not `!purge 50`)
+            action_kinds = command_actions(message.content)
+            if action_kinds:
+                bot_ids = {user.id for user in message.mentions if user.bot}
+                targets = [user_id for user_id in self.extract_user_ids(message.content) if user_id not in bot_ids]
+                trigger = Trigger("command", message.author, targets=targets, action_kinds=action_kinds, message=message)
+                for action in self.correlator.add_trigger(message.guild.id, trigger):
+                    await self.enforce_bot_action(message.guild, action, trigger)
             
             try:
                 # Track actions we take
@@ -410,10 +609,29 @@ class BotLoyaltyCog(BaseCog):
         embed.add_field(name="Debug Mode", value=f"{'Enabled' if self.debug_mode else 'Disabled'}", inline=True)
         embed.add_field(name="Test Owner Mode", value=f"{'Enabled' if self.test_owner_too else 'Disabled'}", inline=True)
         embed.add_field(name="Alert Channel", value=f"<#{self.alert_channel_id}>" if self.alert_channel_id else "None", inline=True)
-        embed.add_field(name="Staff Role", value=f"<@&{self.staff_role_id}>", inline=True)
+        embed.add_field(name="Staff Roles", value=", ".join(f"<@&{role_id}>" for role_id in self.staff_role_ids) or "None", inline=True)
         embed.add_field(name="Detainee Role", value=f"<@&{self.detainee_role_id}>", inline=True)
-        embed.add_field(name="Role Check Settings", value=f"{self.role_check_attempts} attempts, {self.role_check_delay}s delay", inline=True)
+        waiter_stats = self.role_waiters.stats()
+        embed.add_field(
+            name="Role Wait",
+            value=f"{self.role_wait_timeout}s timeout\n"
+                  f"{waiter_stats['outstanding']} waiting, {waiter_stats['resolved']} reversed "
+                  f"(avg {waiter_stats['avg_wait']:.2f}s), {waiter_stats['timed_out']} timed out",
+            inline=True
+        )
         
+        stats = self.detector_stats
+        correlated = stats["audit_correlated"]
+        text_rate = f" ({stats['text_confirmed'] / correlated:.0%})" if correlated else ""
+        embed.add_field(
+            name="Detectors",
+            value=f"**Text:** {stats['text_hits']} hits, {stats['text_confirmed']} confirmed by the audit log{text_rate}\n"
+                  f"**Audit log:** {stats['audit_actions']} other-bot actions, {correlated} matched to staff "
+                  f"({stats['via_command']} command, {stats['via_slash']} slash, {stats['via_reason']} reason), "
+                  f"{stats['audit_only']} missed by text, {stats['reversed']} reversed",
+            inline=False
+        )
+
         await ctx.send(embed=embed)
     
     @loyalty_group.command(name="debug")
@@ -442,27 +660,53 @@ class BotLoyaltyCog(BaseCog):
         await ctx.send(f"Test owner mode {'enabled' if self.test_owner_too else 'disabled'}")
         self.logger.info(f"Test owner mode set to {self.test_owner_too} by {ctx.author.id}")
     
-    @loyalty_group.command(name="rolecheck")
+    @loyalty_group.command(name="rolewait")
     @commands.is_owner()
-    async def loyalty_role_check(self, ctx, attempts: int = None, delay: float = None):
-        """Set role check attempts and delay (in seconds)"""
-        if attempts is not None:
-            self.role_check_attempts = max(1, min(attempts, 20))  # Between 1 and 20
-            
-        if delay is not None:
-            self.role_check_delay = max(0.5, min(delay, 5.0))  # Between 0.5 and 5 seconds
-            
-        await ctx.send(f"Role check settings updated: {self.role_check_attempts} attempts with {self.role_check_delay}s delay")
-        self.logger.info(f"Role check settings updated: {self.role_check_attempts} attempts, {self.role_check_delay}s delay")
+    async def loyalty_role_wait(self, ctx, timeout: float):
+        """Set how long to wait (in seconds) for another bot to apply the detainee role"""
+        self.role_wait_timeout = max(1.0, min(timeout, 120.0))  # Between 1 and 120 seconds
+
+        await ctx.send(f"Role wait timeout set to {self.role_wait_timeout}s")
+        self.logger.info(f"Role wait timeout set to {self.role_wait_timeout}s by {ctx.author.id}")
     
     @loyalty_group.command(name="test")
     @commands.is_owner()
-    async def loyalty_test(self, ctx, *, test_command: str):
-        """Test if a command would be detected by the bot loyalty system"""
-        if await self.is_message_for_another_bot(ctx.message):
-            await ctx.send(f"✅ Command **WOULD** be detected as another bot's command: `{test_command}`")
-        else:
-            await ctx.send(f"❌ Command would **NOT** be detected as another bot's command: `{test_command}`")
+    async def loyalty_test(self, ctx, *, test_command: str = None):
+        """Test a command against the detectors, or run them over the whole labeled corpus"""
+        engine = build_engine(getattr(self.bot, 'config', {}))
+
+        if test_command:
+            sample = {"text": test_command, "mentions_bot": any(user.bot for user in ctx.message.mentions)}
+            match, elapsed_ns = engine.run("loyalty_command", sample)
+            if match:
+                await ctx.send(f"✅ Command **WOULD** be detected as another bot's command: `{test_command}` "
+                               f"(matched `{match}`, {elapsed_ns / 1000:.1f}µs)")
+            else:
+                await ctx.send(f"❌ Command would **NOT** be detected as another bot's command: `{test_command}` "
+                               f"({elapsed_ns / 1000:.1f}µs)")
+            return
+
+        try:
+            samples = load_corpus(DEFAULT_CORPUS)
+        except (OSError, ValueError) as e:
+            return await ctx.send(f"❌ Failed to load the detector corpus: {e}")
+
+        reports = await asyncio.to_thread(engine.evaluate, samples)
+        embed = disnake.Embed(
+            title="Detector Corpus Results",
+            description=f"{len(samples)} labeled samples from `{DEFAULT_CORPUS}`",
+            color=disnake.Color.blue()
+        )
+        for name, report in reports.items():
+            errors = [f"FP: `{text}`" for text in report["false_positives"]]
+            errors += [f"FN: `{text}`" for text in report["false_negatives"]]
+            value = (f"**TP/FP/FN/TN:** {report['tp']}/{report['fp']}/{report['fn']}/{report['tn']}\n"
+                     f"**Speed:** {report['ns_per_message']:.0f}ns per message")
+            if errors:
+                value += "\n" + "\n".join(errors[:5])
+            embed.add_field(name=name, value=value[:1024], inline=False)
+
+        await ctx.send(embed=embed)
 
 def setup(bot):
     bot.add_cog(BotLoyaltyCog(bot))
\ No newline at end of file
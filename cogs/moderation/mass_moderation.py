@@ -0,0 +1,415 @@
+import disnake
+from disnake.ext import commands
+import datetime
+import asyncio
+import re
+from psycopg2.extras import execute_values
+from cogs.common.base_cog import BaseCog
+from cogs.common.db_manager import DBManager
+from cogs.common.bulk_executor import BulkExecutor, BulkStatus
+from cogs.common.component_router import get_component_router, make_custom_id
+from cogs.common.durations import parse_duration, format_duration
+
+# A user ID or mention as a command argument, and user IDs anywhere in an attached file
+TARGET_RE = re.compile(r"^(?:<@!?)?(\d{15,20})>?$")
+FILE_ID_RE = re.compile(r"\b\d{15,20}\b")
+MAX_FILE_SIZE = 1024 * 1024
+
+# Discord's limits on users per bulk ban request and timeout length
+BULK_BAN_SIZE = 200
+MAX_TIMEOUT = 2419200
+
+# action_type -> (result label, verb for messages)
+ACTIONS = {
+    "BAN": ("Banned", "ban"),
+    "KICK": ("Kicked", "kick"),
+    "TIMEOUT": ("Timed out", "timeout")
+}
+
+
+class MassModerationCog(BaseCog):
+    """Ban, kick or timeout many users at once, e.g. to clean up after a raid
+
+    Targets are shown for confirmation before anything happens. Each job is
+    stored in mass_actions and its results are checkpointed in batches
+    together with their mod_actions records, so a job interrupted by a
+    restart resumes with the targets it hadn't finished.
+    """
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.db = DBManager()
+
+        config = getattr(bot, "config", {})
+        mass_config = config.get("moderation", {}).get("mass", {})
+        self.max_targets = mass_config.get("max_targets", 1000)
+        self.checkpoint_every = mass_config.get("checkpoint_every", 25)
+        self.checkpoint_attempts = 3
+        self.executor = BulkExecutor(self.logger, concurrency=mass_config.get("concurrency", 4))
+
+        self._resumed = False
+        self._tasks = set()
+
+        self.router = get_component_router(bot)
+        self.router.register("mass", self.handle_mass_button)
+
+    def cog_unload(self):
+        self.router.unregister("mass")
+
+    def _create_job(self, guild_id, channel_id, moderator_id, action_type, reason, duration, targets):
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                INSERT INTO mass_actions (guild_id, channel_id, moderator_id, action_type, reason, duration, targets)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+                ''', (guild_id, channel_id, moderator_id, action_type, reason, duration, targets))
+                job_id = cursor.fetchone()[0]
+                conn.commit()
+                return job_id
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error in _create_job: {e}")
+            return None
+        finally:
+            self.db.release_connection(conn)
+
+    def _get_jobs(self, condition, params):
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute(f'''
+                SELECT id, guild_id, channel_id, moderator_id, action_type, reason, duration, targets, done, failed, status
+                FROM mass_actions WHERE {condition}
+                ''', params)
+                columns = [desc[0] for desc in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            self.logger.error(f"Database error in _get_jobs: {e}")
+            return []
+        finally:
+            self.db.release_connection(conn)
+
+    def _set_status(self, job_id, status, expected):
+        """Move a job from one status to another, False if it wasn't in the expected status"""
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                UPDATE mass_actions SET status = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND status = %s
+                ''', (status, job_id, expected))
+                conn.commit()
+                return cursor.rowcount == 1
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error in _set_status: {e}")
+            return False
+        finally:
+            self.db.release_connection(conn)
+
+    def _checkpoint(self, job, done, failed, finished=False):
+        """Record a batch of results: mod_actions rows for the successes and the job's progress, in one transaction
+
+        Returns whether it was saved.
+        """
+        conn = None
+        try:
+            conn = self.db.get_connection()
+            with conn.cursor() as cursor:
+                if done:
+                    execute_values(cursor, '''
+                    INSERT INTO mod_actions (guild_id, user_id, moderator_id, action_type, reason, duration)
+                    VALUES %s
+                    ''', [(job["guild_id"], user_id, job["moderator_id"], job["action_type"], job["reason"], job["duration"])
+                          for user_id in done])
+                cursor.execute('''
+                UPDATE mass_actions
+                SET done = done || %s::BIGINT[], failed = failed || %s::BIGINT[],
+                    status = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+                ''', (done, failed, "done" if finished else "running", job["id"]))
+                conn.commit()
+            return True
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Database error checkpointing mass action {job['id']}: {e}")
+            return False
+        finally:
+            self.db.release_connection(conn)
+
+    async def _resolve_targets(self, ctx, arguments):
+        """Split command arguments into target user IDs and a reason
+
+        Leading arguments are user IDs or mentions and the member filters
+        joined:<minutes> and name:<regex>; the rest is the reason. User IDs
+        in attached text files are added to the targets.
+        """
+        ids = []
+        joined = name_re = None
+        words = arguments.split()
+        consumed = 0
+        for word in words:
+            match = TARGET_RE.match(word)
+            if match:
+                ids.append(int(match.group(1)))
+            elif word.startswith("joined:"):
+                if not word[7:].isdigit():
+                    raise commands.BadArgument(f"`{word}` should be joined:<minutes>")
+                joined = int(word[7:])
+            elif word.startswith("name:"):
+                try:
+                    name_re = re.compile(word[5:], re.IGNORECASE)
+                except re.error as e:
+                    raise commands.BadArgument(f"Invalid name pattern `{word[5:]}`: {e}")
+            else:
+                break
+            consumed += 1
+        reason = " ".join(words[consumed:]) or None
+
+        for attachment in ctx.message.attachments:
+            if attachment.size <= MAX_FILE_SIZE:
+                text = (await attachment.read()).decode("utf-8", errors="ignore")
+                ids += [int(user_id) for user_id in FILE_ID_RE.findall(text)]
+
+        if joined is not None or name_re is not None:
+            cutoff = disnake.utils.utcnow() - datetime.timedelta(minutes=joined) if joined is not None else None
+            for member in ctx.guild.members:
+                if cutoff and (member.joined_at is None or member.joined_at < cutoff):
+                    continue
+                if name_re and not (name_re.search(member.name) or name_re.search(member.display_name)):
+                    continue
+                ids.append(member.id)
+
+        # Keep the order given, without duplicates
+        return list(dict.fromkeys(ids)), reason
+
+    def _allowed_targets(self, ctx, action_type, ids):
+        """Drop targets the author shouldn't act on: themselves, the bot, staff and anyone at or above their top role"""
+        allowed = []
+        for user_id in ids:
+            if user_id in (ctx.author.id, self.bot.user.id, ctx.guild.owner_id):
+                continue
+            member = ctx.guild.get_member(user_id)
+            if member is None:
+                # Users who already left can still be banned
+                if action_type == "BAN":
+                    allowed.append(user_id)
+                continue
+            if self.is_staff(member):
+                continue
+            if ctx.author.id != ctx.guild.owner_id and member.top_role >= ctx.author.top_role:
+                continue
+            allowed.append(user_id)
+        return allowed
+
+    async def prepare(self, ctx, action_type, arguments, duration=None):
+        """Resolve targets and ask for confirmation before running a mass action"""
+        try:
+            ids, reason = await self._resolve_targets(ctx, arguments)
+        except commands.BadArgument as e:
+            return await self.send_error(ctx, "Invalid Targets", str(e))
+
+        if not ids:
+            return await self.send_error(ctx, "No Targets", "Give user IDs, filters or a file of IDs.")
+        targets = self._allowed_targets(ctx, action_type, ids)
+        if not targets:
+            return await self.send_error(ctx, "No Targets", f"None of the {len(ids)} matched users can be targeted.")
+        if len(targets) > self.max_targets:
+            return await self.send_error(ctx, "Too Many Targets",
+                                         f"{len(targets)} users matched, the limit is {self.max_targets}. Narrow the filters.")
+
+        job_id = await asyncio.to_thread(self._create_job, ctx.guild.id, ctx.channel.id, ctx.author.id,
+                                         action_type, reason, duration, targets)
+        if job_id is None:
+            return await self.send_error(ctx, "Database Error", "Couldn't save the mass action, nothing was done.")
+
+        label, verb = ACTIONS[action_type]
+        preview = ", ".join(f"<@{user_id}>" for user_id in targets[:20])
+        if len(targets) > 20:
+            preview += f" and {len(targets) - 20} more"
+
+        embed = disnake.Embed(
+            title=f"Mass {verb} #{job_id}",
+            color=disnake.Color.orange(),
+            description=f"**{len(targets)}** users will be affected:\n{preview}"
+        )
+        skipped = len(ids) - len(targets)
+        if skipped:
+            embed.add_field(name="Skipped", value=f"{skipped} staff, protected or absent users", inline=True)
+        if duration:
+            embed.add_field(name="Duration", value=format_duration(duration), inline=True)
+        embed.add_field(name="Reason", value=reason or "No reason provided", inline=False)
+
+        await ctx.send(embed=embed, components=[
+            disnake.ui.Button(style=disnake.ButtonStyle.danger, label=f"{verb.capitalize()} {len(targets)} users",
+                              custom_id=make_custom_id("mass", "run", job_id)),
+            disnake.ui.Button(style=disnake.ButtonStyle.secondary, label="Cancel",
+                              custom_id=make_custom_id("mass", "cancel", job_id))
+        ])
+
+    async def handle_mass_button(self, interaction, tag, job_id):
+        """Start or cancel a pending mass action, only for the moderator who asked for it"""
+        jobs = await asyncio.to_thread(self._get_jobs, "id = %s", (int(job_id),))
+        if not jobs:
+            return await interaction.response.send_message("This mass action no longer exists.", ephemeral=True)
+        job = jobs[0]
+
+        if interaction.author.id != job["moderator_id"]:
+            return await interaction.response.send_message("Only the moderator who started this can confirm it.", ephemeral=True)
+
+        new_status = "running" if tag == "run" else "cancelled"
+        # Claimed atomically so a double click can't run the job twice
+        if not await asyncio.to_thread(self._set_status, job["id"], new_status, "pending"):
+            return await interaction.response.send_message(f"This mass action is already {job['status']}.", ephemeral=True)
+
+        if tag != "run":
+            return await interaction.response.edit_message(content="Mass action cancelled.", components=[])
+
+        await interaction.response.edit_message(components=[])
+        await self.run_job(job, interaction.channel)
+
+    async def run_job(self, job, channel):
+        """Apply a job to its remaining targets, checkpointing results as they come in"""
+        guild = self.bot.get_guild(job["guild_id"])
+        finished = set(job["done"]) | set(job["failed"])
+        remaining = [user_id for user_id in job["targets"] if user_id not in finished]
+        label, verb = ACTIONS[job["action_type"]]
+
+        moderator = guild.get_member(job["moderator_id"]) or job["moderator_id"]
+        audit_reason = f"Mass {verb} by {moderator}: {job['reason'] or 'No reason provided'}"
+        title = f"Mass {verb} #{job['id']}" + (" (resumed)" if finished else "")
+        status = BulkStatus(channel, title)
+        await status.start(len(remaining))
+
+        # Results not checkpointed yet. A failed checkpoint leaves its batch
+        # here, so the next one saves it instead of losing it
+        done, failed = [], []
+        checkpoint_lock = asyncio.Lock()
+        checkpoints = []
+
+        async def save(finished=False):
+            async with checkpoint_lock:
+                saved_done, saved_failed = len(done), len(failed)
+                if not await asyncio.to_thread(self._checkpoint, job, done[:saved_done], failed[:saved_failed], finished):
+                    return False
+                # Results recorded while saving were appended after these
+                del done[:saved_done]
+                del failed[:saved_failed]
+                return True
+
+        def record(user_id, error):
+            if error is None:
+                done.append(user_id)
+                status.add(label)
+            else:
+                failed.append(user_id)
+                status.add(label, failure=f"<@{user_id}>: {error}")
+
+            # One checkpoint at a time, the next one picks up whatever came in meanwhile
+            if len(done) + len(failed) >= self.checkpoint_every and (not checkpoints or checkpoints[-1].done()):
+                checkpoints.append(asyncio.create_task(save()))
+
+        completed = False
+        try:
+            if job["action_type"] == "BAN":
+                await self._bulk_ban(guild, remaining, audit_reason, record)
+            else:
+                if job["action_type"] == "KICK":
+                    def action(user_id):
+                        return lambda: guild.kick(disnake.Object(id=user_id), reason=audit_reason)
+                else:
+                    def action(user_id):
+                        return lambda: guild.timeout(disnake.Object(id=user_id), duration=job["duration"], reason=audit_reason)
+
+                async def on_result(user_id, error):
+                    record(user_id, error)
+
+                await self.executor.run([("members", user_id, action(user_id)) for user_id in remaining], on_result)
+            completed = True
+        finally:
+            # A job that didn't complete stays running, to be resumed on the next start.
+            # Only marked done by a checkpoint that also saved everything still unsaved
+            await asyncio.gather(*checkpoints)
+            for attempt in range(self.checkpoint_attempts):
+                if await save(finished=completed):
+                    break
+                if attempt + 1 < self.checkpoint_attempts:
+                    await asyncio.sleep(2 ** attempt)
+            else:
+                self.logger.error(f"Couldn't save {len(done) + len(failed)} results of mass action {job['id']}, "
+                                  f"they'll be retried when it resumes on the next start")
+            await status.finish()
+
+    async def _bulk_ban(self, guild, user_ids, reason, record):
+        """Ban in chunks through the bulk ban endpoint instead of one request per user"""
+        for start in range(0, len(user_ids), BULK_BAN_SIZE):
+            chunk = [disnake.Object(id=user_id) for user_id in user_ids[start:start + BULK_BAN_SIZE]]
+            try:
+                result = await self.executor.submit("bans", lambda: guild.bulk_ban(chunk, reason=reason))
+            except disnake.HTTPException as e:
+                # Raised when none of the chunk could be banned
+                for user in chunk:
+                    record(user.id, e)
+                continue
+
+            for user in result.banned:
+                record(user.id, None)
+            for user in result.failed:
+                record(user.id, "already banned or not bannable")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Resume mass actions that were running when the bot stopped"""
+        if self._resumed:
+            return
+        self._resumed = True
+
+        for job in await asyncio.to_thread(self._get_jobs, "status = %s", ("running",)):
+            guild = self.bot.get_guild(job["guild_id"])
+            channel = guild.get_channel(job["channel_id"]) if guild else None
+            if channel is None:
+                self.logger.warning(f"Can't resume mass action {job['id']}, its guild or channel is gone")
+                await asyncio.to_thread(self._set_status, job["id"], "abandoned", "running")
+                continue
+
+            self.logger.info(f"Resuming mass action {job['id']} ({job['action_type']})")
+            task = asyncio.create_task(self.run_job(job, channel))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    async def massban(self, ctx, *, targets=""):
+        """Ban many users at once
+        Give user IDs or mentions, joined:<minutes> and/or name:<regex> to
+        match current members, or attach a file of IDs, then the reason.
+        Example: massban joined:30 name:^free.?nitro raid accounts"""
+        await self.prepare(ctx, "BAN", targets)
+
+    @commands.command()
+    @commands.has_permissions(kick_members=True)
+    async def masskick(self, ctx, *, targets=""):
+        """Kick many members at once, targets as for massban"""
+        await self.prepare(ctx, "KICK", targets)
+
+    @commands.command()
+    @commands.has_permissions(moderate_members=True)
+    async def masstimeout(self, ctx, duration: str, *, targets=""):
+        """Timeout many members at once, targets as for massban
+        Duration format: 1d, 2h, 30m, 45s or combinations like 1d2h30m"""
+        seconds = parse_duration(duration)
+        if seconds == 0:
+            return await ctx.send("Invalid duration format. Use combinations like: 1d, 2h, 30m, 45s")
+        await self.prepare(ctx, "TIMEOUT", targets, min(seconds, MAX_TIMEOUT))
+
+
+def setup(bot):
+    bot.add_cog(MassModerationCog(bot))
@@ -3,8 +3,13 @@ from disnake.ext import commands
 import datetime
 import asyncio
 import json
+from typing import Optional
 from cogs.common.base_cog import BaseCog
 from cogs.common.db_manager import DBManager
+from cogs.common.component_router import get_component_router, make_custom_id
+from cogs.common.ban_index import get_ban_index
+from cogs.common.durations import parse_duration, format_duration
+from cogs.common.action_scheduler import ActionScheduler
 
 class ModerationCog(BaseCog):
     def __init__(self, bot):
@@ -12,6 +17,26 @@ class ModerationCog(BaseCog):
         self.db = DBManager()
         # No need to create tables as DBManager handles this
 
+        # History pages are rebuilt from the custom_id, so old buttons keep working
+        self.router = get_component_router(bot)
+        self.router.register("history", self.handle_history_button)
+
+        # Unban and ban lookups search this instead of downloading the ban list
+        self.ban_index = get_ban_index(bot)
+
+        config = getattr(bot, "config", {})
+        self.mute_role_id = config.get("moderation", {}).get("mute_role_id")
+        # Ends tempbans, tempmutes and timed locks, including ones that fell due while the bot was down
+        self.scheduler = ActionScheduler(self.db, self.logger.getChild("Scheduler"), self.run_scheduled_action)
+
+    async def cog_load(self):
+        await self.bot.wait_until_ready()
+        self.scheduler.start()
+
+    def cog_unload(self):
+        self.router.unregister("history")
+        self.scheduler.stop()
+
     def _add_mod_action(self, guild_id, user_id, moderator_id, action_type, reason=None, duration=None):
         """Add a moderation action to the database"""
         conn = self.db.get_connection()
@@ -29,36 +54,72 @@ class ModerationCog(BaseCog):
         finally:
             self.db.release_connection(conn)
 
-    def _get_user_history(self, guild_id, user_id, action_type=None):
-        """Get a user's moderation history, optionally filtered by action type"""
+    def _get_history_counts(self, guild_id, user_id):
+        """Count a user's moderation actions by type, most recently used type first"""
+        conn = self.db.get_connection()
+        counts = {}
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                SELECT action_type, COUNT(*) FROM mod_actions
+                WHERE guild_id = %s AND user_id = %s
+                GROUP BY action_type
+                ORDER BY MAX(timestamp) DESC
+                ''', (guild_id, user_id))
+                counts = dict(cursor.fetchall())
+
+        except Exception as e:
+            self.logger.error(f"Database error in _get_history_counts: {e}")
+        finally:
+            self.db.release_connection(conn)
+
+        return counts
+
+    def _get_history_page(self, guild_id, user_id, limit, before=None, after=None, offset=0, oldest=False):
+        """Get one page of a user's moderation history, newest first
+
+        Pages are found with a keyset cursor on (timestamp, id): `before`
+        gives the page following that action, `after` the page preceding it
+        and `oldest` the final page. `offset` is only used to jump straight
+        to a page from the command.
+        """
         conn = self.db.get_connection()
         results = []
-        
+        condition, params = "", [guild_id, user_id]
+        order = "DESC"
+        if before:
+            condition = "AND (timestamp, id) < (%s, %s)"
+            params += before
+        elif after:
+            condition = "AND (timestamp, id) > (%s, %s)"
+            params += after
+            order = "ASC"
+        elif oldest:
+            order = "ASC"
+        params += [limit, offset]
+
         try:
             with conn.cursor() as cursor:
-                if action_type:
-                    cursor.execute('''
-                    SELECT * FROM mod_actions 
-                    WHERE guild_id = %s AND user_id = %s AND action_type = %s
-                    ORDER BY timestamp DESC
-                    ''', (guild_id, user_id, action_type))
-                else:
-                    cursor.execute('''
-                    SELECT * FROM mod_actions 
-                    WHERE guild_id = %s AND user_id = %s
-                    ORDER BY timestamp DESC
-                    ''', (guild_id, user_id))
-                    
+                cursor.execute(f'''
+                SELECT * FROM mod_actions
+                WHERE guild_id = %s AND user_id = %s {condition}
+                ORDER BY timestamp {order}, id {order}
+                LIMIT %s OFFSET %s
+                ''', params)
+
                 # Convert to dictionary format for compatibility
                 columns = [desc[0] for desc in cursor.description]
                 for row in cursor.fetchall():
                     results.append(dict(zip(columns, row)))
-                    
+
         except Exception as e:
-            self.logger.error(f"Database error in _get_user_history: {e}")
+            self.logger.error(f"Database error in _get_history_page: {e}")
         finally:
             self.db.release_connection(conn)
-            
+
+        if order == "ASC":
+            results.reverse()
         return results
 
     @commands.command()
@@ -102,33 +163,197 @@ class ModerationCog(BaseCog):
     @commands.command()
     @commands.has_permissions(ban_members=True)
     async def unban(self, ctx, *, user_id_or_name):
-        """Unban a user from the server"""
-        bans = await ctx.guild.bans()
-        
-        unbanned_user = None
-        
+        """Unban a user from the server by ID or name"""
         if user_id_or_name.isdigit():
             # Search by ID
-            user_id = int(user_id_or_name)
-            for ban_entry in bans:
-                if ban_entry.user.id == user_id:
-                    await ctx.guild.unban(ban_entry.user)
-                    unbanned_user = ban_entry.user
-                    break
+            unbanned_user, _ = await self.ban_index.get(ctx.guild, int(user_id_or_name))
+            matches = [(1.0, unbanned_user)] if unbanned_user else []
         else:
             # Search by name
-            for ban_entry in bans:
-                if user_id_or_name.lower() in str(ban_entry.user).lower():
-                    await ctx.guild.unban(ban_entry.user)
-                    unbanned_user = ban_entry.user
-                    break
-                    
-        if unbanned_user:
-            # Record the unban in the database
-            self._add_mod_action(ctx.guild.id, unbanned_user.id, ctx.author.id, "UNBAN")
-            await ctx.send(f"✅ **{unbanned_user}** has been unbanned")
+            matches = await self.ban_index.search(ctx.guild, user_id_or_name)
+
+        if not matches:
+            return await ctx.send("User not found in ban list.")
+
+        # Only unban when the name clearly means one user
+        exact = [user for score, user in matches if score == 1.0]
+        containing = [user for score, user in matches if score >= 0.5]
+        if len(exact) == 1:
+            unbanned_user = exact[0]
+        elif len(containing) == 1 and not exact:
+            unbanned_user = containing[0]
         else:
-            await ctx.send("User not found in ban list.")
+            suggestions = "\n".join(f"{i}. **{user}** ({user.id})" for i, (_, user) in enumerate(matches, 1))
+            return await ctx.send(f"Multiple banned users match `{user_id_or_name}`, unban one by ID:\n{suggestions}")
+
+        try:
+            await ctx.guild.unban(unbanned_user)
+        except disnake.NotFound:
+            # Unbanned while the bot was disconnected, so the index missed it
+            self.ban_index.forget(ctx.guild.id, unbanned_user.id)
+            return await ctx.send(f"**{unbanned_user}** is no longer banned, removed them from the ban list.")
+        await self.scheduler.cancel(ctx.guild.id, "UNBAN", unbanned_user.id)
+        # Record the unban in the database
+        self._add_mod_action(ctx.guild.id, unbanned_user.id, ctx.author.id, "UNBAN")
+        await ctx.send(f"✅ **{unbanned_user}** has been unbanned")
+
+    @commands.command(aliases=["bansearch"])
+    @commands.has_permissions(ban_members=True)
+    async def banlookup(self, ctx, *, user_id_or_name):
+        """Look up banned users by ID or name, best matches first"""
+        if user_id_or_name.isdigit():
+            user, _ = await self.ban_index.get(ctx.guild, int(user_id_or_name))
+            matches = [(1.0, user)] if user else []
+        else:
+            matches = await self.ban_index.search(ctx.guild, user_id_or_name, limit=10)
+
+        if not matches:
+            return await ctx.send("No banned users match that.")
+
+        bans = await self.ban_index.get_guild(ctx.guild)
+        embed = disnake.Embed(
+            title=f"Bans matching \"{user_id_or_name}\"",
+            color=disnake.Color.red()
+        )
+        for score, user in matches:
+            reason = await self.ban_index.get_reason(ctx.guild, user.id)
+            if user.id not in bans.users:
+                continue  # Turned out to be unbanned already
+            embed.add_field(
+                name=f"{user} ({user.id})",
+                value=f"**Match:** {score:.0%}\n**Reason:** {reason or 'No reason recorded'}",
+                inline=False
+            )
+        embed.description = f"{len(bans.users)} banned users in total"
+        await ctx.send(embed=embed)
+
+    @commands.command()
+    @commands.has_permissions(ban_members=True)
+    async def tempban(self, ctx, member: disnake.Member, duration: str, *, reason=None):
+        """Ban a member for a specified duration
+        Duration format: 1d, 2h, 30m, 45s or combinations like 1d2h30m"""
+        if ctx.author.top_role <= member.top_role:
+            return await ctx.send("You cannot ban this user due to role hierarchy.")
+
+        seconds = parse_duration(duration)
+        if seconds == 0:
+            return await ctx.send("Invalid duration format. Use combinations like: 1d, 2h, 30m, 45s")
+        unban_at = disnake.utils.utcnow() + datetime.timedelta(seconds=seconds)
+
+        try:
+            await member.send(f"You have been banned from {ctx.guild.name} for {format_duration(seconds)} | Reason: {reason or 'No reason provided'}")
+        except:
+            pass  # Can't DM the user
+
+        await member.ban(reason=reason)
+        self._add_mod_action(ctx.guild.id, member.id, ctx.author.id, "TEMPBAN", reason, seconds)
+        await self.scheduler.schedule(ctx.guild.id, "UNBAN", member.id, ctx.author.id, unban_at, reason)
+
+        await ctx.send(f"🔨 **{member}** has been banned until {disnake.utils.format_dt(unban_at, 'f')} | Reason: {reason or 'No reason provided'}")
+
+    @commands.command()
+    @commands.has_permissions(manage_roles=True)
+    async def tempmute(self, ctx, member: disnake.Member, duration: str, *, reason=None):
+        """Give a member the mute role for a specified duration
+        Unlike timeout this isn't limited to 28 days"""
+        role = ctx.guild.get_role(self.mute_role_id) if self.mute_role_id else None
+        if role is None:
+            return await ctx.send("No mute role is configured for this server.")
+        if ctx.author.top_role <= member.top_role:
+            return await ctx.send("You cannot mute this user due to role hierarchy.")
+
+        seconds = parse_duration(duration)
+        if seconds == 0:
+            return await ctx.send("Invalid duration format. Use combinations like: 1d, 2h, 30m, 45s")
+        unmute_at = disnake.utils.utcnow() + datetime.timedelta(seconds=seconds)
+
+        await member.add_roles(role, reason=reason)
+        self._add_mod_action(ctx.guild.id, member.id, ctx.author.id, "TEMPMUTE", reason, seconds)
+        # A new mute replaces the end time of one still running
+        await self.scheduler.cancel(ctx.guild.id, "REMOVE_ROLE", member.id)
+        await self.scheduler.schedule(ctx.guild.id, "REMOVE_ROLE", member.id, ctx.author.id, unmute_at, reason, role_id=role.id)
+
+        await ctx.send(f"🔇 **{member}** has been muted until {disnake.utils.format_dt(unmute_at, 'f')} | Reason: {reason or 'No reason provided'}")
+
+    async def run_scheduled_action(self, action):
+        """Carry out a scheduled action that is due, raising to have the scheduler retry it"""
+        guild = self.bot.get_guild(action["guild_id"])
+        if guild is None:
+            return  # Bot left the guild, nothing to undo
+
+        reason = f"Scheduled action #{action['id']}: {action['reason'] or 'No reason provided'}"
+        if action["action_type"] == "UNBAN":
+            try:
+                await guild.unban(disnake.Object(id=action["target_id"]), reason=reason)
+            except disnake.NotFound:
+                return  # Already unbanned
+            self._add_mod_action(guild.id, action["target_id"], action["moderator_id"], "UNBAN", "Temporary ban expired")
+
+        elif action["action_type"] == "REMOVE_ROLE":
+            member = guild.get_member(action["target_id"])
+            role = guild.get_role(action["role_id"])
+            # Members who left lost the role already
+            if member is None or role is None or role not in member.roles:
+                return
+            await member.remove_roles(role, reason=reason)
+            self._add_mod_action(guild.id, member.id, action["moderator_id"], "UNMUTE", "Temporary mute expired")
+
+        elif action["action_type"] == "UNLOCK":
+            channel = guild.get_channel(action["target_id"])
+            if channel is None:
+                return
+            overwrite = channel.overwrites_for(guild.default_role)
+            overwrite.send_messages = None
+            await channel.set_permissions(guild.default_role, overwrite=overwrite, reason=reason)
+            self._add_mod_action(guild.id, 0, action["moderator_id"], "UNLOCK", f"Channel: {channel.name} ({channel.id}), scheduled")
+
+        else:
+            self.logger.warning(f"Unknown scheduled action type {action['action_type']} (#{action['id']})")
+
+    # Permission needed to cancel each kind of scheduled action
+    SCHEDULED_ACTION_PERMISSIONS = {
+        "UNBAN": "ban_members",
+        "REMOVE_ROLE": "manage_roles",
+        "UNLOCK": "manage_channels"
+    }
+
+    @commands.group(invoke_without_command=True)
+    @commands.has_permissions(manage_messages=True)
+    async def scheduled(self, ctx):
+        """List the next pending tempban, tempmute and lock expiries"""
+        actions = await self.scheduler.pending(ctx.guild.id)
+        if not actions:
+            return await ctx.send("No scheduled actions.")
+
+        lines = []
+        for action_id, action_type, target_id, role_id, moderator_id, reason, due_at in actions:
+            target = f"<#{target_id}>" if action_type == "UNLOCK" else f"<@{target_id}>"
+            lines.append(f"`#{action_id}` {action_type} {target} {disnake.utils.format_dt(due_at, 'R')} (by <@{moderator_id}>)")
+
+        embed = disnake.Embed(title="Scheduled Actions", color=disnake.Color.blue(), description="\n".join(lines))
+        embed.set_footer(text="Cancel one with: scheduled cancel <id>")
+        await ctx.send(embed=embed)
+
+    @scheduled.command(name="cancel")
+    async def scheduled_cancel(self, ctx, action_id: int):
+        """Cancel a pending action, e.g. to make a tempban permanent"""
+        action = await self.scheduler.get(ctx.guild.id, action_id)
+        if action is None or action["status"] != "pending":
+            return await ctx.send(f"No pending scheduled action #{action_id}.")
+
+        # Cancelling needs the permission that would undo the action by hand
+        permission = self.SCHEDULED_ACTION_PERMISSIONS.get(action["action_type"], "administrator")
+        if not getattr(ctx.author.guild_permissions, permission):
+            return await ctx.send(f"You need the {permission.replace('_', ' ')} permission to cancel this.")
+
+        if not await self.scheduler.cancel_id(ctx.guild.id, action_id):
+            return await ctx.send(f"Scheduled action #{action_id} already ran.")
+        await ctx.send(f"✅ Cancelled scheduled action #{action_id} ({action['action_type']})")
+
+    async def apply_timeout(self, member, moderator_id, seconds, reason=None):
+        """Timeout a member and record it, also used by AutoMod escalation"""
+        await member.timeout(duration=datetime.timedelta(seconds=seconds), reason=reason)
+        self._add_mod_action(member.guild.id, member.id, moderator_id, "TIMEOUT", reason, seconds)
 
     @commands.command(aliases=["mute"])
     @commands.has_permissions(moderate_members=True)
@@ -138,24 +363,7 @@ class ModerationCog(BaseCog):
         if ctx.author.top_role <= member.top_role:
             return await ctx.send("You cannot timeout this user due to role hierarchy.")
                 
-        # Parse duration
-        total_seconds = 0
-        current_num = ""
-        for char in duration:
-            if char.isdigit():
-                current_num += char
-            elif char == 'd' and current_num:
-                total_seconds += int(current_num) * 86400  # days to seconds
-                current_num = ""
-            elif char == 'h' and current_num:
-                total_seconds += int(current_num) * 3600  # hours to seconds
-                current_num = ""
-            elif char == 'm' and current_num:
-                total_seconds += int(current_num) * 60  # minutes to seconds
-                current_num = ""
-            elif char == 's' and current_num:
-                total_seconds += int(current_num)  # seconds
-                current_num = ""
+        total_seconds = parse_duration(duration)
         
         if total_seconds == 0:
             return await ctx.send("Invalid duration format. Use combinations like: 1d, 2h, 30m, 45s")
@@ -165,31 +373,10 @@ class ModerationCog(BaseCog):
             total_seconds = 2419200
             
         try:
-            # Use timedelta for the duration
-            duration_timedelta = datetime.timedelta(seconds=total_seconds)
-            
-            # Apply the timeout using the correct method
-            await member.timeout(duration=duration_timedelta, reason=reason)
-            
-            # Record the timeout in the database
-            self._add_mod_action(ctx.guild.id, member.id, ctx.author.id, "TIMEOUT", reason, total_seconds)
+            # Apply the timeout and record it in the database
+            await self.apply_timeout(member, ctx.author.id, total_seconds, reason)
             
-            # Format duration for display
-            days, remainder = divmod(total_seconds, 86400)
-            hours, remainder = divmod(remainder, 3600)
-            minutes, seconds = divmod(remainder, 60)
-            
-            duration_str = ""
-            if days > 0:
-                duration_str += f"{days}d "
-            if hours > 0:
-                duration_str += f"{hours}h "
-            if minutes > 0:
-                duration_str += f"{minutes}m "
-            if seconds > 0:
-                duration_str += f"{seconds}s"
-                
-            await ctx.send(f"⏱️ **{member}** has been timed out for {duration_str.strip()} | Reason: {reason or 'No reason provided'}")
+            await ctx.send(f"⏱️ **{member}** has been timed out for {format_duration(total_seconds)} | Reason: {reason or 'No reason provided'}")
         except disnake.Forbidden:
             await ctx.send("❌ I lack the necessary permissions to timeout this user.")
         except disnake.HTTPException as e:
@@ -263,105 +450,89 @@ class ModerationCog(BaseCog):
         else:
             await ctx.send(f"**{member}** has no warnings to clear.")
 
+    # Actions shown per history page
+    HISTORY_PAGE_SIZE = 5
+    HISTORY_EPOCH = datetime.datetime(1970, 1, 1)
+
     @commands.command(aliases=["warns"])
     @commands.has_permissions(manage_messages=True)
     async def history(self, ctx, member: disnake.Member, page: int = 1):
         """View moderation history for a member with pagination"""
-        history = self._get_user_history(ctx.guild.id, member.id)
+        counts = self._get_history_counts(ctx.guild.id, member.id)
         
-        if not history:
+        if not counts:
             return await ctx.send(f"**{member}** has no moderation history.")
         
-        # Define how many actions to show per page
-        items_per_page = 5
-        total_pages = (len(history) + items_per_page - 1) // items_per_page
+        items_per_page = self.HISTORY_PAGE_SIZE
+        total_pages = (sum(counts.values()) + items_per_page - 1) // items_per_page
         
         # Ensure page is within valid range
         page = max(1, min(page, total_pages))
         
-        # Create embed for this page
-        embed = self._create_history_embed(ctx, member, history, page, items_per_page, total_pages)
+        items = self._get_history_page(ctx.guild.id, member.id, items_per_page, offset=(page - 1) * items_per_page)
+        embed = self._create_history_embed(ctx, member, counts, items, page, items_per_page, total_pages)
         
         # If only one page, just send the embed without buttons
         if total_pages <= 1:
             return await ctx.send(embed=embed)
         
-        # Create view with navigation buttons
-        view = disnake.ui.View()
-        
-        # First page button
-        first_button = disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji="⏮️", disabled=(page == 1))
-        first_button.callback = lambda interaction: self._update_history_page(interaction, ctx, member, history, 1, items_per_page, total_pages)
-        view.add_item(first_button)
-        
-        # Previous page button
-        prev_button = disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji="◀️", disabled=(page == 1))
-        prev_button.callback = lambda interaction: self._update_history_page(interaction, ctx, member, history, page - 1, items_per_page, total_pages)
-        view.add_item(prev_button)
-        
-        # Page indicator (not clickable)
-        page_indicator = disnake.ui.Button(style=disnake.ButtonStyle.secondary, label=f"{page}/{total_pages}", disabled=True)
-        view.add_item(page_indicator)
-        
-        # Next page button
-        next_button = disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji="▶️", disabled=(page == total_pages))
-        next_button.callback = lambda interaction: self._update_history_page(interaction, ctx, member, history, page + 1, items_per_page, total_pages)
-        view.add_item(next_button)
-        
-        # Last page button
-        last_button = disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji="⏭️", disabled=(page == total_pages))
-        last_button.callback = lambda interaction: self._update_history_page(interaction, ctx, member, history, total_pages, items_per_page, total_pages)
-        view.add_item(last_button)
-        
-        await ctx.send(embed=embed, view=view)
+        await ctx.send(embed=embed, components=self._history_buttons(member.id, items, page, total_pages))
+
+    def _encode_history_cursor(self, action):
+        """Encode an action's (timestamp, id) as "<microseconds since epoch>.<id>" for a custom_id"""
+        micros = (action['timestamp'] - self.HISTORY_EPOCH) // datetime.timedelta(microseconds=1)
+        return f"{micros}.{action['id']}"
+
+    def _decode_history_cursor(self, cursor):
+        micros, action_id = cursor.split(".")
+        return [self.HISTORY_EPOCH + datetime.timedelta(microseconds=int(micros)), int(action_id)]
+
+    def _history_buttons(self, member_id, items, page, total_pages):
+        """Navigation buttons for a history page
+
+        Each button encodes the page number it leads to and, for prev/next,
+        the cursor of the first or last action shown, so only one page of
+        history is ever loaded per click.
+        """
+        def nav_button(tag, emoji, target, disabled, cursor=""):
+            # The tag keeps custom_ids unique when two buttons lead to the same page
+            return disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji=emoji, disabled=disabled,
+                                     custom_id=make_custom_id("history", tag, member_id, target, cursor))
+
+        first_cursor = self._encode_history_cursor(items[0]) if items else ""
+        last_cursor = self._encode_history_cursor(items[-1]) if items else ""
+        return [
+            nav_button("first", "⏮️", 1, page == 1),
+            nav_button("prev", "◀️", page - 1, page == 1, first_cursor),
+            # Page indicator (not clickable)
+            disnake.ui.Button(style=disnake.ButtonStyle.secondary, label=f"{page}/{total_pages}", disabled=True,
+                              custom_id=make_custom_id("history", "page", member_id, page)),
+            nav_button("next", "▶️", page + 1, page == total_pages, last_cursor),
+            nav_button("last", "⏭️", total_pages, page == total_pages)
+        ]
 
-    def _create_history_embed(self, ctx, member, history, page, items_per_page, total_pages):
+    def _create_history_embed(self, ctx, member, counts, items, page, items_per_page, total_pages):
         """Helper method to create history embed for a specific page"""
         start_idx = (page - 1) * items_per_page
-        end_idx = min(start_idx + items_per_page, len(history))
-        current_page_items = history[start_idx:end_idx]
         
         embed = disnake.Embed(
             title=f"Moderation History for {member}", 
             color=disnake.Color.blue(),
-            description=f"Total actions: {len(history)} | Page {page}/{total_pages}"
+            description=f"Total actions: {sum(counts.values())} | Page {page}/{total_pages}"
         )
         
-        # Group by action type for summary display
-        action_counts = {}
-        for action in history:
-            action_type = action['action_type']
-            if action_type not in action_counts:
-                action_counts[action_type] = 0
-            action_counts[action_type] += 1
-        
         # Add summary field
-        summary = "\n".join([f"{action}: {count}" for action, count in action_counts.items()])
+        summary = "\n".join([f"{action}: {count}" for action, count in counts.items()])
         embed.add_field(name="Summary", value=summary, inline=False)
         
         # Add the items for the current page
-        if current_page_items:
+        if items:
             embed.add_field(name=f"Actions (Page {page})", value="", inline=False)
             
-            for i, action in enumerate(current_page_items, start_idx + 1):
+            for i, action in enumerate(items, start_idx + 1):
                 moderator = ctx.guild.get_member(action['moderator_id']) or f"<@{action['moderator_id']}>"
                 
-                duration_str = ""
-                if action['duration']:
-                    days, remainder = divmod(action['duration'], 86400)
-                    hours, remainder = divmod(remainder, 3600)
-                    minutes, seconds = divmod(remainder, 60)
-                    
-                    if days > 0:
-                        duration_str += f"{days}d "
-                    if hours > 0:
-                        duration_str += f"{hours}h "
-                    if minutes > 0:
-                        duration_str += f"{minutes}m "
-                    if seconds > 0:
-                        duration_str += f"{seconds}s"
-                    
-                    duration_str = f" for {duration_str.strip()}"
+                duration_str = f" for {format_duration(action['duration'])}" if action['duration'] else ""
                 
                 # Format timestamp - PostgreSQL returns datetime objects
                 timestamp = action['timestamp']
@@ -380,56 +551,65 @@ class ModerationCog(BaseCog):
         
         return embed
 
-    async def _update_history_page(self, interaction, ctx, member, history, page, items_per_page, total_pages):
-        """Callback method for updating history page when a button is clicked"""
-        # Ensure page is within valid range
-        page = max(1, min(page, total_pages))
-        
-        # Create updated embed
-        embed = self._create_history_embed(ctx, member, history, page, items_per_page, total_pages)
-        
-        # Create updated view with navigation buttons
-        view = disnake.ui.View()
-        
-        # First page button
-        first_button = disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji="⏮️", disabled=(page == 1))
-        first_button.callback = lambda i: self._update_history_page(i, ctx, member, history, 1, items_per_page, total_pages)
-        view.add_item(first_button)
-        
-        # Previous page button
-        prev_button = disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji="◀️", disabled=(page == 1))
-        prev_button.callback = lambda i: self._update_history_page(i, ctx, member, history, page - 1, items_per_page, total_pages)
-        view.add_item(prev_button)
-        
-        # Page indicator (not clickable)
-        page_indicator = disnake.ui.Button(style=disnake.ButtonStyle.secondary, label=f"{page}/{total_pages}", disabled=True)
-        view.add_item(page_indicator)
-        
-        # Next page button
-        next_button = disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji="▶️", disabled=(page == total_pages))
-        next_button.callback = lambda i: self._update_history_page(i, ctx, member, history, page + 1, items_per_page, total_pages)
-        view.add_item(next_button)
-        
-        # Last page button
-        last_button = disnake.ui.Button(style=disnake.ButtonStyle.secondary, emoji="⏭️", disabled=(page == total_pages))
-        last_button.callback = lambda i: self._update_history_page(i, ctx, member, history, total_pages, items_per_page, total_pages)
-        view.add_item(last_button)
-        
-        await interaction.response.edit_message(embed=embed, view=view)
+    async def handle_history_button(self, interaction, tag, member_id, page, cursor=""):
+        """Switch a history message to another page, loading just that page from the database"""
+        if not interaction.permissions.manage_messages:
+            return await interaction.response.send_message("You don't have permission to do this.", ephemeral=True)
+
+        member_id = int(member_id)
+        guild_id = interaction.guild.id
+        counts = self._get_history_counts(guild_id, member_id)
+        if not counts:
+            return await interaction.response.edit_message(content="This user has no moderation history.", embed=None, components=[])
+
+        member = interaction.guild.get_member(member_id) or await self.bot.get_or_fetch_user(member_id)
+
+        # History may have grown or shrunk since the buttons were sent
+        items_per_page = self.HISTORY_PAGE_SIZE
+        total = sum(counts.values())
+        total_pages = (total + items_per_page - 1) // items_per_page
+        page = max(1, min(int(page), total_pages))
+
+        items = []
+        if tag == "last":
+            items = self._get_history_page(guild_id, member_id, total - (total_pages - 1) * items_per_page, oldest=True)
+        elif tag == "next" and cursor:
+            items = self._get_history_page(guild_id, member_id, items_per_page, before=self._decode_history_cursor(cursor))
+        elif tag == "prev" and cursor:
+            items = self._get_history_page(guild_id, member_id, items_per_page, after=self._decode_history_cursor(cursor))
+            if len(items) < items_per_page:
+                # Reached the newest actions, show a full first page
+                items, page = [], 1
+
+        if not items:
+            items = self._get_history_page(guild_id, member_id, items_per_page, offset=(page - 1) * items_per_page)
+
+        embed = self._create_history_embed(interaction, member, counts, items, page, items_per_page, total_pages)
+        await interaction.response.edit_message(embed=embed, components=self._history_buttons(member_id, items, page, total_pages))
 
     @commands.command()
     @commands.has_permissions(manage_channels=True)
-    async def lock(self, ctx, channel: disnake.TextChannel = None):
-        """Lock a channel"""
+    async def lock(self, ctx, channel: Optional[disnake.TextChannel] = None, duration: str = None):
+        """Lock a channel, optionally unlocking it again after a duration like 30m or 2h"""
         channel = channel or ctx.channel
+        seconds = parse_duration(duration) if duration else 0
+        if duration and seconds == 0:
+            return await ctx.send("Invalid duration format. Use combinations like: 1d, 2h, 30m, 45s")
         
         overwrite = channel.overwrites_for(ctx.guild.default_role)
         overwrite.send_messages = False
         await channel.set_permissions(ctx.guild.default_role, overwrite=overwrite)
         
         # Record the channel lock in the database
-        self._add_mod_action(ctx.guild.id, 0, ctx.author.id, "LOCK", f"Channel: {channel.name} ({channel.id})")
-        
+        self._add_mod_action(ctx.guild.id, 0, ctx.author.id, "LOCK", f"Channel: {channel.name} ({channel.id})", seconds or None)
+        
+        # Locking again replaces an earlier timed unlock, a plain lock stays until unlocked
+        await self.scheduler.cancel(ctx.guild.id, "UNLOCK", channel.id)
+        if seconds:
+            unlock_at = disnake.utils.utcnow() + datetime.timedelta(seconds=seconds)
+            await self.scheduler.schedule(ctx.guild.id, "UNLOCK", channel.id, ctx.author.id, unlock_at)
+            return await ctx.send(f"🔒 {channel.mention} has been locked until {disnake.utils.format_dt(unlock_at, 't')}")
+
         await ctx.send(f"🔒 {channel.mention} has been locked")
 
     @commands.command()
@@ -444,6 +624,7 @@ class ModerationCog(BaseCog):
         
         # Record the channel unlock in the database
         self._add_mod_action(ctx.guild.id, 0, ctx.author.id, "UNLOCK", f"Channel: {channel.name} ({channel.id})")
+        await self.scheduler.cancel(ctx.guild.id, "UNLOCK", channel.id)
         
         await ctx.send(f"🔓 {channel.mention} has been unlocked")
 
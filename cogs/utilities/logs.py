@@ -6,11 +6,22 @@ import tomli
 import tomli_w
 from typing import Optional, Union
 from cogs.common.base_cog import BaseCog
+from cogs.common.db_manager import DBManager
+from cogs.common.log_sinks import LogEvent, SINK_TYPES
+from cogs.common.voice_sessions import VoiceSessionTracker, format_duration
 
 
 class LoggingCog(BaseCog):
+    VOICE_ALERT_LABELS = {
+        "server_mute": "Server muted",
+        "server_unmute": "Server unmuted",
+        "server_deafen": "Server deafened",
+        "server_undeafen": "Server undeafened"
+    }
+
     def __init__(self, bot):
         super().__init__(bot)
+        self.db = DBManager()
         
         # Load config settings
         self.config = getattr(self.bot, 'config', {}).get("logging", {})
@@ -33,6 +44,15 @@ class LoggingCog(BaseCog):
             "voice_state_update": True
         })
 
+        # Voice sessions are folded into one summary per stay in voice
+        self.voice_tracker = VoiceSessionTracker(self.config.get("voice_max_sessions", 5000))
+        self.voice_min_session_seconds = self.config.get("voice_min_session_seconds", 0)
+        self.voice_live_alerts = self.config.get("voice_live_alerts", False)
+        self.voice_alert_events = self.config.get("voice_alert_events", ["server_mute", "server_deafen"])
+
+        # Destinations for log events (channel, webhook, postgres, jsonl)
+        self.sinks = [sink_type(self) for sink_type in SINK_TYPES]
+
         self.logger.info(
             f"Discord Logging is {'enabled' if self.enabled else 'disabled'}")
 
@@ -87,20 +107,34 @@ class LoggingCog(BaseCog):
 
         return False
 
-    async def log_to_channel(
-            self,
-            guild_id: int,
-            embed: disnake.Embed) -> bool:
-        """Send a log embed to the logging channel"""
-        channel = await self.get_log_channel(guild_id)
-        if not channel:
-            return False
+    async def get_sinks(self, guild_id: int, event_type: str) -> list:
+        """Get the sinks that want this event, empty if nothing should be built"""
+        if not await self.is_logging_enabled(guild_id, event_type):
+            return []
+
+        return [sink for sink in self.sinks if sink.is_enabled(guild_id, event_type)]
 
+    async def dispatch_event(self, event: LogEvent, sinks: list):
+        """Hand an event to each sink; sinks render it only if they need an embed"""
+        for sink in sinks:
+            try:
+                await sink.emit(event)
+            except Exception as e:
+                self.logger.error(f"Log sink {sink.name} failed for {event.event_type}: {e}", exc_info=True)
+
+    def cog_unload(self):
+        for sink in self.sinks:
+            sink.close()
+
+    async def _find_audit_actor(self, guild, action, target_id):
+        """Find who performed an audit-logged action on a target"""
         try:
-            await channel.send(embed=embed)
-            return True
+            async for entry in guild.audit_logs(limit=1, action=action):
+                if entry.target.id == target_id:
+                    return entry.user.id
         except (disnake.Forbidden, disnake.HTTPException):
-            return False
+            pass
+        return None
 
     # Message Events
     @commands.Cog.listener()
@@ -109,40 +143,50 @@ class LoggingCog(BaseCog):
                 message.channel.id, message.author.id):
             return
 
-        if not await self.is_logging_enabled(message.guild.id, "message_delete"):
+        sinks = await self.get_sinks(message.guild.id, "message_delete")
+        if not sinks:
             return
 
-        # Create embed for Discord logging
+        event = LogEvent(
+            "message_delete", message.guild.id,
+            {
+                "content": message.content,
+                "attachments": [attachment.proxy_url for attachment in message.attachments]
+            },
+            renderer=self._render_message_delete,
+            user_id=message.author.id,
+            channel_id=message.channel.id,
+            target_id=message.id)
+
+        await self.dispatch_event(event, sinks)
+
+    def _render_message_delete(self, event):
         embed = disnake.Embed(
             title="Message Deleted",
-            description=f"**Author:** {
-                message.author.mention} ({
-                message.author.id})\n**Channel:** {
-                message.channel.mention}",
+            description=f"**Author:** <@{event.user_id}> ({event.user_id})\n"
+                        f"**Channel:** <#{event.channel_id}>",
             color=disnake.Color.red(),
-            timestamp=datetime.datetime.utcnow())
+            timestamp=event.timestamp)
 
-        if message.content:
-            if len(message.content) > 1024:
+        content = event.data["content"]
+        if content:
+            if len(content) > 1024:
                 embed.add_field(name="Content (Truncated)",
-                                value=message.content[:1021] + "...",
+                                value=content[:1021] + "...",
                                 inline=False)
             else:
                 embed.add_field(
                     name="Content",
-                    value=message.content,
+                    value=content,
                     inline=False)
 
-        if message.attachments:
-            attachment_urls = [
-                attachment.proxy_url for attachment in message.attachments]
-            embed.add_field(name=f"Attachments ({len(message.attachments)})", value="\n".join(
+        attachment_urls = event.data["attachments"]
+        if attachment_urls:
+            embed.add_field(name=f"Attachments ({len(attachment_urls)})", value="\n".join(
                 attachment_urls[:3]) + ("\n..." if len(attachment_urls) > 3 else ""), inline=False)
 
-        embed.set_footer(text=f"Message ID: {message.id}")
-
-        # Log to channel
-        await self.log_to_channel(message.guild.id, embed)
+        embed.set_footer(text=f"Message ID: {event.target_id}")
+        return embed
 
     @commands.Cog.listener()
     async def on_message_edit(self, before, after):
@@ -150,44 +194,49 @@ class LoggingCog(BaseCog):
                 before.channel.id, before.author.id):
             return
 
-        if not await self.is_logging_enabled(before.guild.id, "message_edit"):
-            return
-
         # Skip if content didn't change (e.g. embed loading)
         if before.content == after.content:
             return
 
-        # Create embed for Discord logging
+        sinks = await self.get_sinks(before.guild.id, "message_edit")
+        if not sinks:
+            return
+
+        event = LogEvent(
+            "message_edit", before.guild.id,
+            {
+                "before": before.content,
+                "after": after.content,
+                "jump_url": after.jump_url
+            },
+            renderer=self._render_message_edit,
+            user_id=before.author.id,
+            channel_id=before.channel.id,
+            target_id=before.id)
+
+        await self.dispatch_event(event, sinks)
+
+    def _render_message_edit(self, event):
         embed = disnake.Embed(
             title="Message Edited",
-            description=f"**Author:** {
-                before.author.mention} ({
-                before.author.id})\n**Channel:** {
-                before.channel.mention}\n**[Jump to Message]({
-                    after.jump_url})**",
+            description=f"**Author:** <@{event.user_id}> ({event.user_id})\n"
+                        f"**Channel:** <#{event.channel_id}>\n"
+                        f"**[Jump to Message]({event.data['jump_url']})**",
             color=disnake.Color.gold(),
-            timestamp=datetime.datetime.utcnow())
-
-        if before.content:
-            before_content = before.content[:1021] + \
-                "..." if len(before.content) > 1024 else before.content
-            embed.add_field(
-                name="Before",
-                value=before_content or "*Empty*",
-                inline=False)
+            timestamp=event.timestamp)
 
-        if after.content:
-            after_content = after.content[:1021] + \
-                "..." if len(after.content) > 1024 else after.content
-            embed.add_field(
-                name="After",
-                value=after_content or "*Empty*",
-                inline=False)
-
-        embed.set_footer(text=f"Message ID: {before.id}")
+        for name, key in (("Before", "before"), ("After", "after")):
+            content = event.data[key]
+            if content:
+                content = content[:1021] + \
+                    "..." if len(content) > 1024 else content
+                embed.add_field(
+                    name=name,
+                    value=content or "*Empty*",
+                    inline=False)
 
-        # Log to channel
-        await self.log_to_channel(before.guild.id, embed)
+        embed.set_footer(text=f"Message ID: {event.target_id}")
+        return embed
 
     # Member Events
     @commands.Cog.listener()
@@ -195,69 +244,94 @@ class LoggingCog(BaseCog):
         if member.bot or self.should_ignore(user_id=member.id):
             return
 
-        if not await self.is_logging_enabled(member.guild.id, "member_join"):
+        sinks = await self.get_sinks(member.guild.id, "member_join")
+        if not sinks:
             return
 
+        event = LogEvent(
+            "member_join", member.guild.id,
+            {
+                "created_at": member.created_at.timestamp(),
+                "avatar_url": member.avatar.url if member.avatar else None,
+                "member_count": member.guild.member_count
+            },
+            renderer=self._render_member_join,
+            user_id=member.id)
+
+        await self.dispatch_event(event, sinks)
+
+    def _render_member_join(self, event):
         # Calculate account age
-        created_at = member.created_at
-        account_age = datetime.datetime.utcnow() - created_at
+        created_at = datetime.datetime.utcfromtimestamp(event.data["created_at"])
+        account_age = event.timestamp - created_at
 
-        # Create embed for Discord logging
         embed = disnake.Embed(
             title="Member Joined",
-            description=f"{member.mention} ({member.id})",
+            description=f"<@{event.user_id}> ({event.user_id})",
             color=disnake.Color.green(),
-            timestamp=datetime.datetime.utcnow()
+            timestamp=event.timestamp
         )
 
         embed.add_field(name="Account Created",
-                        value=f"<t:{int(created_at.timestamp())}:R>",
+                        value=f"<t:{int(event.data['created_at'])}:R>",
                         inline=True)
         embed.add_field(
             name="Account Age",
-            value=f"{
-                account_age.days} days",
+            value=f"{account_age.days} days",
             inline=True)
 
-        if member.avatar:
-            embed.set_thumbnail(url=member.avatar.url)
+        if event.data["avatar_url"]:
+            embed.set_thumbnail(url=event.data["avatar_url"])
 
-        embed.set_footer(text=f"Member Count: {member.guild.member_count}")
-
-        # Log to channel
-        await self.log_to_channel(member.guild.id, embed)
+        embed.set_footer(text=f"Member Count: {event.data['member_count']}")
+        return embed
 
     @commands.Cog.listener()
     async def on_member_remove(self, member):
         if member.bot or self.should_ignore(user_id=member.id):
             return
 
-        if not await self.is_logging_enabled(member.guild.id, "member_leave"):
+        sinks = await self.get_sinks(member.guild.id, "member_leave")
+        if not sinks:
             return
 
+        event = LogEvent(
+            "member_leave", member.guild.id,
+            {
+                "name": str(member),
+                "joined_at": member.joined_at.timestamp() if member.joined_at else None,
+                "role_ids": [role.id for role in member.roles if role.name != "@everyone"],
+                "avatar_url": member.avatar.url if member.avatar else None,
+                "member_count": member.guild.member_count
+            },
+            renderer=self._render_member_leave,
+            user_id=member.id)
+
+        await self.dispatch_event(event, sinks)
+
+    def _render_member_leave(self, event):
         # Calculate time in server
-        joined_at = member.joined_at
+        joined_at = event.data["joined_at"]
         if joined_at:
-            time_in_server = datetime.datetime.utcnow() - joined_at
+            time_in_server = event.timestamp - datetime.datetime.utcfromtimestamp(joined_at)
             time_in_server_str = f"{time_in_server.days} days"
         else:
             time_in_server_str = "Unknown"
 
         # Get roles
-        roles = [role.mention for role in member.roles if role.name != "@everyone"]
+        roles = [f"<@&{role_id}>" for role_id in event.data["role_ids"]]
         roles_str = ", ".join(roles) if roles else "None"
 
-        # Create embed for Discord logging
         embed = disnake.Embed(
             title="Member Left",
-            description=f"{member} ({member.id})",
+            description=f"{event.data['name']} ({event.user_id})",
             color=disnake.Color.red(),
-            timestamp=datetime.datetime.utcnow()
+            timestamp=event.timestamp
         )
 
         if joined_at:
             embed.add_field(name="Joined At",
-                            value=f"<t:{int(joined_at.timestamp())}:R>",
+                            value=f"<t:{int(joined_at)}:R>",
                             inline=True)
 
         embed.add_field(
@@ -268,323 +342,371 @@ class LoggingCog(BaseCog):
         if roles:
             embed.add_field(name="Roles", value=roles_str[:1024], inline=False)
 
-        if member.avatar:
-            embed.set_thumbnail(url=member.avatar.url)
+        if event.data["avatar_url"]:
+            embed.set_thumbnail(url=event.data["avatar_url"])
 
-        embed.set_footer(text=f"Member Count: {member.guild.member_count}")
-
-        # Log to channel
-        await self.log_to_channel(member.guild.id, embed)
+        embed.set_footer(text=f"Member Count: {event.data['member_count']}")
+        return embed
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
         if before.bot or self.should_ignore(user_id=before.id):
             return
 
-        if not await self.is_logging_enabled(before.guild.id, "member_update"):
+        # Nothing we log changed (e.g. presence or avatar updates)
+        if before.nick == after.nick and before.roles == after.roles:
+            return
+
+        sinks = await self.get_sinks(before.guild.id, "member_update")
+        if not sinks:
             return
 
+        avatar_url = after.avatar.url if after.avatar else None
+
         # Check for nickname change
         if before.nick != after.nick:
+            event = LogEvent(
+                "member_update", before.guild.id,
+                {"change": "nickname", "before": before.nick, "after": after.nick, "avatar_url": avatar_url},
+                renderer=self._render_member_update,
+                user_id=after.id)
+            await self.dispatch_event(event, sinks)
+
+        # Check for role changes
+        before_roles = set(before.roles)
+        after_roles = set(after.roles)
+
+        for change, roles in (("roles_added", after_roles - before_roles),
+                              ("roles_removed", before_roles - after_roles)):
+            if not roles:
+                continue
+
+            event = LogEvent(
+                "member_update", before.guild.id,
+                {"change": change, "role_ids": [role.id for role in roles], "avatar_url": avatar_url},
+                renderer=self._render_member_update,
+                user_id=after.id)
+            await self.dispatch_event(event, sinks)
+
+    def _render_member_update(self, event):
+        change = event.data["change"]
+
+        if change == "nickname":
             embed = disnake.Embed(
                 title="Nickname Changed",
-                description=f"**User:** {after.mention} ({after.id})",
+                description=f"**User:** <@{event.user_id}> ({event.user_id})",
                 color=disnake.Color.blue(),
-                timestamp=datetime.datetime.utcnow()
+                timestamp=event.timestamp
             )
 
             embed.add_field(
                 name="Before",
-                value=before.nick or "*None*",
+                value=event.data["before"] or "*None*",
                 inline=True)
             embed.add_field(
                 name="After",
-                value=after.nick or "*None*",
+                value=event.data["after"] or "*None*",
                 inline=True)
-
-            if after.avatar:
-                embed.set_thumbnail(url=after.avatar.url)
-
-            # Log to channel
-            await self.log_to_channel(before.guild.id, embed)
-
-        # Check for role changes
-        before_roles = set(before.roles)
-        after_roles = set(after.roles)
-
-        # Roles added
-        added_roles = after_roles - before_roles
-        if added_roles:
-            role_mentions = [role.mention for role in added_roles]
-
-            embed = disnake.Embed(
-                title="Roles Added",
-                description=f"**User:** {after.mention} ({after.id})\n**Roles:** {', '.join(role_mentions)}",
-                color=disnake.Color.green(),
-                timestamp=datetime.datetime.utcnow()
-            )
-
-            if after.avatar:
-                embed.set_thumbnail(url=after.avatar.url)
-
-            # Log to channel
-            await self.log_to_channel(before.guild.id, embed)
-
-        # Roles removed
-        removed_roles = before_roles - after_roles
-        if removed_roles:
-            role_mentions = [role.mention for role in removed_roles]
+        else:
+            role_mentions = [f"<@&{role_id}>" for role_id in event.data["role_ids"]]
 
             embed = disnake.Embed(
-                title="Roles Removed",
-                description=f"**User:** {after.mention} ({after.id})\n**Roles:** {', '.join(role_mentions)}",
-                color=disnake.Color.orange(),
-                timestamp=datetime.datetime.utcnow()
+                title="Roles Added" if change == "roles_added" else "Roles Removed",
+                description=f"**User:** <@{event.user_id}> ({event.user_id})\n**Roles:** {', '.join(role_mentions)}",
+                color=disnake.Color.green() if change == "roles_added" else disnake.Color.orange(),
+                timestamp=event.timestamp
             )
 
-            if after.avatar:
-                embed.set_thumbnail(url=after.avatar.url)
+        if event.data["avatar_url"]:
+            embed.set_thumbnail(url=event.data["avatar_url"])
 
-            # Log to channel
-            await self.log_to_channel(before.guild.id, embed)
+        return embed
 
     # Channel Events
     @commands.Cog.listener()
     async def on_guild_channel_create(self, channel):
+        await self._log_channel_event(channel, "channel_create", disnake.AuditLogAction.channel_create)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        await self._log_channel_event(channel, "channel_delete", disnake.AuditLogAction.channel_delete)
+
+    async def _log_channel_event(self, channel, event_type, audit_action):
         if self.should_ignore(channel_id=channel.id):
             return
 
-        if not await self.is_logging_enabled(channel.guild.id, "channel_create"):
+        sinks = await self.get_sinks(channel.guild.id, event_type)
+        if not sinks:
             return
 
-        # Create embed for Discord logging
-        embed = disnake.Embed(
-            title=f"{channel.type.name.capitalize()} Channel Created",
-            description=f"**Name:** {channel.name}\n**ID:** {channel.id}",
-            color=disnake.Color.green(),
-            timestamp=datetime.datetime.utcnow()
-        )
-
-        # Get the audit log entry to see who created the channel
-        try:
-            async for entry in channel.guild.audit_logs(limit=1, action=disnake.AuditLogAction.channel_create):
-                if entry.target.id == channel.id:
-                    embed.add_field(
-                        name="Created By", value=f"{
-                            entry.user.mention} ({
-                            entry.user.id})", inline=False)
-                    break
-        except (disnake.Forbidden, disnake.HTTPException):
-            pass
+        # Get the audit log entry to see who created/deleted the channel
+        actor_id = await self._find_audit_actor(channel.guild, audit_action, channel.id)
 
-        # Log to channel
-        await self.log_to_channel(channel.guild.id, embed)
+        event = LogEvent(
+            event_type, channel.guild.id,
+            {"name": channel.name, "channel_type": channel.type.name},
+            renderer=self._render_channel_event,
+            user_id=actor_id,
+            target_id=channel.id)
 
-    @commands.Cog.listener()
-    async def on_guild_channel_delete(self, channel):
-        if self.should_ignore(channel_id=channel.id):
-            return
+        await self.dispatch_event(event, sinks)
 
-        if not await self.is_logging_enabled(channel.guild.id, "channel_delete"):
-            return
+    def _render_channel_event(self, event):
+        created = event.event_type == "channel_create"
 
-        # Create embed for Discord logging
         embed = disnake.Embed(
-            title=f"{channel.type.name.capitalize()} Channel Deleted",
-            description=f"**Name:** {channel.name}\n**ID:** {channel.id}",
-            color=disnake.Color.red(),
-            timestamp=datetime.datetime.utcnow()
+            title=f"{event.data['channel_type'].capitalize()} Channel {'Created' if created else 'Deleted'}",
+            description=f"**Name:** {event.data['name']}\n**ID:** {event.target_id}",
+            color=disnake.Color.green() if created else disnake.Color.red(),
+            timestamp=event.timestamp
         )
 
-        # Get the audit log entry to see who deleted the channel
-        try:
-            async for entry in channel.guild.audit_logs(limit=1, action=disnake.AuditLogAction.channel_delete):
-                if entry.target.id == channel.id:
-                    embed.add_field(
-                        name="Deleted By", value=f"{
-                            entry.user.mention} ({
-                            entry.user.id})", inline=False)
-                    break
-        except (disnake.Forbidden, disnake.HTTPException):
-            pass
+        if event.user_id:
+            embed.add_field(
+                name="Created By" if created else "Deleted By",
+                value=f"<@{event.user_id}> ({event.user_id})", inline=False)
 
-        # Log to channel
-        await self.log_to_channel(channel.guild.id, embed)
+        return embed
 
     # Role Events
     @commands.Cog.listener()
     async def on_guild_role_create(self, role):
-        if not await self.is_logging_enabled(role.guild.id, "role_create"):
+        await self._log_role_event(role, "role_create", disnake.AuditLogAction.role_create)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role):
+        await self._log_role_event(role, "role_delete", disnake.AuditLogAction.role_delete)
+
+    async def _log_role_event(self, role, event_type, audit_action):
+        sinks = await self.get_sinks(role.guild.id, event_type)
+        if not sinks:
             return
 
-        # Create embed for Discord logging
-        embed = disnake.Embed(
-            title="Role Created",
-            description=f"**Name:** {role.name}\n**ID:** {role.id}",
-            color=role.color,
-            timestamp=datetime.datetime.utcnow()
-        )
+        # Get the audit log entry to see who created/deleted the role
+        actor_id = await self._find_audit_actor(role.guild, audit_action, role.id)
 
-        # Get the audit log entry to see who created the role
-        try:
-            async for entry in role.guild.audit_logs(limit=1, action=disnake.AuditLogAction.role_create):
-                if entry.target.id == role.id:
-                    embed.add_field(
-                        name="Created By", value=f"{
-                            entry.user.mention} ({
-                            entry.user.id})", inline=False)
-                    break
-        except (disnake.Forbidden, disnake.HTTPException):
-            pass
+        data = {"name": role.name, "color": role.color.value}
 
         # Log permissions if any
-        if role.permissions.value:
-            permissions = [
-                perm[0].replace(
-                    '_',
-                    ' ').title() for perm in role.permissions if perm[1]]
-            if permissions:
-                perm_text = ", ".join(permissions)
-                if len(perm_text) > 1024:
-                    perm_text = perm_text[:1021] + "..."
-                embed.add_field(
-                    name="Permissions",
-                    value=perm_text,
-                    inline=False)
+        if event_type == "role_create" and role.permissions.value:
+            data["permissions"] = [perm[0] for perm in role.permissions if perm[1]]
 
-        # Log to channel
-        await self.log_to_channel(role.guild.id, embed)
+        event = LogEvent(
+            event_type, role.guild.id, data,
+            renderer=self._render_role_event,
+            user_id=actor_id,
+            target_id=role.id)
 
-    @commands.Cog.listener()
-    async def on_guild_role_delete(self, role):
-        if not await self.is_logging_enabled(role.guild.id, "role_delete"):
-            return
+        await self.dispatch_event(event, sinks)
+
+    def _render_role_event(self, event):
+        created = event.event_type == "role_create"
 
-        # Create embed for Discord logging
         embed = disnake.Embed(
-            title="Role Deleted",
-            description=f"**Name:** {role.name}\n**ID:** {role.id}",
-            color=role.color,
-            timestamp=datetime.datetime.utcnow()
+            title="Role Created" if created else "Role Deleted",
+            description=f"**Name:** {event.data['name']}\n**ID:** {event.target_id}",
+            color=disnake.Color(event.data["color"]),
+            timestamp=event.timestamp
         )
 
-        # Get the audit log entry to see who deleted the role
-        try:
-            async for entry in role.guild.audit_logs(limit=1, action=disnake.AuditLogAction.role_delete):
-                if entry.target.id == role.id:
-                    embed.add_field(
-                        name="Deleted By", value=f"{
-                            entry.user.mention} ({
-                            entry.user.id})", inline=False)
-                    break
-        except (disnake.Forbidden, disnake.HTTPException):
-            pass
+        if event.user_id:
+            embed.add_field(
+                name="Created By" if created else "Deleted By",
+                value=f"<@{event.user_id}> ({event.user_id})", inline=False)
+
+        permissions = [perm.replace('_', ' ').title() for perm in event.data.get("permissions", [])]
+        if permissions:
+            perm_text = ", ".join(permissions)
+            if len(perm_text) > 1024:
+                perm_text = perm_text[:1021] + "..."
+            embed.add_field(
+                name="Permissions",
+                value=perm_text,
+                inline=False)
 
-        # Log to channel
-        await self.log_to_channel(role.guild.id, embed)
+        return embed
 
     # Voice Events
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Open sessions for members who were already in voice when we started"""
+        seeded = 0
+        for guild in self.bot.guilds:
+            for channel in guild.voice_channels + guild.stage_channels:
+                for member in channel.members:
+                    if member.bot or self.voice_tracker.get(guild.id, member.id):
+                        continue
+                    if member.voice and member.voice.channel:
+                        self.voice_tracker.start(guild.id, member.id, member.voice, partial=True)
+                        seeded += 1
+
+        if seeded:
+            self.logger.debug(f"Seeded {seeded} voice sessions from current voice states")
+
     @commands.Cog.listener()
     async def on_voice_state_update(self, member, before, after):
         if member.bot or self.should_ignore(user_id=member.id):
             return
 
-        if not await self.is_logging_enabled(member.guild.id, "voice_state_update"):
-            return
+        # Always fold the change into the session so analytics stay accurate
+        session, alerts = self.voice_tracker.update(member, before, after)
+
+        if session:
+            self._save_voice_session(session)
 
-        # Check if the member joined, left, or moved voice channels
-        action = None
-        description = None
-
-        if before.channel is None and after.channel is not None:
-            action = "VOICE_JOIN"
-            description = f"**User:** {
-                member.mention} ({
-                member.id})\n**Channel:** {
-                after.channel.mention}"
-        elif before.channel is not None and after.channel is None:
-            action = "VOICE_LEAVE"
-            description = f"**User:** {
-                member.mention} ({
-                member.id})\n**Channel:** {
-                before.channel.mention}"
-        elif before.channel != after.channel:
-            action = "VOICE_MOVE"
-            description = f"**User:** {
-                member.mention} ({
-                member.id})\n**From:** {
-                before.channel.mention}\n**To:** {
-                after.channel.mention}"
+        if self.voice_live_alerts:
+            alerts = [(alert_type, channel) for alert_type, channel in alerts
+                      if alert_type in self.voice_alert_events]
         else:
-            # Check for other voice state changes like mute/deafen
-            changes = []
-
-            if before.deaf != after.deaf:
-                server_action = "server deafened" if after.deaf else "server undeafened"
-                changes.append(f"User was {server_action}")
-
-            if before.mute != after.mute:
-                server_action = "server muted" if after.mute else "server unmuted"
-                changes.append(f"User was {server_action}")
-
-            if before.self_deaf != after.self_deaf:
-                self_action = "deafened themselves" if after.self_deaf else "undeafened themselves"
-                changes.append(f"User {self_action}")
-
-            if before.self_mute != after.self_mute:
-                self_action = "muted themselves" if after.self_mute else "unmuted themselves"
-                changes.append(f"User {self_action}")
-
-            if before.self_stream != after.self_stream:
-                stream_action = "started streaming" if after.self_stream else "stopped streaming"
-                changes.append(f"User {stream_action}")
-
-            if before.self_video != after.self_video:
-                video_action = "turned on camera" if after.self_video else "turned off camera"
-                changes.append(f"User {video_action}")
-
-            if changes:
-                action = "VOICE_UPDATE"
-                description = f"**User:** {
-                    member.mention} ({
-                    member.id})\n**Channel:** {
-                    after.channel.mention if after.channel else before.channel.mention}\n**Changes:**\n- " + "\n- ".join(changes)
-
-        if action:
-            # Create embed for Discord logging
-            title_map = {
-                "VOICE_JOIN": "User Joined Voice Channel",
-                "VOICE_LEAVE": "User Left Voice Channel",
-                "VOICE_MOVE": "User Moved Voice Channels",
-                "VOICE_UPDATE": "Voice State Updated"
-            }
-
-            color_map = {
-                "VOICE_JOIN": disnake.Color.green(),
-                "VOICE_LEAVE": disnake.Color.red(),
-                "VOICE_MOVE": disnake.Color.blue(),
-                "VOICE_UPDATE": disnake.Color.gold()
-            }
+            alerts = []
 
-            embed = disnake.Embed(
-                title=title_map.get(action, "Voice Update"),
-                description=description,
-                color=color_map.get(action, disnake.Color.blue()),
-                timestamp=datetime.datetime.utcnow()
-            )
+        if session and session.duration < self.voice_min_session_seconds:
+            session = None
 
-            if member.avatar:
-                embed.set_thumbnail(url=member.avatar.url)
+        if not alerts and not session:
+            return
+
+        sinks = await self.get_sinks(member.guild.id, "voice_state_update")
+        if not sinks:
+            return
+
+        avatar_url = member.avatar.url if member.avatar else None
+
+        for alert_type, channel in alerts:
+            event = LogEvent(
+                "voice_state_update", member.guild.id,
+                {"kind": "alert", "alert": alert_type},
+                renderer=self._render_voice_alert,
+                user_id=member.id,
+                channel_id=channel.id)
+            await self.dispatch_event(event, sinks)
+
+        if session:
+            event = LogEvent(
+                "voice_state_update", member.guild.id,
+                {
+                    "kind": "session",
+                    "channel_ids": session.channel_ids,
+                    "started_at": session.started_at.replace(tzinfo=datetime.timezone.utc).timestamp(),
+                    "duration": session.duration,
+                    "partial": session.partial,
+                    "moves": session.moves,
+                    "totals": session.totals,
+                    "server_mutes": session.server_mutes,
+                    "server_deafens": session.server_deafens,
+                    "avatar_url": avatar_url
+                },
+                renderer=self._render_voice_session,
+                user_id=member.id,
+                channel_id=session.channel_id)
+            await self.dispatch_event(event, sinks)
+
+    def _render_voice_alert(self, event):
+        alert_type = event.data["alert"]
+        return disnake.Embed(
+            title="Voice Moderation",
+            description=f"**User:** <@{event.user_id}> ({event.user_id})\n"
+                        f"**Channel:** <#{event.channel_id}>\n"
+                        f"**Change:** {self.VOICE_ALERT_LABELS.get(alert_type, alert_type)}",
+            color=disnake.Color.gold(),
+            timestamp=event.timestamp
+        )
+
+    def _render_voice_session(self, event):
+        data = event.data
+
+        embed = disnake.Embed(
+            title="Voice Session Ended",
+            description=f"**User:** <@{event.user_id}> ({event.user_id})\n"
+                        f"**Channels:** {' → '.join(f'<#{channel_id}>' for channel_id in data['channel_ids'])}",
+            color=disnake.Color.blue(),
+            timestamp=event.timestamp
+        )
+
+        embed.add_field(
+            name="Duration",
+            value=format_duration(data["duration"]) + (" (joined before tracking)" if data["partial"] else ""),
+            inline=True)
+        embed.add_field(name="Joined", value=f"<t:{int(data['started_at'])}:t>", inline=True)
+        embed.add_field(name="Moves", value=str(data["moves"]), inline=True)
+
+        activity = []
+        for flag, label in (("muted", "Muted"), ("deafened", "Deafened"),
+                            ("streaming", "Streaming"), ("video", "Camera")):
+            if data["totals"][flag] >= 1:
+                activity.append(f"**{label}:** {format_duration(data['totals'][flag])}")
+        if data["server_mutes"] or data["server_deafens"]:
+            activity.append(f"**Server mutes/deafens:** {data['server_mutes']}/{data['server_deafens']}")
+        if activity:
+            embed.add_field(name="Activity", value="\n".join(activity), inline=False)
+
+        if data["avatar_url"]:
+            embed.set_thumbnail(url=data["avatar_url"])
+
+        return embed
+
+    def _save_voice_session(self, session):
+        """Persist a completed voice session for voice-time analytics"""
+        conn = self.db.get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('''
+                INSERT INTO voice_sessions (guild_id, user_id, channel_ids, started_at, ended_at, duration,
+                                            moves, muted_seconds, deafened_seconds, streaming_seconds,
+                                            video_seconds, partial)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ''', (session.guild_id, session.user_id, session.channel_ids, session.started_at,
+                      session.ended_at, int(session.duration), session.moves,
+                      int(session.totals["muted"]), int(session.totals["deafened"]),
+                      int(session.totals["streaming"]), int(session.totals["video"]), session.partial))
+                conn.commit()
+        except Exception as e:
+            conn.rollback()
+            self.logger.error(f"Database error in _save_voice_session: {e}")
+        finally:
+            self.db.release_connection(conn)
 
-            # Log to channel
-            await self.log_to_channel(member.guild.id, embed)
+    def _get_voice_stats(self, guild_id, user_id=None, days=30):
+        """Get aggregated voice time for a guild, or for one member"""
+        conn = self.db.get_connection()
+        results = []
+
+        try:
+            with conn.cursor() as cursor:
+                if user_id:
+                    cursor.execute('''
+                    SELECT user_id, COUNT(*), SUM(duration), SUM(muted_seconds), SUM(streaming_seconds), MAX(ended_at)
+                    FROM voice_sessions
+                    WHERE guild_id = %s AND user_id = %s AND started_at >= NOW() - %s * INTERVAL '1 day'
+                    GROUP BY user_id
+                    ''', (guild_id, user_id, days))
+                else:
+                    cursor.execute('''
+                    SELECT user_id, COUNT(*), SUM(duration), SUM(muted_seconds), SUM(streaming_seconds), MAX(ended_at)
+                    FROM voice_sessions
+                    WHERE guild_id = %s AND started_at >= NOW() - %s * INTERVAL '1 day'
+                    GROUP BY user_id
+                    ORDER BY SUM(duration) DESC
+                    LIMIT 10
+                    ''', (guild_id, days))
+
+                columns = ["user_id", "sessions", "duration", "muted", "streaming", "last_seen"]
+                for row in cursor.fetchall():
+                    results.append(dict(zip(columns, row)))
+
+        except Exception as e:
+            self.logger.error(f"Database error in _get_voice_stats: {e}")
+        finally:
+            self.db.release_connection(conn)
+
+        return results
 
    # Commands for managing logs
     @commands.group(name="logs", invoke_without_command=True)
     @commands.has_permissions(manage_guild=True)
     async def logs(self, ctx):
         """Manage server logs"""
-        await ctx.send("Please use a subcommand: `setup`, `enable`, `disable`, `channel`, `ignore`, `unignore`, `status`")
+        await ctx.send("Please use a subcommand: `setup`, `enable`, `disable`, `channel`, `ignore`, `unignore`, `status`, `voicetime`, `sink`")
 
     @logs.command(name="setup")
     @commands.has_permissions(manage_guild=True)
@@ -715,6 +837,38 @@ class LoggingCog(BaseCog):
 
         await ctx.send(f"✅ Logging channel set to {channel.mention}")
 
+    @logs.command(name="sink")
+    @commands.has_permissions(manage_guild=True)
+    async def logs_sink(self, ctx, sink_name: str, enabled: bool):
+        """Enable or disable a log destination (channel, webhook, postgres, jsonl)"""
+        sink_name = sink_name.lower()
+        valid_sinks = [sink.name for sink in self.sinks]
+
+        if sink_name not in valid_sinks:
+            return await ctx.send(f"❌ Invalid sink. Valid sinks: {', '.join(valid_sinks)}")
+
+        guild_id = str(ctx.guild.id)
+
+        if "guild_settings" not in self.config:
+            self.config["guild_settings"] = {}
+
+        if guild_id not in self.config["guild_settings"]:
+            self.config["guild_settings"][guild_id] = {}
+
+        if "sinks" not in self.config["guild_settings"][guild_id]:
+            self.config["guild_settings"][guild_id]["sinks"] = {}
+
+        guild_sinks = self.config["guild_settings"][guild_id]["sinks"]
+        guild_sinks[sink_name] = enabled
+
+        # Channel and webhook both post to the log channel, only one should be active
+        if enabled and sink_name in ("channel", "webhook"):
+            guild_sinks["webhook" if sink_name == "channel" else "channel"] = False
+
+        self._save_config()
+
+        await ctx.send(f"✅ {'Enabled' if enabled else 'Disabled'} log sink: `{sink_name}`")
+
     @logs.command(name="ignore")
     @commands.has_permissions(manage_guild=True)
     async def logs_ignore(self,
@@ -900,6 +1054,13 @@ class LoggingCog(BaseCog):
                 value="❌ Not set",
                 inline=False)
 
+        embed.add_field(
+            name="Sinks",
+            value="\n".join(
+                f"{'✅' if sink.settings(ctx.guild.id)['enabled'] else '❌'} `{sink.name}`"
+                for sink in self.sinks),
+            inline=False)
+
         embed.add_field(
             name="Event Settings",
             value="\n".join(event_statuses),
@@ -923,6 +1084,49 @@ class LoggingCog(BaseCog):
 
         await ctx.send(embed=embed)
 
+    @logs.command(name="voicetime")
+    @commands.has_permissions(manage_guild=True)
+    async def logs_voicetime(self, ctx, member: disnake.Member = None, days: int = 30):
+        """Show voice time for a member, or the top voice users, over the last N days"""
+        days = max(1, min(days, 365))
+        stats = self._get_voice_stats(ctx.guild.id, member.id if member else None, days)
+
+        # Include time from a session that is still open
+        open_session = self.voice_tracker.get(ctx.guild.id, member.id) if member else None
+
+        if not stats and not open_session:
+            target = f"**{member}**" if member else "This server"
+            return await ctx.send(f"{target} has no recorded voice time in the last {days} days.")
+
+        embed = disnake.Embed(
+            title=f"Voice Time for {member}" if member else "Top Voice Users",
+            description=f"Last {days} days",
+            color=disnake.Color.blue(),
+            timestamp=datetime.datetime.utcnow()
+        )
+
+        if member:
+            row = stats[0] if stats else {"sessions": 0, "duration": 0, "muted": 0, "streaming": 0, "last_seen": None}
+            duration = (row["duration"] or 0) + (open_session.duration if open_session else 0)
+
+            embed.add_field(name="Total Time", value=format_duration(duration), inline=True)
+            embed.add_field(name="Sessions", value=str(row["sessions"]), inline=True)
+            embed.add_field(name="Muted", value=format_duration(row["muted"] or 0), inline=True)
+            embed.add_field(name="Streaming", value=format_duration(row["streaming"] or 0), inline=True)
+
+            if open_session:
+                embed.add_field(name="Currently In", value=f"<#{open_session.channel_id}>", inline=True)
+
+            if member.avatar:
+                embed.set_thumbnail(url=member.avatar.url)
+        else:
+            lines = []
+            for i, row in enumerate(stats, 1):
+                lines.append(f"{i}. <@{row['user_id']}> - {format_duration(row['duration'] or 0)} ({row['sessions']} sessions)")
+            embed.add_field(name="Members", value="\n".join(lines), inline=False)
+
+        await ctx.send(embed=embed)
+
     def _save_config(self):
         """Save current config to the main bot config"""
         # Get the main config
@@ -0,0 +1,89 @@
+"""Run the message detectors over the labeled corpus and report accuracy and speed
+
+Loads the loyalty command and reaction trigger detectors with the word
+lists from config.toml, scores them against scripts/fixtures/detector_corpus.jsonl
+and prints false positives, false negatives and nanoseconds per message.
+--legacy also times the per-keyword scans the detectors replaced.
+
+Usage: python scripts/bench_detectors.py [--corpus PATH] [--config config.toml] [--strict]
+"""
+import argparse
+import os
+import re
+import sys
+import tomllib
+
+# Add the project root directory to Python's path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cogs.common.detectors import build_engine, load_corpus, DEFAULT_CORPUS, MOD_COMMAND_KEYWORDS, BOT_PREFIXES
+
+
+def register_legacy(engine, config):
+    """The list scans BotLoyaltyCog and ReactionCog used before the combined regexes"""
+    prefixes = "".join(re.escape(prefix) for prefix in BOT_PREFIXES)
+    keywords = "|".join(MOD_COMMAND_KEYWORDS)
+    patterns = [
+        re.compile(fr"^[{prefixes}](?:{keywords})\b", re.IGNORECASE),
+        re.compile(fr"^/(?:{keywords})\b", re.IGNORECASE)
+    ]
+
+    def legacy_command(sample):
+        if any(pattern.search(sample["text"]) for pattern in patterns):
+            return True
+        return sample.get("mentions_bot", False) and any(kw in sample["text"].lower() for kw in MOD_COMMAND_KEYWORDS)
+
+    trigger_words = config.get("reaction", {}).get("trigger_words", [])
+
+    def legacy_reaction(sample):
+        content = sample["text"].lower()
+        return [word for word in trigger_words if word in content]
+
+    engine.register("loyalty_command (legacy)", legacy_command, label="loyalty_command")
+    engine.register("reaction (legacy)", legacy_reaction, label="reaction")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--config", default="config.toml")
+    parser.add_argument("--repeat", type=int, default=200, help="timing passes over the corpus")
+    parser.add_argument("--legacy", action="store_true", help="also time the replaced implementations")
+    parser.add_argument("--strict", action="store_true", help="exit non-zero on any misclassification")
+    args = parser.parse_args()
+
+    with open(args.config, "rb") as f:
+        config = tomllib.load(f)
+    samples = load_corpus(args.corpus)
+
+    engine = build_engine(config)
+    if args.legacy:
+        register_legacy(engine, config)
+    reports = engine.evaluate(samples, repeat=args.repeat)
+
+    print(f"{len(samples)} samples from {args.corpus}\n")
+    print(f"{'detector':<26} {'tp':>4} {'fp':>4} {'fn':>4} {'tn':>4} {'precision':>10} {'recall':>8} {'ns/msg':>8}")
+    errors = 0
+    for name, report in reports.items():
+        fired = report["tp"] + report["fp"]
+        expected = report["tp"] + report["fn"]
+        precision = report["tp"] / fired if fired else 1.0
+        recall = report["tp"] / expected if expected else 1.0
+        print(f"{name:<26} {report['tp']:>4} {report['fp']:>4} {report['fn']:>4} {report['tn']:>4} "
+              f"{precision:>10.1%} {recall:>8.1%} {report['ns_per_message']:>8.0f}")
+        if "legacy" not in name:
+            errors += report["fp"] + report["fn"]
+
+    for name, report in reports.items():
+        if "legacy" in name:
+            continue
+        for kind in ("false_positives", "false_negatives"):
+            for text in report[kind]:
+                print(f"  {name} {kind[:-1].replace('_', ' ')}: {text!r}")
+
+    if args.strict and errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark batched vs unbatched moderation requests against a local mock endpoint
+
+Starts the mock moderation server in-process with fixed latency and a cap
+on concurrent requests (standing in for connection and rate limits), then
+replays messages at a fixed rate through the real OpenAI client.
+
+Usage: python scripts/bench_moderation_batching.py [--duration 5] [--latency-ms 80]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+# Add the project root directory to Python's path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import AsyncOpenAI
+from cogs.common.moderation_batcher import ModerationBatcher
+from cogs.common.verdict_cache import ModerationVerdict
+from mock_moderation_server import MockModerationServer, load_rules, DEFAULT_RULES
+
+RATES = (50, 200, 1000)
+
+
+async def run(moderate, rate, duration):
+    """Send messages at a fixed rate and return (completed, elapsed, latencies)"""
+    latencies = []
+    tasks = []
+
+    async def one(i):
+        start = time.perf_counter()
+        result = await moderate(f"benchmark message {i}")
+        if result is not None:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(int(rate * duration)):
+        # Pace against the schedule rather than sleeping a fixed interval
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+
+    await asyncio.gather(*tasks)
+    return len(latencies), time.perf_counter() - start, sorted(latencies)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+
+async def main(args):
+    rules, default_score = load_rules(DEFAULT_RULES)
+    server = MockModerationServer(rules, default_score, latency=args.latency_ms / 1000,
+                                  max_concurrent=args.max_concurrent)
+    runner = await server.start(port=args.port)
+    client = AsyncOpenAI(api_key="bench", base_url=f"http://127.0.0.1:{args.port}/v1", max_retries=0)
+    logger = logging.getLogger("bench")
+
+    async def send_batch(inputs):
+        response = await client.moderations.create(model="omni-moderation-latest", input=inputs)
+        return [ModerationVerdict.from_result(result) for result in response.results]
+
+    async def unbatched(content):
+        # Failed requests count as dropped messages, like in the batcher
+        try:
+            return (await send_batch([content]))[0]
+        except Exception:
+            return None
+
+    print(f"mock latency {args.latency_ms}ms, {args.max_concurrent} concurrent requests, {args.duration}s per run\n")
+    print(f"{'mode':<10}{'rate':>6}{'done/s':>10}{'dropped':>10}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    try:
+        for rate in RATES:
+            batcher = ModerationBatcher(send_batch, logger, args.max_batch_size, args.max_delay_ms / 1000)
+            for mode, moderate in (("unbatched", unbatched), ("batched", batcher.submit)):
+                server.requests = 0
+                done, elapsed, latencies = await run(moderate, rate, args.duration)
+                dropped = int(rate * args.duration) - done
+                print(f"{mode:<10}{rate:>6}{done / elapsed:>10.1f}{dropped:>10}{server.requests:>10}"
+                      f"{percentile(latencies, 0.5):>10.1f}{percentile(latencies, 0.99):>10.1f}")
+            await batcher.close()
+    finally:
+        await client.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--latency-ms", type=float, default=80)
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-delay-ms", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    asyncio.run(main(parser.parse_args()))
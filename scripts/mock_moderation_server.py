@@ -0,0 +1,181 @@
+"""Local stand-in for the OpenAI moderation endpoint
+
+Implements POST /v1/moderations with the same request and response shape as
+the real API. Scores are deterministic: keyword rules from a fixture file set
+category scores, everything else gets a small stable score derived from the
+input text. Latency, jitter and error rate are configurable.
+
+Point the bot at it with `api_base_url = "http://127.0.0.1:8765/v1"` under
+[automod] in config.toml (or OPENAI_BASE_URL in .env).
+
+Usage: python scripts/mock_moderation_server.py [--port 8765] [--latency-ms 80] [--error-rate 0.05]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+from aiohttp import web
+
+DEFAULT_RULES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "moderation_rules.json")
+
+CATEGORIES = (
+    "harassment", "harassment/threatening",
+    "hate", "hate/threatening",
+    "self-harm", "self-harm/intent", "self-harm/instructions",
+    "sexual", "sexual/minors",
+    "violence", "violence/graphic",
+    "illicit", "illicit/violent"
+)
+# Categories the real API also scores for image inputs
+IMAGE_CATEGORIES = {"self-harm", "self-harm/intent", "self-harm/instructions",
+                    "sexual", "violence", "violence/graphic"}
+FLAG_THRESHOLD = 0.5
+
+
+def load_rules(path):
+    """Load keyword rules from a fixture file"""
+    with open(path, "r", encoding="utf-8") as f:
+        fixture = json.load(f)
+
+    rules = []
+    for rule in fixture.get("rules", []):
+        keywords = [keyword.casefold() for keyword in rule["keywords"]]
+        rules.append((keywords, rule["scores"]))
+    return rules, fixture.get("default_score", 0.01)
+
+
+class MockModerationServer:
+    """Deterministic moderation endpoint with configurable latency and failures"""
+
+    def __init__(self, rules=(), default_score=0.01, latency=0.0, jitter=0.0,
+                 error_rate=0.0, max_concurrent=None, seed=0):
+        self.rules = list(rules)
+        self.default_score = default_score
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        # Caps concurrent requests, standing in for connection and rate limits
+        self.semaphore = asyncio.Semaphore(max_concurrent) if max_concurrent else None
+
+        self.requests = 0
+        self.inputs = 0
+        self.errors = 0
+
+    def score(self, text, image_count=0):
+        """Score one input, returning (category_scores, applied_input_types)"""
+        folded = text.casefold()
+        # Stable per-text noise so unmatched inputs aren't all identical
+        digest = hashlib.blake2b(folded.encode("utf-8"), digest_size=2).digest()
+        noise = int.from_bytes(digest, "big") / 0xFFFF * self.default_score
+
+        scores = {category: round(noise, 6) for category in CATEGORIES}
+        for keywords, rule_scores in self.rules:
+            if any(keyword in folded for keyword in keywords):
+                for category, value in rule_scores.items():
+                    scores[category] = max(scores.get(category, 0.0), value)
+
+        applied = {category: (["text"] if text else []) for category in CATEGORIES}
+        if image_count:
+            for category in IMAGE_CATEGORIES:
+                applied[category].append("image")
+        return scores, applied
+
+    def result(self, text, image_count=0):
+        scores, applied = self.score(text, image_count)
+        categories = {category: value >= FLAG_THRESHOLD for category, value in scores.items()}
+        return {
+            "flagged": any(categories.values()),
+            "categories": categories,
+            "category_scores": scores,
+            "category_applied_input_types": applied
+        }
+
+    def results_for(self, payload):
+        """Build results for a string, a list of strings, or one multimodal input"""
+        if isinstance(payload, str):
+            return [self.result(payload)]
+
+        if payload and all(isinstance(part, dict) for part in payload):
+            # A list of content parts is a single multimodal input
+            text = " ".join(part.get("text", "") for part in payload if part.get("type") == "text")
+            images = sum(1 for part in payload if part.get("type") == "image_url")
+            return [self.result(text, images)]
+
+        return [self.result(text) for text in payload]
+
+    async def handle(self, request):
+        try:
+            body = await request.json()
+            payload = body["input"]
+        except (ValueError, KeyError):
+            return web.json_response(
+                {"error": {"message": "Invalid request body", "type": "invalid_request_error"}}, status=400)
+
+        self.requests += 1
+        results = self.results_for(payload)
+        self.inputs += len(results)
+
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if self.semaphore:
+            async with self.semaphore:
+                await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(delay)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            status = self.random.choice((429, 500, 503))
+            return web.json_response(
+                {"error": {"message": f"Mock failure ({status})", "type": "server_error"}}, status=status)
+
+        return web.json_response({
+            "id": f"modr-mock-{self.requests}",
+            "model": body.get("model", "omni-moderation-latest"),
+            "results": results
+        })
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/v1/moderations", self.handle)
+        return app
+
+    async def start(self, host="127.0.0.1", port=8765):
+        """Start serving in the current event loop, returning the runner to clean up"""
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rules", default=DEFAULT_RULES, help="fixture file with keyword rules")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of requests that fail")
+    parser.add_argument("--max-concurrent", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rules, default_score = load_rules(args.rules)
+    server = MockModerationServer(rules, default_score, args.latency_ms / 1000, args.jitter_ms / 1000,
+                                  args.error_rate, args.max_concurrent, args.seed)
+
+    print(f"Mock moderation API on http://{args.host}:{args.port}/v1 ({len(rules)} rules)")
+    start = time.monotonic()
+    try:
+        web.run_app(server.app(), host=args.host, port=args.port, print=None)
+    finally:
+        print(f"Served {server.requests} requests ({server.inputs} inputs, {server.errors} errors) "
+              f"in {time.monotonic() - start:.0f}s")
+
+
+if __name__ == "__main__":
+    main()